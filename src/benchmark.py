@@ -0,0 +1,358 @@
+# src/benchmark.py
+"""
+Offline throughput benchmark
+
+Replays recorded clips through MonitoringController without display or Telegram,
+once per backend/runtime combination, and writes the results as JSON:
+
+    python src/benchmark.py data/clips --backend mediapipe yolo_pose --runtime pytorch onnx \
+        --output bench.json --baseline previous.json
+
+--allocations traces Python-heap allocations per analysed frame with tracemalloc
+(slower, so fps from such a run is not comparable) and --alloc-budget-kb fails the
+run when the steady-state p95 goes over the budget.
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import time
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+from dotenv import load_dotenv
+from rich.table import Table
+
+from buffers import AllocationTracker
+from config import Config
+from controller import MonitoringController
+from logger import setup_logging, logging, console
+from service import NullNotifier, PoseService, load_models, wait_for_models
+
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mkv", ".mov", ".m4v"}
+
+# Compared against the baseline, higher is worse for all of them except fps
+REGRESSION_STAGES = ("detect", "pose", "classify", "glass_to_decision")
+
+
+def find_clips(paths):
+    clips = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            clips.extend(sorted(p for p in path.iterdir() if p.suffix.lower() in VIDEO_EXTENSIONS))
+        elif path.is_file():
+            clips.append(path)
+        else:
+            raise FileNotFoundError(f"No such clip or directory: {path}")
+    return clips
+
+
+def variant_config(config: Config, backend: str, runtime: str, motion_gate: bool, workers: bool = False):
+    """Copy of the config with one backend/runtime combination and nothing interactive"""
+    raw = copy.deepcopy(config.config)
+    monitoring = raw["monitoring"]
+    monitoring.setdefault("pose", {})["backend"] = backend
+    monitoring.setdefault("runtime", {})["backend"] = runtime
+    monitoring.setdefault("workers", {})["enabled"] = workers
+    monitoring.setdefault("display", {})["headless"] = True
+    monitoring.setdefault("preview", {})["enabled"] = False
+    monitoring.setdefault("recording", {})["enabled"] = False
+    if not motion_gate:
+        # A zero keep-alive lets every frame through the gate
+        monitoring.setdefault("motion_gate", {})["max_skip_seconds"] = 0
+    return config.derive(raw)
+
+
+def replay(controller: MonitoringController, clips, fps: float = 0, max_frames: int = 0,
+           allocations: AllocationTracker = None):
+    """
+    Feed every clip frame by frame through the controller
+    Frames are stamped with their time in the clip, so confirmation, motion features and
+    the gate keep-alive don't depend on replay speed. State is reset between clips.
+    Args:
+        fps: Fixed replay rate, 0 replays as fast as the pipeline allows
+        max_frames: Stop after this many frames in total, 0 for no limit
+        allocations: Traces the allocations of every frame from resize to decision
+    Returns:
+        Tuple(int, int, float): Frames read, frames analysed and elapsed seconds
+    """
+    pose_service = controller.pose_service
+    interval = 1.0 / fps if fps else 0.0
+    frames_read = 0
+    start_time = time.perf_counter()
+    next_frame_time = start_time
+    # Media time of the current clip is added to this, clips follow each other on one timeline
+    clip_start = time.time()
+
+    for clip in clips:
+        cap = cv2.VideoCapture(str(clip))
+        clip_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        clip_frames = 0
+        clip_time = 0.0
+        try:
+            while not max_frames or frames_read < max_frames:
+                received_at = time.time()
+                decode_start = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                # Offline "capture" is the decode time of the frame
+                controller.metrics.observe("capture", time.perf_counter() - decode_start)
+                position = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                clip_time = position if position > 0 else clip_frames / clip_fps
+                captured_at = clip_start + clip_time
+                clip_frames += 1
+                frames_read += 1
+
+                if allocations is not None:
+                    allocations.frame_start()
+                resized = controller.frame_pool.resize(frame, (pose_service.display_width, pose_service.display_height))
+                if controller.has_significant_change(resized, captured_at):
+                    controller.process_frame(resized, captured_at, received_at)
+                if allocations is not None:
+                    allocations.frame_end()
+
+                if interval:
+                    next_frame_time += interval
+                    delay = next_frame_time - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+        finally:
+            cap.release()
+        # The next clip starts one frame later, with no tracks or pose timers carried over
+        clip_start += clip_time + 1.0 / clip_fps
+        controller.reset_state()
+
+    return frames_read, controller.frames_processed, time.perf_counter() - start_time
+
+
+def warm_up(pose_service: PoseService, clips, frames: int):
+    """Run the backend on the first frames so model loading and JIT don't count"""
+    if not frames or not clips:
+        return
+    cap = cv2.VideoCapture(str(clips[0]))
+    try:
+        for _ in range(frames):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            resized = cv2.resize(frame, (pose_service.display_width, pose_service.display_height))
+            if pose_service.people is not None:
+                pose_service.analyze_people(resized)
+            else:
+                pose_service.analyze_pose(resized)
+    finally:
+        cap.release()
+    pose_service.reset_tracking()
+
+
+def run_variant(config: Config, clips, backend: str, runtime: str, args):
+    name = f"{backend}/{runtime}"
+    console.print(f"[blue]Benchmarking {name}[/blue]")
+    variant = variant_config(config, backend, runtime, not args.no_motion_gate, args.workers)
+
+    models = load_models(variant)
+    try:
+        # Loading is not part of what is measured
+        wait_for_models(models)
+        pose_service = PoseService(variant, models=models)
+        warm_up(pose_service, clips, args.warmup)
+        notifier = NullNotifier()
+        controller = MonitoringController(
+            variant,
+            camera_name=f"benchmark-{backend}-{runtime}",
+            telegram_service=notifier,
+            pose_service=pose_service,
+            headless=True
+        )
+        # Started after warm-up, first-frame buffer allocations are expected and not steady state
+        allocations = AllocationTracker().start() if args.allocations else None
+        try:
+            frames_read, frames_analysed, elapsed = replay(controller, clips, args.fps, args.max_frames, allocations)
+        finally:
+            if allocations is not None:
+                allocations.stop()
+    finally:
+        for engine in models.values():
+            engine.stop()
+
+    return {
+        "name": name,
+        "backend": backend,
+        "runtime": runtime,
+        "frames": frames_read,
+        "analysed": frames_analysed,
+        "elapsed_s": elapsed,
+        "fps": frames_read / elapsed if elapsed else 0.0,
+        "analysed_fps": frames_analysed / elapsed if elapsed else 0.0,
+        "skip_rate": controller.motion_gate.get_stats()["skip_rate"],
+        "alerts": notifier.alerts_sent,
+        "stages": controller.metrics.summary(),
+        "allocations": allocations.summary() if allocations is not None else None,
+    }
+
+
+def compare(results, baseline, tolerance: float):
+    """List of regressions against a previous results file"""
+    previous = {result["name"]: result for result in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        old = previous.get(result["name"])
+        if old is None:
+            continue
+        if result["fps"] < old["fps"] * (1 - tolerance):
+            regressions.append(f"{result['name']}: fps {old['fps']:.1f} -> {result['fps']:.1f}")
+        for stage in REGRESSION_STAGES:
+            new_p95 = result["stages"].get(stage, {}).get("p95_ms")
+            old_p95 = old.get("stages", {}).get(stage, {}).get("p95_ms")
+            if new_p95 and old_p95 and new_p95 > old_p95 * (1 + tolerance):
+                regressions.append(f"{result['name']}: {stage} p95 {old_p95:.1f}ms -> {new_p95:.1f}ms")
+        new_kb = (result.get("allocations") or {}).get("p95_kb")
+        old_kb = (old.get("allocations") or {}).get("p95_kb")
+        if new_kb and old_kb and new_kb > old_kb * (1 + tolerance):
+            regressions.append(f"{result['name']}: allocations p95 {old_kb:.0f}KB -> {new_kb:.0f}KB per frame")
+    return regressions
+
+
+def check_allocation_budget(results, budget_kb: float):
+    """Variants whose steady-state allocations per frame go over the budget"""
+    over = []
+    for result in results:
+        p95_kb = (result.get("allocations") or {}).get("p95_kb")
+        if p95_kb is not None and p95_kb > budget_kb:
+            over.append(f"{result['name']}: {p95_kb:.0f}KB allocated per frame (p95), budget {budget_kb:.0f}KB")
+    return over
+
+
+def create_allocation_table(results):
+    table = Table(title="Allocations per Frame", show_header=True)
+
+    table.add_column("Variant", style="blue")
+    table.add_column("Frames", style="green")
+    table.add_column("p50 KB", style="green")
+    table.add_column("p95 KB", style="yellow")
+    table.add_column("Max KB", style="red")
+    table.add_column("Retained KB", style="red")
+
+    for result in results:
+        stats = result.get("allocations")
+        if not stats or not stats["frames"]:
+            continue
+        table.add_row(
+            result["name"],
+            str(stats["frames"]),
+            f"{stats['p50_kb']:.1f}",
+            f"{stats['p95_kb']:.1f}",
+            f"{stats['max_kb']:.1f}",
+            f"{stats['retained_kb']:.1f}"
+        )
+
+    return table
+
+
+def create_results_table(results):
+    table = Table(title="Benchmark Results", show_header=True)
+
+    table.add_column("Variant", style="blue")
+    table.add_column("Frames", style="green")
+    table.add_column("FPS", style="yellow")
+    table.add_column("Skipped", style="red")
+    table.add_column("Stage", style="blue")
+    table.add_column("p50 ms", style="green")
+    table.add_column("p95 ms", style="yellow")
+    table.add_column("p99 ms", style="red")
+
+    for result in results:
+        first = True
+        for stage, stats in result["stages"].items():
+            table.add_row(
+                result["name"] if first else "",
+                str(result["frames"]) if first else "",
+                f"{result['fps']:.1f}" if first else "",
+                f"{result['skip_rate']:.0%}" if first else "",
+                stage,
+                f"{stats['p50_ms']:.1f}",
+                f"{stats['p95_ms']:.1f}",
+                f"{stats['p99_ms']:.1f}"
+            )
+            first = False
+
+    return table
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay recorded clips and measure throughput and latency")
+    parser.add_argument("clips", nargs="+", help="Video files or directories of clips")
+    parser.add_argument("--backend", nargs="+", default=["mediapipe"], help="Pose backends to compare")
+    parser.add_argument("--runtime", nargs="+", default=["pytorch"], help="YOLO runtimes to compare")
+    parser.add_argument("--fps", type=float, default=0, help="Fixed replay rate, 0 for as fast as possible")
+    parser.add_argument("--max-frames", type=int, default=0, help="Stop each variant after this many frames")
+    parser.add_argument("--warmup", type=int, default=5, help="Frames run before measuring")
+    parser.add_argument("--no-motion-gate", action="store_true", help="Analyse every frame")
+    parser.add_argument("--workers", action="store_true", help="Run inference in worker processes")
+    parser.add_argument("--config", default="config/config.yaml", help="Base configuration")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Previous JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative slowdown before failing")
+    parser.add_argument("--allocations", action="store_true", help="Trace allocations per frame with tracemalloc")
+    parser.add_argument("--alloc-budget-kb", type=float, help="Fail when the p95 allocations per frame exceed this")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    load_dotenv()
+    setup_logging()
+
+    config = Config(config_path=args.config, lang=os.getenv("LANGUAGE", "pt"))
+    clips = find_clips(args.clips)
+    if not clips:
+        console.print("[red]No clips found[/red]")
+        raise SystemExit(1)
+
+    results = [
+        run_variant(config, clips, backend, runtime, args)
+        for backend in args.backend
+        for runtime in args.runtime
+    ]
+    console.print(create_results_table(results))
+    if args.allocations:
+        console.print(create_allocation_table(results))
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "clips": [str(clip) for clip in clips],
+        "fps_limit": args.fps,
+        "motion_gate": not args.no_motion_gate,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logging.info(f"Benchmark results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            console.print(f"[red]Regression: {regression}[/red]")
+        if regressions:
+            raise SystemExit(1)
+        console.print("[green]No regressions against baseline[/green]")
+
+    if args.allocations and args.alloc_budget_kb is not None:
+        over_budget = check_allocation_budget(results, args.alloc_budget_kb)
+        for line in over_budget:
+            console.print(f"[red]Over allocation budget: {line}[/red]")
+        if over_budget:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# src/buffers.py
+import tracemalloc
+
+import cv2
+import numpy as np
+
+
+class FramePool:
+    """
+    Ring of preallocated frames handed out as cv2 dst= buffers
+    A frame stays valid until count newer ones have been taken, so the ring must be
+    larger than the number of frames in flight. Taken from a single producer thread.
+    """
+
+    def __init__(self, count: int = 2):
+        self.count = max(1, count)
+        self.frames = []
+        self.index = 0
+        self.allocations = 0
+
+    def next(self, shape, dtype=np.uint8):
+        """Oldest buffer of the ring, reallocated only when the frame shape changes"""
+        shape = tuple(shape)
+        if self.frames and (self.frames[0].shape != shape or self.frames[0].dtype != dtype):
+            # Resolution changed mid-stream
+            self.frames = []
+        if len(self.frames) < self.count:
+            self.frames.append(np.empty(shape, dtype=dtype))
+            self.allocations += 1
+            self.index = len(self.frames) - 1
+        else:
+            self.index = (self.index + 1) % self.count
+        return self.frames[self.index]
+
+    def resize(self, frame, size, interpolation=cv2.INTER_LINEAR):
+        """cv2.resize into the next buffer, size is (width, height) like cv2"""
+        width, height = size
+        return cv2.resize(frame, size, dst=self.next((height, width) + frame.shape[2:], frame.dtype),
+                          interpolation=interpolation)
+
+    def cvt_color(self, image, code, channels: int = 1):
+        """cv2.cvtColor into the next buffer"""
+        shape = image.shape[:2] if channels == 1 else image.shape[:2] + (channels,)
+        return cv2.cvtColor(image, code, dst=self.next(shape, image.dtype))
+
+
+class ScratchBuffer:
+    """Grow-only flat buffer giving contiguous views of any shape, e.g. crops that change size every frame"""
+
+    def __init__(self, dtype=np.uint8):
+        self.buffer = np.empty(0, dtype=dtype)
+        self.allocations = 0
+
+    def view(self, shape):
+        size = int(np.prod(shape))
+        if size > self.buffer.size:
+            # Some headroom so a person walking towards the camera doesn't regrow it every frame
+            self.buffer = np.empty(int(size * 1.25), dtype=self.buffer.dtype)
+            self.allocations += 1
+        return self.buffer[:size].reshape(shape)
+
+    def cvt_color(self, image, code, channels: int = 3):
+        """cv2.cvtColor of a (possibly non-contiguous) ROI view into the scratch buffer"""
+        shape = image.shape[:2] if channels == 1 else image.shape[:2] + (channels,)
+        return cv2.cvtColor(image, code, dst=self.view(shape))
+
+
+class AllocationTracker:
+    """
+    Python-heap allocations per frame with tracemalloc
+    numpy and OpenCV arrays are allocated through numpy, so frame-sized buffers show up here.
+    """
+
+    def __init__(self):
+        self.peaks = []  # bytes allocated on top of the frame's starting point
+        self.start_bytes = 0
+        self.frame_start_bytes = 0
+        self.end_bytes = 0
+        self.started_here = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_here = True
+        self.start_bytes, _ = tracemalloc.get_traced_memory()
+        self.end_bytes = self.start_bytes
+        return self
+
+    def frame_start(self):
+        tracemalloc.reset_peak()
+        self.frame_start_bytes, _ = tracemalloc.get_traced_memory()
+
+    def frame_end(self):
+        current, peak = tracemalloc.get_traced_memory()
+        self.peaks.append(peak - self.frame_start_bytes)
+        self.end_bytes = current
+
+    def stop(self):
+        if self.started_here:
+            tracemalloc.stop()
+            self.started_here = False
+
+    def summary(self):
+        """Per-frame transient bytes and what stayed allocated over the run"""
+        if not self.peaks:
+            return {"frames": 0}
+        peaks = np.array(self.peaks)
+        return {
+            "frames": len(peaks),
+            "p50_kb": float(np.percentile(peaks, 50) / 1024),
+            "p95_kb": float(np.percentile(peaks, 95) / 1024),
+            "max_kb": float(peaks.max() / 1024),
+            "retained_kb": float((self.end_bytes - self.start_bytes) / 1024),
+        }
@@ -0,0 +1,236 @@
+# src/capture.py
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from logger import logging
+
+
+class FrameReader:
+    """Decode frames on a background thread and always serve the newest one"""
+
+    def __init__(self, video_source, buffer_size: int = 2, reconnect_delay: float = 2.0,
+                 drop_frames: bool = True, capture_factory=None):
+        self.video_source = video_source
+        # Anything with the cv2.VideoCapture read/isOpened/set/release interface
+        self.capture_factory = capture_factory or cv2.VideoCapture
+        self.buffer_size = max(1, buffer_size)
+        self.reconnect_delay = reconnect_delay
+        # Live streams drop stale frames; file replays can block instead
+        self.drop_frames = drop_frames
+        self.is_file = isinstance(video_source, str) and os.path.isfile(video_source)
+
+        # Keyframe-only decoding requested while the scene is idle, applied by the reader thread
+        self.idle = False
+        self.idle_applied = False
+
+        self.buffer = deque(maxlen=self.buffer_size)
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.ended = False
+        self.cap = None
+
+        # Counters
+        self.frames_read = 0
+        self.frames_delivered = 0
+        self.frames_dropped = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._reader_loop, name="frame-reader", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def _open(self):
+        self.cap = self.capture_factory(self.video_source)
+        self.idle_applied = False
+        if not self.cap.isOpened():
+            logging.error(f"Could not open video source: {self.video_source}")
+            return False
+        # Keep the driver-side buffer as small as possible, we buffer ourselves
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return True
+
+    def _reader_loop(self):
+        while self.running:
+            if self.cap is None and not self._open():
+                if self.is_file:
+                    break
+                time.sleep(self.reconnect_delay)
+                self.cap = None
+                continue
+
+            if self.idle != self.idle_applied and hasattr(self.cap, "set_keyframes_only"):
+                self.cap.set_keyframes_only(self.idle)
+                self.idle_applied = self.idle
+                logging.info(f"Decoding {'keyframes only' if self.idle else 'every frame'}")
+
+            ret, frame = self.cap.read()
+            captured_at = time.time()
+
+            if not ret:
+                if self.is_file:
+                    break
+                logging.warning("Frame read failed, reconnecting to video source")
+                self.cap.release()
+                self.cap = None
+                time.sleep(self.reconnect_delay)
+                continue
+
+            with self.condition:
+                if len(self.buffer) == self.buffer.maxlen:
+                    if self.drop_frames:
+                        # Oldest frame falls off the ring buffer
+                        self.frames_dropped += 1
+                    else:
+                        while self.running and len(self.buffer) == self.buffer.maxlen:
+                            self.condition.wait(timeout=0.1)
+                self.buffer.append((frame, captured_at))
+                self.frames_read += 1
+                self.condition.notify_all()
+
+        with self.condition:
+            self.ended = True
+            self.condition.notify_all()
+
+    def set_idle(self, idle: bool):
+        """Ask a backend that supports it to decode only keyframes, ignored by cv2.VideoCapture"""
+        self.idle = idle
+
+    def read(self, timeout: float = None):
+        """
+        Return the newest decoded frame
+        Returns:
+            Tuple(bool, frame, float): Success status, frame and capture timestamp
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.buffer or self.ended or not self.running,
+                                           timeout=timeout):
+                return False, None, None
+            if not self.buffer:
+                return False, None, None
+
+            if self.drop_frames:
+                frame, captured_at = self.buffer.pop()
+                # Anything older than the frame we hand out is stale
+                self.frames_dropped += len(self.buffer)
+                self.buffer.clear()
+            else:
+                frame, captured_at = self.buffer.popleft()
+            self.frames_delivered += 1
+            self.condition.notify_all()
+
+        self.last_lag = time.time() - captured_at
+        self.max_lag = max(self.max_lag, self.last_lag)
+        return True, frame, captured_at
+
+    def get_stats(self):
+        """Return capture counters"""
+        return {
+            "frames_read": self.frames_read,
+            "frames_delivered": self.frames_delivered,
+            "frames_dropped": self.frames_dropped,
+            "last_lag_ms": self.last_lag * 1000,
+            "max_lag_ms": self.max_lag * 1000,
+        }
+
+
+class SnapshotProvider:
+    """High-resolution evidence frames from a camera's main stream"""
+
+    def __init__(self, video_source, mode: str = "lazy", timeout: float = 3.0, warmup_frames: int = 5):
+        self.video_source = video_source
+        # "lazy" opens the stream only when an alert needs a frame,
+        # "buffered" keeps decoding it in the background for an instant snapshot
+        self.mode = mode
+        self.timeout = timeout
+        # Right after connecting, frames are often incomplete until the next keyframe
+        self.warmup_frames = warmup_frames
+        self.reader = None
+        self.lock = threading.Lock()
+
+        # Counters
+        self.snapshots = 0
+        self.failures = 0
+        self.last_latency = 0.0
+
+    @classmethod
+    def from_config(cls, config, video_source):
+        capture_config = config.config["monitoring"].get("capture", {})
+        mode = capture_config.get("evidence", "lazy")
+        if mode == "off" or not video_source:
+            return None
+        return cls(
+            video_source,
+            mode=mode,
+            timeout=capture_config.get("evidence_timeout", 3.0),
+            warmup_frames=capture_config.get("evidence_warmup_frames", 5)
+        )
+
+    def start(self):
+        if self.mode == "buffered":
+            self.reader = FrameReader(self.video_source, buffer_size=1).start()
+        return self
+
+    def stop(self):
+        if self.reader is not None:
+            self.reader.stop()
+            self.reader = None
+
+    def snapshot(self):
+        """Newest full-resolution frame, or None when the stream can't deliver in time"""
+        start_time = time.time()
+        with self.lock:
+            if self.reader is not None:
+                ret, frame, _ = self.reader.read(timeout=self.timeout)
+            else:
+                ret, frame = self._grab_lazily(start_time + self.timeout)
+
+        self.last_latency = time.time() - start_time
+        if not ret:
+            self.failures += 1
+            logging.warning(f"No evidence frame from main stream after {self.last_latency:.1f}s")
+            return None
+        self.snapshots += 1
+        logging.info(f"Evidence frame {frame.shape[1]}x{frame.shape[0]} captured in {self.last_latency * 1000:.0f}ms")
+        return frame
+
+    def _grab_lazily(self, deadline: float):
+        cap = cv2.VideoCapture(self.video_source)
+        try:
+            if not cap.isOpened():
+                return False, None
+            frame = None
+            for _ in range(self.warmup_frames):
+                ret, candidate = cap.read()
+                if ret:
+                    frame = candidate
+                if time.time() >= deadline:
+                    break
+            return frame is not None, frame
+        finally:
+            cap.release()
+
+    def get_stats(self):
+        return {
+            "mode": self.mode,
+            "snapshots": self.snapshots,
+            "failures": self.failures,
+            "last_latency_ms": self.last_latency * 1000,
+        }
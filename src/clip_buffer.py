@@ -0,0 +1,169 @@
+# src/clip_buffer.py
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from logger import logging
+
+
+class ClipBuffer:
+    """Last seconds of a camera as JPEGs under a byte budget, turned into pre/post-roll clips on alerts"""
+
+    def __init__(self, pre_roll: float = 5.0, post_roll: float = 3.0, fps: float = 5,
+                 max_bytes: int = 8_000_000, jpeg_quality: int = 70, codec: str = "avc1", name: str = "default"):
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.fps = fps
+        self.min_interval = 1.0 / fps
+        self.max_bytes = max_bytes
+        self.jpeg_quality = jpeg_quality
+        self.codec = codec
+        self.name = name
+
+        self.lock = threading.Lock()
+        self.frames = deque()  # (timestamp, jpeg bytes)
+        self.total_bytes = 0
+        self.last_added = 0.0
+        self.pending = []  # (start, end, callback)
+
+        self.encode_queue = queue.Queue()
+        self.worker = threading.Thread(target=self._encode_loop, name=f"clip-encoder-{name}", daemon=True)
+        self.worker.start()
+
+        # Counters
+        self.frames_evicted = 0
+        self.clips_encoded = 0
+        self.clips_failed = 0
+
+    @classmethod
+    def from_config(cls, config, name: str = "default"):
+        clip_config = config.config["monitoring"].get("clips", {})
+        if not clip_config.get("enabled", False):
+            return None
+        return cls(
+            pre_roll=clip_config.get("pre_roll", 5.0),
+            post_roll=clip_config.get("post_roll", 3.0),
+            fps=clip_config.get("fps", 5),
+            max_bytes=clip_config.get("max_bytes", 8_000_000),
+            jpeg_quality=clip_config.get("jpeg_quality", 70),
+            codec=clip_config.get("codec", "avc1"),
+            name=name
+        )
+
+    def add(self, frame, timestamp: float):
+        """Keep a frame if the clip frame rate allows it, and close clips whose post-roll is over"""
+        if timestamp - self.last_added >= self.min_interval:
+            success, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if success:
+                jpeg = encoded.tobytes()
+                with self.lock:
+                    self.frames.append((timestamp, jpeg))
+                    self.total_bytes += len(jpeg)
+                    self.last_added = timestamp
+                    self._evict(timestamp)
+
+        if self.pending:
+            self._finish_due(timestamp)
+
+    def _evict(self, now: float):
+        # Keep enough history for the pre-roll of every clip still waiting for its post-roll
+        oldest_needed = min([start for start, _, _ in self.pending] + [now - self.pre_roll])
+        while self.frames and (self.total_bytes > self.max_bytes or self.frames[0][0] < oldest_needed):
+            _, jpeg = self.frames.popleft()
+            self.total_bytes -= len(jpeg)
+            self.frames_evicted += 1
+
+    def request_clip(self, event_time: float, callback):
+        """
+        Ask for a clip around an event
+        Args:
+            event_time: Timestamp of the alert, on the same clock as the added frames
+            callback: Called from the encoder thread with the MP4 bytes once the post-roll is recorded
+        """
+        with self.lock:
+            self.pending.append((event_time - self.pre_roll, event_time + self.post_roll, callback))
+
+    def _finish_due(self, now: float, force: bool = False):
+        with self.lock:
+            due = [request for request in self.pending if force or request[1] <= now]
+            if not due:
+                return
+            self.pending = [request for request in self.pending if request not in due]
+            for start, end, callback in due:
+                # Only references to the immutable JPEG bytes, nothing is copied here
+                jpegs = [jpeg for timestamp, jpeg in self.frames if start <= timestamp <= end]
+                self.encode_queue.put((jpegs, callback))
+
+    def _encode_loop(self):
+        while True:
+            job = self.encode_queue.get()
+            if job is None:
+                break
+            jpegs, callback = job
+            try:
+                clip = self._encode(jpegs)
+            except Exception as e:
+                clip = None
+                logging.error(f"[{self.name}] Clip encoding failed: {str(e)}")
+            if clip is None:
+                self.clips_failed += 1
+                continue
+            self.clips_encoded += 1
+            try:
+                callback(clip)
+            except Exception as e:
+                logging.error(f"[{self.name}] Clip delivery failed: {str(e)}")
+
+    def _encode(self, jpegs):
+        if not jpegs:
+            return None
+        first = cv2.imdecode(np.frombuffer(jpegs[0], dtype=np.uint8), cv2.IMREAD_COLOR)
+        height, width = first.shape[:2]
+
+        # cv2.VideoWriter can only write to a file
+        fd, path = tempfile.mkstemp(suffix=".mp4")
+        os.close(fd)
+        try:
+            writer = None
+            for codec in dict.fromkeys((self.codec, "mp4v")):
+                writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), self.fps, (width, height))
+                if writer.isOpened():
+                    break
+                writer.release()
+                writer = None
+            if writer is None:
+                return None
+
+            start_time = time.time()
+            writer.write(first)
+            for jpeg in jpegs[1:]:
+                writer.write(cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR))
+            writer.release()
+
+            with open(path, "rb") as f:
+                clip = f.read()
+            logging.info(f"[{self.name}] Encoded {len(jpegs)} frame clip ({len(clip) / 1024:.0f}KB) in {time.time() - start_time:.2f}s")
+            return clip
+        finally:
+            os.remove(path)
+
+    def stop(self):
+        """Encode clips still waiting for their post-roll with what was recorded"""
+        self._finish_due(time.time(), force=True)
+        self.encode_queue.put(None)
+        self.worker.join(timeout=10)
+
+    def get_stats(self):
+        return {
+            "frames": len(self.frames),
+            "bytes": self.total_bytes,
+            "frames_evicted": self.frames_evicted,
+            "clips_encoded": self.clips_encoded,
+            "clips_failed": self.clips_failed,
+        }
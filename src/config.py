@@ -1,36 +1,158 @@
 # src/config.py
+import copy
+import os
+import threading
 import yaml
 from pathlib import Path
+from types import MappingProxyType
 from typing import Dict, Any
 
+from enums import PoseType
+from logger import logging
+
+def _flatten(tree, prefix=""):
+    """Dotted key -> string for every leaf of a nested message dict"""
+    flat = {}
+    for key, value in tree.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{path}."))
+        else:
+            flat[path] = value
+    return flat
+
+class ConfigSnapshot:
+    """
+    Read-only tables compiled from the YAML, looked up on every frame without walking dicts
+    The parsed files it was built from travel with it, so a reload is published as one object.
+    """
+    __slots__ = ("config", "raw_messages", "risk_by_pose", "default_risk", "required_duration", "messages")
+
+    def __init__(self, config: Dict[str, Any], messages: Dict[str, Any]):
+        object.__setattr__(self, "config", config)
+        object.__setattr__(self, "raw_messages", messages)
+        monitoring = config["monitoring"]
+        risk_levels = monitoring["risk_levels"]
+        pose_risks = monitoring["pose_risks"]
+
+        def risk_table(level):
+            return MappingProxyType({**risk_levels[level], "risk": level})
+
+        poses = set(pose_risks) | {pose.value for pose in PoseType}
+        object.__setattr__(self, "risk_by_pose", MappingProxyType({
+            pose: risk_table(pose_risks.get(pose, {}).get("risk", "low")) for pose in poses
+        }))
+        object.__setattr__(self, "default_risk", risk_table("low"))
+
+        confirmation = monitoring["pose_confirmation"]
+        object.__setattr__(self, "required_duration", MappingProxyType({
+            pose: confirmation["emergency"] if pose == PoseType.LYING.value else confirmation["standard"]
+            for pose in poses
+        }))
+        object.__setattr__(self, "messages", MappingProxyType(_flatten(messages)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ConfigSnapshot is immutable")
+
 class Config:
     def __init__(self, config_path: str = "config/config.yaml", lang: str = "pt"):
         self.config_path = Path(config_path)
         self.lang = lang
-        self.config = self._load_config()
-        self.messages = self._load_messages()
-    
+        self.snapshot = ConfigSnapshot(self._load_config(), self._load_messages())
+        self.listeners = []
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self.snapshot.config
+
+    @property
+    def messages(self) -> Dict[str, Any]:
+        return self.snapshot.raw_messages
+
     def _load_config(self) -> Dict[str, Any]:
         with open(self.config_path) as f:
             return yaml.safe_load(f)
-    
+
     def _load_messages(self) -> Dict[str, Any]:
         lang_file = Path(f"config/i18n/{self.lang}.yaml")
         with open(lang_file) as f:
             return yaml.safe_load(f)
-    
+
+    @property
+    def watched_files(self):
+        return [self.config_path, Path(f"config/i18n/{self.lang}.yaml")]
+
+    def derive(self, config: Dict[str, Any]) -> "Config":
+        """Copy with a modified config dict, e.g. one benchmark variant"""
+        derived = copy.copy(self)
+        derived.snapshot = ConfigSnapshot(config, self.messages)
+        derived.listeners = []
+        return derived
+
+    def reload(self) -> bool:
+        """Load the files again and swap in a new snapshot, the old one stays on any error"""
+        try:
+            snapshot = ConfigSnapshot(self._load_config(), self._load_messages())
+        except Exception as e:
+            logging.error(f"Config reload failed, keeping the current configuration: {str(e)}")
+            return False
+
+        # One reference swap, readers see either the old or the new config, messages and tables
+        self.snapshot = snapshot
+        logging.info(f"Configuration reloaded from {self.config_path}")
+        for listener in list(self.listeners):
+            listener(self)
+        return True
+
+    def add_listener(self, callback):
+        """Called with the config after every successful reload"""
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
     def get_risk_level(self, pose: str) -> Dict[str, Any]:
-        pose_risks = self.config["monitoring"]["pose_risks"]
-        risk_levels = self.config["monitoring"]["risk_levels"]
-        pose_risk = pose_risks.get(pose, {}).get("risk", "low")
-        risk_config = risk_levels[pose_risk]
-        risk_config["risk"] = pose_risk
-        return risk_config
-    
+        return self.snapshot.risk_by_pose.get(pose, self.snapshot.default_risk)
+
     def get_message(self, key: str, **kwargs) -> str:
         """Get localized message with formatting"""
-        keys = key.split(".")
-        msg = self.messages
-        for k in keys:
-            msg = msg[k]
-        return msg.format(**kwargs)
\ No newline at end of file
+        message = self.snapshot.messages[key]
+        return message.format(**kwargs) if kwargs else message
+
+class ConfigWatcher:
+    """Poll the config and i18n files and reload when they change"""
+
+    def __init__(self, config: Config, interval: float = 2.0):
+        self.config = config
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.mtimes = self._mtimes()
+
+    @classmethod
+    def from_config(cls, config: Config):
+        reload_config = config.config["monitoring"].get("config_reload", {})
+        if not reload_config.get("enabled", False):
+            return None
+        return cls(config, interval=reload_config.get("interval", 2.0))
+
+    def _mtimes(self):
+        return [os.path.getmtime(path) if path.exists() else None for path in self.config.watched_files]
+
+    def start(self):
+        self.thread = threading.Thread(target=self._watch_loop, name="config-watcher", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.interval + 1)
+
+    def _watch_loop(self):
+        while not self.stop_event.wait(self.interval):
+            mtimes = self._mtimes()
+            if mtimes != self.mtimes:
+                self.mtimes = mtimes
+                self.config.reload()
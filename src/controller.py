@@ -1,32 +1,78 @@
 import cv2
 import time
+from collections import deque
 from rich.panel import Panel
 from rich.table import Table
 from service import TelegramService, PoseService
+from buffers import FramePool
+from capture import FrameReader, SnapshotProvider
+from ingest import capture_factory
+from temporal import TemporalEngine
+from motion import MotionGate
+from preview import PreviewServer
+from pipeline import MonitoringPipeline
+from metrics import camera_metrics
+from recording import LandmarkRecorder
+from clip_buffer import ClipBuffer
+from scheduler import AnalysisScheduler
+from startup import STARTUP
 from logger import logging, console
 from enums import PoseType, GenderType
 from config import Config
-import numpy as np
 
 class MonitoringController:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, camera_name: str = "default",
+                 telegram_service: TelegramService = None, pose_service: PoseService = None,
+                 headless: bool = None, preview_server: PreviewServer = None):
         self.config = config
-        self.telegram_service = TelegramService(config)
-        self.pose_service = PoseService(config)
+        self.camera_name = camera_name
+        # Headless skips every drawing call unless a preview viewer is connected
+        display_config = config.config["monitoring"].get("display", {})
+        self.headless = display_config.get("headless", False) if headless is None else headless
+        self.preview_server = preview_server
+        self.preview_channel = preview_server.channel(camera_name) if preview_server else None
+        self.render_frame = not self.headless
+        # Services can be shared between cameras when running under the supervisor
+        self.owns_telegram_service = telegram_service is None
+        self.telegram_service = telegram_service or TelegramService(config)
+        self.pose_service = pose_service or PoseService(config)
+        self.running = False
+        self.alert_sink = None
+        # Opens the analysis stream with the configured ingest backend
+        self.capture_factory = capture_factory(config)
+        # Resized analysis frames are reused, only alerts keep a copy
+        self.frame_pool = FramePool(2)
+        # Idle scenes only need keyframes decoded, when the backend can skip the rest
+        self.idle_keyframes_only = config.config["monitoring"].get("capture", {}).get("idle_keyframes_only", True)
         
         # Pose tracking
         self.current_pose = None
-        self.pose_frame_count = 0
+        self.current_track_id = None
+        self.pose_started_at = None
         self.last_alert_time = 0
+        self.temporal_engine = TemporalEngine(config)
+        self.last_temporal = None
         self.fps = self.config.config["monitoring"]["performance"]["fps"]
+        # Analysis rate follows the risk of what is in view
+        self.scheduler = AnalysisScheduler.from_config(config)
+        config.add_listener(self.on_config_reload)
         
-        # Frame comparison
-        self.previous_frame = None
-        self.frame_threshold = 0.1
+        # Pre/post-roll clips attached to alerts
+        self.clip_buffer = ClipBuffer.from_config(config, camera_name)
+        
+        # Optional landmark recording for offline re-scoring
+        self.recorder = LandmarkRecorder.from_config(config, camera_name)
+        
+        # Motion gating on a downscaled background model
+        self.motion_gate = MotionGate.from_config(config)
         
         # Performance monitoring
-        self.processing_times = []  # Initialize empty list for processing times
         self.max_times_buffer = 30  # Keep last 30 measurements
+        self.processing_times = deque(maxlen=self.max_times_buffer)
+        self.frames_processed = 0
+        self.metrics = camera_metrics(camera_name)
+        self.frames_dropped_seen = 0
+        self.capture_started_at = STARTUP.elapsed()
         
     def calculate_moving_average(self):
         """Calculate moving average of processing times"""
@@ -34,105 +80,201 @@ class MonitoringController:
             return 0
         return sum(self.processing_times) / len(self.processing_times)
     
-    def check_pose_duration(self, pose):
-        """Check if pose has been maintained for required frames"""
-        # Reset counter if pose changed
-        if pose != self.current_pose:
+    def required_duration(self, pose):
+        """Seconds a pose must hold before it is confirmed"""
+        return self.config.snapshot.required_duration[pose]
+    
+    def pose_duration(self, timestamp=None):
+        """Seconds the current pose has been held"""
+        if self.pose_started_at is None:
+            return 0.0
+        return (timestamp or time.time()) - self.pose_started_at
+    
+    def check_pose_duration(self, pose, timestamp=None, track_id=0):
+        """Check if pose has been maintained for the required time"""
+        # Confirmation is measured in capture time, the analysis rate changes with the scheduler
+        timestamp = timestamp or time.time()
+        
+        # Reset timer if pose changed or another person became the target
+        if pose != self.current_pose or track_id != self.current_track_id:
             self.current_pose = pose
-            self.pose_frame_count = 0
+            self.current_track_id = track_id
+            self.pose_started_at = timestamp
             logging.info(f"Pose changed to: {pose}")
             return False
         
-        # Increment frame counter
-        self.pose_frame_count += 1
+        held = self.pose_duration(timestamp)
+        required_duration = self.required_duration(pose)
         
-        # Get required duration from config
-        required_duration = (
-            self.config.config["monitoring"]["pose_confirmation"]["emergency"]
-            if pose == PoseType.LYING.value
-            else self.config.config["monitoring"]["pose_confirmation"]["standard"]
-        )
+        # Log for debugging
+        logging.info(f"Pose: {pose}, Held: {held:.1f}/{required_duration}s")
         
-        # Calculate required frames (now with 10 fps)
-        required_frames = int(required_duration * self.fps)  # 3s * 10fps = 30 frames for sitting
+        return held >= required_duration
+    
+    def reset_state(self):
+        """Forget pose, temporal, tracking and motion state, e.g. between replayed clips"""
+        self.current_pose = None
+        self.current_track_id = None
+        self.pose_started_at = None
+        self.last_temporal = None
+        self.temporal_engine.reset()
+        self.motion_gate.reset()
+        self.pose_service.reset_tracking()
+    
+    def on_config_reload(self, config):
+        """Per-frame tables come from the new snapshot by themselves, the scheduler is rebuilt"""
+        self.fps = config.config["monitoring"]["performance"]["fps"]
+        self.scheduler = AnalysisScheduler.from_config(config)
+    
+    def suspected_fall(self):
+        """Fall flagged by the motion features of the person in the last analysed frame"""
+        return bool(self.last_temporal and self.last_temporal["fall"])
+    
+    def current_risk(self):
+        """Risk level driving the scheduler, None while nobody is in view"""
+        if self.current_pose == PoseType.LYING.value or self.suspected_fall():
+            return self.config.get_risk_level(PoseType.LYING.value)["risk"]
+        if not self.pose_service.person_detected:
+            return None
+        return self.config.get_risk_level(self.current_pose or PoseType.UNKNOWN.value)["risk"]
+    
+    def emit_alert(self, pose, risk_config, frame, captured_at=None):
+        """Hand an alert to the pipeline's alert stage, or straight to Telegram"""
+        # The frame is a pool buffer, copy it only for alerts that won't be throttled
+        if not self.telegram_service.should_alert(self.camera_name):
+            return
+        if self.alert_sink is not None:
+            self.alert_sink(pose, risk_config, frame.copy(), captured_at)
+        else:
+            self.deliver_alert(pose, risk_config, frame.copy(), captured_at)
+    
+    def deliver_alert(self, pose, risk_config, frame, captured_at=None):
+        """Send the alert photo, then follow up with a clip of the event"""
+        queued = self.telegram_service.send_alert(pose, risk_config, frame, camera=self.camera_name)
+        if queued and self.clip_buffer is not None:
+            risk = risk_config["risk"]
+            # Centred on the frame that raised the alert, not on when the alert stage got to it
+            event_time = captured_at or time.time()
+            self.clip_buffer.request_clip(
+                event_time,
+                lambda clip: self.telegram_service.send_clip(
+                    risk, clip, camera=self.camera_name, captured_at=event_time
+                )
+            )
+        return queued
+    
+    def process_frame_internal(self, frame, captured_at=None):
+        if self.pose_service.people is not None:
+            people = self.pose_service.analyze_people(frame, self.metrics, captured_at)
+            return self.handle_people(frame, people, captured_at)
+        landmarks, is_elderly, pose, bbox = self.pose_service.analyze_pose(frame, self.metrics)
+        return self.handle_detection(frame, landmarks, is_elderly, pose, bbox, captured_at)
+    
+    def handle_people(self, frame, people, captured_at=None):
+        """Motion features for every track, then confirmation and alerts for the selected target"""
+        timestamp = captured_at or time.time()
+        for person in people:
+            person["temporal"] = None
+            if person.get("landmarks") is None:
+                continue
+            person["temporal"] = self.temporal_engine.update(
+                person["track_id"], person["landmarks"], person["bbox"], timestamp, frame.shape[0]
+            )
+            # A fall ranks the track as lying before the target is chosen
+            if person["temporal"]["fall"] or person["temporal"]["lying"]:
+                person["pose"] = PoseType.LYING.value
         
-        # Log for debugging
-        logging.info(f"Pose: {pose}, Frames: {self.pose_frame_count}/{required_frames}")
+        target = self.pose_service.select_target(people)
+        if self.render_frame:
+            with self.metrics.time("draw"):
+                self.draw_people(frame, people, target)
         
-        # Check if enough frames have passed
-        return self.pose_frame_count >= required_frames
+        if target is None:
+            return self.handle_detection(frame, None, None, None, None, captured_at)
+        return self.handle_detection(
+            frame, target["landmarks"], target["is_elderly"], target["pose"], target["bbox"], captured_at,
+            track_id=target["track_id"], temporal=target["temporal"]
+        )
     
-    def process_frame_internal(self, frame):
-        landmarks, is_elderly, pose, bbox = self.pose_service.analyze_pose(frame)
+    def handle_detection(self, frame, landmarks, is_elderly, pose, bbox, captured_at=None,
+                         track_id=0, temporal=None):
+        """Temporal confirmation, alerts and overlay for one analysed frame"""
+        if self.recorder is not None:
+            self.recorder.record(captured_at or time.time(), frame.shape, landmarks, bbox)
+        
+        # Streaming motion features turn falls and lying into their own pose
+        # With nobody in view they are dropped, a stale fall would bypass the motion gate for good
+        self.last_temporal = None
+        if landmarks is not None:
+            self.last_temporal = temporal or self.temporal_engine.update(
+                track_id, landmarks, bbox, captured_at or time.time(), frame.shape[0]
+            )
+            if self.last_temporal["fall"] or self.last_temporal["lying"]:
+                pose = PoseType.LYING.value
         
         if is_elderly:
             # Get risk configuration
             risk_config = self.config.get_risk_level(pose.lower())  # Ensure lowercase
             
-            if self.check_pose_duration(pose):
+            if self.check_pose_duration(pose, captured_at, track_id):
                 console.print(Panel.fit(
                     self.config.get_message(f"messages.alerts.{risk_config['risk']}"),
                     border_style=risk_config['color']
                 ))
-                self.telegram_service.send_alert(pose, risk_config, frame.copy())
+                self.emit_alert(pose, risk_config, frame, captured_at)
         
         if landmarks is None:
             return frame, False, False, GenderType.UNKNOWN.value, PoseType.UNKNOWN.value
         
         if is_elderly:
-            x1, y1, x2, y2 = bbox
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            success, _ = self.pose_service.draw_skeleton(frame, landmarks, bbox)
-            
-            required_duration = (
-                self.config.config["monitoring"]["pose_confirmation"]["emergency"]
-                if pose == PoseType.LYING.value
-                else self.config.config["monitoring"]["pose_confirmation"]["standard"]
-            )
-            required_frames = int(required_duration * self.fps)
+            if self.render_frame:
+                with self.metrics.time("draw"):
+                    self.draw_detection(frame, landmarks, pose, bbox, captured_at)
             
-            cv2.putText(
-                frame,
-                f"Idoso - {pose} ({self.pose_frame_count}/{required_frames} frames)",
-                (x1, y1 - 10),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.9,
-                (0, 0, 255),
-                2
-            )
-            
-            if self.check_pose_duration(pose):
+            if self.check_pose_duration(pose, captured_at, track_id):
                 risk_config = self.config.get_risk_level(pose.lower())
                 if pose == PoseType.LYING.value:
                     console.print(Panel.fit(
                         self.config.get_message("messages.alerts.emergency"),
                         border_style="red"
                     ))
-                    self.telegram_service.send_alert(pose, risk_config, frame.copy())
+                    self.emit_alert(pose, risk_config, frame, captured_at)
                 elif pose == PoseType.SITTING.value:
                     console.print(Panel.fit(
                         self.config.get_message("messages.alerts.moderate"),
                         border_style="yellow"
                     ))
-                    self.telegram_service.send_alert(pose, risk_config, frame.copy())
+                    self.emit_alert(pose, risk_config, frame, captured_at)
             
             return frame, True, True, GenderType.MALE.value, pose
             
         return frame, True, False, GenderType.UNKNOWN.value, PoseType.UNKNOWN.value
     
-    def process_frame(self, frame):
+    def process_frame(self, frame, captured_at=None, received_at=None):
+        """
+        Analyse one frame
+        Args:
+            captured_at: Capture timestamp, the clock pose confirmation and motion features run on
+            received_at: Wall-clock arrival when captured_at is media time (offline replay)
+        """
         start_time = time.time()
         
         # Original frame processing
-        frame, is_person, is_elderly, gender, position = self.process_frame_internal(frame)
+        frame, is_person, is_elderly, gender, position = self.process_frame_internal(frame, captured_at)
+        self.frames_processed += 1
+        self.metrics.frames_processed.inc()
+        STARTUP.first_decision(self.camera_name)
+        if (received_at or captured_at) is not None:
+            self.metrics.glass_to_decision.observe(time.time() - (received_at or captured_at))
         
         # Calculate current frame processing time
         current_time = (time.time() - start_time) * 1000  # to milliseconds
         
         # Update moving average
         self.processing_times.append(current_time)
-        if len(self.processing_times) > self.max_times_buffer:
-            self.processing_times.pop(0)
+        
+        if not self.render_frame:
+            return frame, is_person, is_elderly, gender, position
         
         avg_time = self.calculate_moving_average()
         
@@ -159,6 +301,45 @@ class MonitoringController:
         
         return frame, is_person, is_elderly, gender, position
     
+    def draw_detection(self, frame, landmarks, pose, bbox, captured_at=None):
+        """Draw box, skeleton and pose label for the monitored person"""
+        x1, y1, x2, y2 = bbox
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        self.pose_service.draw_skeleton(frame, landmarks, bbox)
+        
+        cv2.putText(
+            frame,
+            f"Idoso - {pose} ({self.pose_duration(captured_at):.1f}/{self.required_duration(pose)}s)",
+            (x1, y1 - 10),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.9,
+            (0, 0, 255),
+            2
+        )
+    
+    def draw_people(self, frame, people, target):
+        """Box and track ID for everyone who is not the monitored person"""
+        for person in people:
+            if person is target and person["is_elderly"]:
+                continue
+            x1, y1, x2, y2 = person["bbox"]
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (160, 160, 160), 1)
+            cv2.putText(
+                frame,
+                f"#{person['track_id']} {person['pose'] or ''}",
+                (x1, y1 - 5),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.5,
+                (160, 160, 160),
+                1
+            )
+    
+    def should_render(self):
+        """Drawing is only worth it for a local window or a connected preview viewer"""
+        if not self.headless:
+            return True
+        return self.preview_channel is not None and self.preview_channel.wants_frame()
+    
     def create_status_table(self, is_person, is_elderly, gender, position="unknown"):
         table = Table(title="Detection Status", show_header=True)
         
@@ -176,62 +357,159 @@ class MonitoringController:
         
         return table
     
-    def has_significant_change(self, frame):
-        """Quick check for frame differences"""
-        if self.previous_frame is None:
-            self.previous_frame = frame.copy()
+    def has_significant_change(self, frame, captured_at=None):
+        """Cheap motion check, static scenes skip YOLO and MediaPipe"""
+        # Never gate away a suspected fall or a person already on the floor
+        if self.current_pose == PoseType.LYING.value or self.suspected_fall():
             return True
-            
-        # Calculate simple difference
-        diff = cv2.absdiff(
-            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY),
-            cv2.cvtColor(self.previous_frame, cv2.COLOR_BGR2GRAY)
-        )
-        
-        # Quick mean calculation
-        mean_diff = np.mean(diff)
+        with self.metrics.time("motion_gate"):
+            changed = self.motion_gate.check(frame, roi=self.pose_service.person_bbox, now=captured_at)
+        if not changed:
+            self.metrics.frames_skipped.inc()
+        return changed
+
+    def record_capture(self, reader, captured_at):
+        """Frame age when it leaves the reader, plus frames the reader threw away"""
+        self.metrics.observe("capture", time.time() - captured_at)
+        if reader.frames_delivered == 1:
+            STARTUP.record(f"{self.camera_name} first frame", self.capture_started_at)
+        dropped = reader.frames_dropped - self.frames_dropped_seen
+        if dropped > 0:
+            self.metrics.frames_dropped.inc(dropped)
+            self.frames_dropped_seen = reader.frames_dropped
+
+    def stop(self):
+        self.running = False
+
+    def run(self, video_source, evidence_source=None):
+        """
+        Monitor a camera until the stream ends or the controller is stopped
+        Args:
+            video_source: Stream analysed frame by frame, usually the low-resolution substream
+            evidence_source: Full-resolution stream only read for alert snapshots
+        """
+        self.capture_started_at = STARTUP.elapsed()
+        snapshot_provider = None
+        if evidence_source and evidence_source != video_source:
+            snapshot_provider = SnapshotProvider.from_config(self.config, evidence_source)
+        if snapshot_provider:
+            snapshot_provider.start()
+            self.telegram_service.register_snapshot_provider(self.camera_name, snapshot_provider)
         
-        # Update previous frame only if different
-        if mean_diff > self.frame_threshold:
-            self.previous_frame = frame.copy()
-            return True
-            
-        return False
+        try:
+            if self.config.config["monitoring"].get("pipeline", {}).get("enabled", False):
+                self.run_pipeline(video_source)
+            else:
+                self.run_loop(video_source)
+        finally:
+            if snapshot_provider:
+                self.telegram_service.unregister_snapshot_provider(self.camera_name)
+                snapshot_provider.stop()
+                logging.info(f"[{self.camera_name}] Evidence stats: {snapshot_provider.get_stats()}")
 
-    def run(self, video_source):
-        cap = cv2.VideoCapture(video_source)
+    def run_loop(self, video_source):
+        """Sequential capture and analysis on the calling thread"""
+        capture_config = self.config.config["monitoring"].get("capture", {})
+        reader = FrameReader(
+            video_source,
+            buffer_size=capture_config.get("buffer_size", 2),
+            reconnect_delay=capture_config.get("reconnect_delay", 2.0),
+            capture_factory=self.capture_factory
+        ).start()
+        window_name = f"Elderly Monitoring System - {self.camera_name}"
+        display = not self.headless
+        self.running = True
+        
+        # Standalone runs start their own preview server, the supervisor shares one
+        owns_preview_server = self.preview_server is None
+        if owns_preview_server:
+            self.preview_server = PreviewServer.from_config(self.config)
+            if self.preview_server:
+                self.preview_server.start()
+                self.preview_channel = self.preview_server.channel(self.camera_name)
         
         try:
-            target_fps = self.config.config["monitoring"]["performance"]["fps"]
-            process_delay = 1.0 / target_fps
             next_process_time = time.time()
             
-            while True:
-                ret, frame = cap.read()
+            while self.running:
+                # Newest frame only, stale ones are dropped by the reader
+                ret, frame, captured_at = reader.read()
                 if not ret:
                     break
+                self.record_capture(reader, captured_at)
                 
                 # Quick resize for comparison
-                resized = cv2.resize(frame, (self.pose_service.display_width, self.pose_service.display_height))
+                resized = self.frame_pool.resize(frame, (self.pose_service.display_width, self.pose_service.display_height))
+                if self.clip_buffer is not None:
+                    self.clip_buffer.add(resized, captured_at)
                 
                 # Skip processing if frame hasn't changed
                 if not self.has_significant_change(resized):
-                    cv2.imshow("Elderly Monitoring System", resized)
+                    if display:
+                        cv2.imshow(window_name, resized)
+                    elif self.preview_channel and self.preview_channel.wants_frame():
+                        self.preview_channel.publish(resized)
                     continue
                 
                 # Process only changed frames
                 if time.time() >= next_process_time:
-                    processed_frame, is_person, is_elderly, gender, position = self.process_frame(resized)
-                    cv2.imshow("Elderly Monitoring System", processed_frame)
-                    next_process_time = time.time() + process_delay
+                    self.render_frame = self.should_render()
+                    processed_frame, is_person, is_elderly, gender, position = self.process_frame(resized, captured_at)
+                    if display:
+                        cv2.imshow(window_name, processed_frame)
+                    if self.render_frame and self.preview_channel:
+                        self.preview_channel.publish(processed_frame)
+                    next_process_time = time.time() + self.scheduler.update(self.current_risk())
+                    reader.set_idle(self.idle_keyframes_only and self.scheduler.idle)
                 
-                if cv2.waitKey(1) & 0xFF == ord('q'):
+                if display and cv2.waitKey(1) & 0xFF == ord('q'):
                     break
                     
         finally:
-            cap.release()
-            cv2.destroyAllWindows()
-            self.telegram_service.stop()
+            self.running = False
+            reader.stop()
+            logging.info(f"[{self.camera_name}] Capture stats: {reader.get_stats()}")
+            logging.info(f"[{self.camera_name}] Pose backend stats: {self.pose_service.backend.get_stats()}")
+            logging.info(f"[{self.camera_name}] Motion gate stats: {self.motion_gate.get_stats()}")
+            logging.info(f"[{self.camera_name}] Stage latency: {self.metrics.summary()}")
+            logging.info(f"[{self.camera_name}] Scheduler stats: {self.scheduler.get_stats()}")
+            if self.recorder is not None:
+                self.recorder.close()
+            if self.clip_buffer is not None:
+                self.clip_buffer.stop()
+                logging.info(f"[{self.camera_name}] Clip buffer stats: {self.clip_buffer.get_stats()}")
+            if display:
+                cv2.destroyAllWindows()
+            if owns_preview_server and self.preview_server:
+                self.preview_server.stop()
+            if self.owns_telegram_service:
+                self.telegram_service.stop()
+
+    def run_pipeline(self, video_source):
+        """Same monitoring loop split into stages that run concurrently"""
+        owns_preview_server = self.preview_server is None
+        if owns_preview_server:
+            self.preview_server = PreviewServer.from_config(self.config)
+            if self.preview_server:
+                self.preview_server.start()
+                self.preview_channel = self.preview_server.channel(self.camera_name)
+
+        try:
+            MonitoringPipeline(self).run(video_source)
+        finally:
+            logging.info(f"[{self.camera_name}] Pose backend stats: {self.pose_service.backend.get_stats()}")
+            logging.info(f"[{self.camera_name}] Motion gate stats: {self.motion_gate.get_stats()}")
+            logging.info(f"[{self.camera_name}] Stage latency: {self.metrics.summary()}")
+            logging.info(f"[{self.camera_name}] Scheduler stats: {self.scheduler.get_stats()}")
+            if self.recorder is not None:
+                self.recorder.close()
+            if self.clip_buffer is not None:
+                self.clip_buffer.stop()
+                logging.info(f"[{self.camera_name}] Clip buffer stats: {self.clip_buffer.get_stats()}")
+            if owns_preview_server and self.preview_server:
+                self.preview_server.stop()
+            if self.owns_telegram_service:
+                self.telegram_service.stop()
 
     def draw_skeleton(self, frame, landmarks):
         """
@@ -0,0 +1,151 @@
+# src/inference.py
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from logger import logging
+
+
+class BatchInferenceEngine:
+    """Collect frames from several callers and run them through one batched YOLO call"""
+
+    def __init__(self, model, max_batch_size: int = 4, max_wait_ms: float = 10, name: str = "yolo",
+                 predict_kwargs: dict = None, producers: int = 1):
+        # A model, or a future of one still loading in the background
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        # Callers block on their frame, so a batch never holds more requests than there are cameras
+        self.producers = max(1, producers)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.name = name
+        self.predict_kwargs = predict_kwargs or {}
+
+        self.requests = queue.Queue()
+        self.thread = None
+        self.running = False
+
+        # Statistics
+        self.stats_lock = threading.Lock()
+        self.batch_sizes = Counter()
+        self.frames_processed = 0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+        self.total_inference_time = 0.0
+
+    def start(self):
+        if self.running:
+            return self
+        self.running = True
+        self.thread = threading.Thread(target=self._worker_loop, name=f"{self.name}-engine", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.requests.put(None)
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+
+    def wait_ready(self, timeout: float = None):
+        """Block until a model handed over as a future has loaded, re-raising its load error"""
+        model = self.model
+        if isinstance(model, Future):
+            model.result(timeout)
+
+    def submit(self, frame) -> Future:
+        """Queue a frame, the future resolves to its YOLO result"""
+        if not self.running:
+            self.start()
+        future = Future()
+        self.requests.put((frame, future, time.time()))
+        return future
+
+    def infer(self, frame):
+        """Blocking single-frame inference through the batch queue"""
+        return self.submit(frame).result()
+
+    def __call__(self, frame):
+        # Same shape as model(frame) so callers can keep indexing [0]
+        return [self.infer(frame)]
+
+    def _collect_batch(self):
+        first = self.requests.get()
+        if first is None:
+            return []
+
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        # Once every camera has a frame in the batch nobody else can join, waiting only adds latency
+        while len(batch) < min(self.max_batch_size, self.producers):
+            remaining = deadline - time.time()
+            try:
+                request = self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self.running = False
+                break
+            batch.append(request)
+        return batch
+
+    def _worker_loop(self):
+        if isinstance(self.model, Future):
+            # Frames submitted while the model loads simply wait in the queue
+            try:
+                self.model = self.model.result()
+            except Exception as e:
+                self._fail_requests(e)
+                return
+
+        while self.running:
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            started_at = time.time()
+            frames = [request[0] for request in batch]
+            try:
+                results = self.model(frames, **self.predict_kwargs)
+            except Exception as e:
+                logging.error(f"Batched {self.name} inference failed: {str(e)}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            finished_at = time.time()
+
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+            with self.stats_lock:
+                self.batch_sizes[len(batch)] += 1
+                self.frames_processed += len(batch)
+                self.total_inference_time += finished_at - started_at
+                for _, _, submitted_at in batch:
+                    wait = started_at - submitted_at
+                    self.total_queue_wait += wait
+                    self.max_queue_wait = max(self.max_queue_wait, wait)
+
+    def _fail_requests(self, error):
+        logging.error(f"{self.name} model unavailable, failing its requests: {str(error)}")
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            request[1].set_exception(error)
+
+    def get_stats(self):
+        """Return batch-size and queue-wait statistics"""
+        with self.stats_lock:
+            batches = sum(self.batch_sizes.values())
+            frames = self.frames_processed
+            return {
+                "batches": batches,
+                "frames": frames,
+                "avg_batch_size": frames / batches if batches else 0,
+                "batch_sizes": dict(self.batch_sizes),
+                "avg_queue_wait_ms": self.total_queue_wait / frames * 1000 if frames else 0,
+                "max_queue_wait_ms": self.max_queue_wait * 1000,
+                "avg_batch_time_ms": self.total_inference_time / batches * 1000 if batches else 0,
+            }
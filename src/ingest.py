@@ -0,0 +1,234 @@
+# src/ingest.py
+import time
+from collections import deque
+from functools import partial
+
+import cv2
+import numpy as np
+
+from buffers import FramePool
+from exceptions import CameraException
+from logger import logging
+
+INGEST_BACKENDS = ("opencv", "pyav")
+
+
+class PyAVCapture:
+    """
+    cv2.VideoCapture-compatible reader on PyAV/FFmpeg
+    Exposes the RTSP transport, demuxer buffering and decoder threads, converts into a
+    small pool of reused BGR buffers, and can skip everything but keyframes while idle.
+    """
+
+    def __init__(self, source, transport: str = "tcp", buffer_size: int = 1024 * 1024,
+                 max_delay: float = 0.5, decoder_threads: int = 0, open_timeout: float = 5.0,
+                 read_timeout: float = 5.0, pool_size: int = 4, options: dict = None):
+        # Optional dependency, only needed when this backend is configured
+        try:
+            import av
+        except ImportError:
+            raise CameraException("PyAV is not installed, pip install av or use capture.backend: opencv",
+                                  device_id=str(source))
+
+        container_options = {}
+        if isinstance(source, str) and "://" in source:
+            # Live streams only, on files nobuffer throws away the frames read while probing
+            container_options.update({
+                "fflags": "nobuffer",
+                "flags": "low_delay",
+                "max_delay": str(int(max_delay * 1_000_000)),
+            })
+        if isinstance(source, str) and source.startswith("rtsp://"):
+            container_options["rtsp_transport"] = transport
+            container_options["buffer_size"] = str(buffer_size)
+        container_options.update({key: str(value) for key, value in (options or {}).items()})
+
+        # Frames handed out stay valid until pool_size newer ones have been decoded
+        self.pool = FramePool(max(2, pool_size))
+        self.yuv = None
+
+        self.keyframes_only = False
+        self.skipping = False
+        self.skipped_since_keyframe = False
+        self.waiting_for_keyframe = False
+
+        # Counters, seconds of the last grab/retrieve split by step
+        self.frames_decoded = 0
+        self.keyframes_decoded = 0
+        self.frames_discarded = 0
+        self.last_timings = {"grab": 0.0, "decode": 0.0, "convert": 0.0}
+
+        self.source = source
+        self.container = None
+        self.stream = None
+        self.packets = None
+        self.frame = None
+        # A packet can decode into several frames, the flush at the end of a file usually does
+        self.decoded = deque()
+        try:
+            self.container = av.open(str(source), options=container_options, timeout=(open_timeout, read_timeout))
+            self.stream = self.container.streams.video[0]
+        except Exception as e:
+            logging.error(f"PyAV could not open {source}: {str(e)}")
+            self.release()
+            return
+
+        codec_context = self.stream.codec_context
+        # Slice and frame threading, 0 lets FFmpeg pick from the core count
+        codec_context.thread_type = "AUTO"
+        codec_context.thread_count = decoder_threads
+        self.packets = self.container.demux(self.stream)
+
+    def isOpened(self):
+        return self.stream is not None
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES and value == 0 and self.isOpened():
+            self.container.seek(0)
+            self.packets = self.container.demux(self.stream)
+            self.decoded.clear()
+            return True
+        # Buffering is configured when opening, the rest of the cv2 properties don't apply
+        return False
+
+    def get(self, prop):
+        if not self.isOpened():
+            return 0.0
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.stream.average_rate or 0)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.stream.codec_context.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.stream.codec_context.height)
+        return 0.0
+
+    def set_keyframes_only(self, enabled: bool):
+        """Decode only keyframes, P/B frames are dropped before they reach the decoder"""
+        self.keyframes_only = enabled
+
+    def _apply_skip_mode(self):
+        if self.keyframes_only == self.skipping:
+            return
+        self.skipping = self.keyframes_only
+        self.stream.codec_context.skip_frame = "NONKEY" if self.skipping else "DEFAULT"
+        if not self.skipping and self.skipped_since_keyframe:
+            # Frames until the next keyframe would reference ones never decoded
+            self.waiting_for_keyframe = True
+
+    def grab(self):
+        """Read and decode the next frame without converting it"""
+        if not self.isOpened():
+            return False
+        self._apply_skip_mode()
+        grab_time = 0.0
+        decode_time = 0.0
+        try:
+            while True:
+                while self.decoded:
+                    frame = self.decoded.popleft()
+                    if frame.key_frame:
+                        self.keyframes_decoded += 1
+                        self.skipped_since_keyframe = False
+                        self.waiting_for_keyframe = False
+                    elif self.waiting_for_keyframe:
+                        self.frames_discarded += 1
+                        continue
+                    self.frame = frame
+                    self.frames_decoded += 1
+                    self.last_timings = {"grab": grab_time, "decode": decode_time, "convert": 0.0}
+                    return True
+
+                start_time = time.perf_counter()
+                packet = next(self.packets)
+                grab_time += time.perf_counter() - start_time
+                if self.skipping and packet.size and not packet.is_keyframe:
+                    self.skipped_since_keyframe = True
+
+                # The empty packet the demuxer ends with flushes the frames still in the decoder
+                start_time = time.perf_counter()
+                self.decoded.extend(packet.decode())
+                decode_time += time.perf_counter() - start_time
+        except StopIteration:
+            return False
+        except Exception as e:
+            logging.warning(f"PyAV read failed on {self.source}: {str(e)}")
+            return False
+
+    def retrieve(self):
+        """Convert the grabbed frame to BGR into the next pool buffer"""
+        if self.frame is None:
+            return False, None
+        start_time = time.perf_counter()
+        image = self._convert(self.frame)
+        self.last_timings["convert"] = time.perf_counter() - start_time
+        return True, image
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def _convert(self, frame):
+        height, width = frame.height, frame.width
+        if frame.format.name not in ("yuv420p", "yuvj420p") or width % 2 or height % 2:
+            return frame.to_ndarray(format="bgr24")
+
+        # Pack the padded planes into one reused I420 buffer and let OpenCV convert into the pool
+        if self.yuv is None or self.yuv.shape != (height * 3 // 2, width):
+            self.yuv = np.empty((height * 3 // 2, width), dtype=np.uint8)
+        flat = self.yuv.reshape(-1)
+        offset = 0
+        for plane, (plane_height, plane_width) in zip(
+            frame.planes, ((height, width), (height // 2, width // 2), (height // 2, width // 2))
+        ):
+            source = np.frombuffer(plane, dtype=np.uint8, count=plane.line_size * plane_height)
+            source = source.reshape(plane_height, plane.line_size)[:, :plane_width]
+            np.copyto(flat[offset:offset + plane_height * plane_width].reshape(plane_height, plane_width), source)
+            offset += plane_height * plane_width
+
+        bgr = self.pool.next((height, width, 3))
+        cv2.cvtColor(self.yuv, cv2.COLOR_YUV2BGR_I420, dst=bgr)
+        return bgr
+
+    def release(self):
+        if self.container is not None:
+            self.container.close()
+        self.container = None
+        self.stream = None
+        self.packets = None
+
+    def get_stats(self):
+        return {
+            "frames_decoded": self.frames_decoded,
+            "keyframes_decoded": self.keyframes_decoded,
+            "frames_discarded": self.frames_discarded,
+            "keyframes_only": self.keyframes_only,
+        }
+
+
+def capture_factory(config):
+    """
+    Callable opening a video source with the configured ingest backend
+    Returns:
+        callable: source -> object with the cv2.VideoCapture read/isOpened/set/release interface
+    """
+    capture_config = config.config["monitoring"].get("capture", {})
+    backend = capture_config.get("backend", "opencv")
+    if backend not in INGEST_BACKENDS:
+        raise CameraException(f"Unknown ingest backend: {backend}")
+    if backend == "opencv":
+        return cv2.VideoCapture
+
+    pyav_config = capture_config.get("pyav", {})
+    return partial(
+        PyAVCapture,
+        transport=pyav_config.get("transport", "tcp"),
+        buffer_size=pyav_config.get("buffer_size", 1024 * 1024),
+        max_delay=pyav_config.get("max_delay", 0.5),
+        decoder_threads=pyav_config.get("decoder_threads", 0),
+        open_timeout=pyav_config.get("open_timeout", 5.0),
+        read_timeout=pyav_config.get("read_timeout", 5.0),
+        # The reader ring and the frame being analysed must never share a buffer
+        pool_size=capture_config.get("buffer_size", 2) + 2,
+        options=pyav_config.get("options")
+    )
@@ -0,0 +1,176 @@
+# src/landmarks.py
+import numpy as np
+
+# MediaPipe Pose topology, kept here so drawing doesn't need mediapipe loaded
+NUM_LANDMARKS = 33
+
+POSE_CONNECTIONS = [
+    (0, 1), (1, 2), (2, 3), (3, 7), (0, 4), (4, 5), (5, 6), (6, 8), (9, 10),
+    (11, 12), (11, 13), (13, 15), (15, 17), (15, 19), (15, 21), (17, 19),
+    (12, 14), (14, 16), (16, 18), (16, 20), (16, 22), (18, 20),
+    (11, 23), (12, 24), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28),
+    (27, 29), (28, 30), (29, 31), (30, 32), (27, 31), (28, 32),
+]
+
+# For every MediaPipe landmark, the COCO-17 keypoint that stands in for it
+COCO_FOR_MEDIAPIPE = np.array([
+    0,              # nose
+    1, 1, 1,        # left eye inner/center/outer
+    2, 2, 2,        # right eye inner/center/outer
+    3, 4,           # ears
+    0, 0,           # mouth
+    5, 6, 7, 8, 9, 10,          # shoulders, elbows, wrists
+    9, 10, 9, 10, 9, 10,        # pinky, index, thumb
+    11, 12, 13, 14, 15, 16,     # hips, knees, ankles
+    15, 16, 15, 16,             # heels, foot index
+])
+
+# MediaPipe landmarks that have an exact COCO counterpart, the rest are approximations
+EXACT_MEDIAPIPE = np.zeros(NUM_LANDMARKS, dtype=bool)
+EXACT_MEDIAPIPE[[0, 2, 5, 7, 8, 11, 12, 13, 14, 15, 16, 23, 24, 25, 26, 27, 28]] = True
+
+
+# Landmark indexes used by the pose features
+NOSE = 0
+LEFT_EAR = 7
+RIGHT_EAR = 8
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_ELBOW = 13
+RIGHT_ELBOW = 14
+LEFT_WRIST = 15
+RIGHT_WRIST = 16
+LEFT_HIP = 23
+RIGHT_HIP = 24
+LEFT_KNEE = 25
+RIGHT_KNEE = 26
+LEFT_ANKLE = 27
+RIGHT_ANKLE = 28
+
+# Joint angles as (first, vertex, last) landmark triplets
+JOINT_NAMES = (
+    "left_elbow", "right_elbow", "left_shoulder", "right_shoulder",
+    "left_hip", "right_hip", "left_knee", "right_knee",
+)
+JOINT_TRIPLETS = np.array([
+    (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST),
+    (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST),
+    (LEFT_ELBOW, LEFT_SHOULDER, LEFT_HIP),
+    (RIGHT_ELBOW, RIGHT_SHOULDER, RIGHT_HIP),
+    (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE),
+    (RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE),
+    (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE),
+    (RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE),
+])
+
+# Standing adult is ~7-8 head heights tall, sitting adult is ~4-5
+STANDING_HEAD_HEIGHTS = 5.5
+ELDERLY_POSTURE_BEND = 0.15
+
+
+def to_array(landmarks):
+    """
+    Convert landmarks into a contiguous (33, 4) float32 array of x, y, z, visibility
+    MediaPipe protobufs are read once here, arrays are passed through untouched.
+    """
+    if landmarks is None:
+        return None
+    if isinstance(landmarks, np.ndarray):
+        return np.ascontiguousarray(landmarks, dtype=np.float32)
+    return np.array(
+        [(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks.landmark],
+        dtype=np.float32
+    )
+
+
+def calculate_angles(point1, point2, point3):
+    """Angle at point2 in degrees, for any number of (..., 2+) point arrays"""
+    vector1 = point1[..., :2] - point2[..., :2]
+    vector2 = point3[..., :2] - point2[..., :2]
+
+    norms = np.linalg.norm(vector1, axis=-1) * np.linalg.norm(vector2, axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cosine_angle = np.sum(vector1 * vector2, axis=-1) / norms
+    return np.degrees(np.arccos(np.clip(cosine_angle, -1.0, 1.0)))
+
+
+def pose_features(landmarks):
+    """
+    Compute every pose feature in one vectorized pass
+    Args:
+        landmarks: (33, 4) array, or (N, 33, 4) for many people or frames
+    Returns:
+        dict: Feature arrays shaped like the leading dimensions of the input
+    """
+    x = landmarks[..., 0]
+    y = landmarks[..., 1]
+
+    # Head size (average of width and height)
+    head_width = np.abs(x[..., LEFT_EAR] - x[..., RIGHT_EAR])
+    head_height = np.abs((y[..., LEFT_EAR] + y[..., RIGHT_EAR]) / 2 - y[..., NOSE])
+    head_size = (head_width + head_height) / 2
+
+    shoulder_y = (y[..., LEFT_SHOULDER] + y[..., RIGHT_SHOULDER]) / 2
+    hip_y = (y[..., LEFT_HIP] + y[..., RIGHT_HIP]) / 2
+    ankle_y = (y[..., LEFT_ANKLE] + y[..., RIGHT_ANKLE]) / 2
+
+    # Body segments in terms of head sizes
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shoulder_to_hip = np.abs(shoulder_y - hip_y) / head_size
+        hip_to_ankle = np.abs(hip_y - ankle_y) / head_size
+
+    shoulder_width = np.abs(x[..., RIGHT_SHOULDER] - x[..., LEFT_SHOULDER])
+    hip_width = np.abs(x[..., RIGHT_HIP] - x[..., LEFT_HIP])
+
+    # Torso inclination from vertical, 0 upright and 90 horizontal
+    shoulder_mid = (landmarks[..., LEFT_SHOULDER, :2] + landmarks[..., RIGHT_SHOULDER, :2]) / 2
+    hip_mid = (landmarks[..., LEFT_HIP, :2] + landmarks[..., RIGHT_HIP, :2]) / 2
+    torso = shoulder_mid - hip_mid
+    torso_inclination = np.degrees(np.arctan2(np.abs(torso[..., 0]), np.abs(torso[..., 1])))
+
+    joints = landmarks[..., JOINT_TRIPLETS, :]
+    angles = calculate_angles(joints[..., 0, :], joints[..., 1, :], joints[..., 2, :])
+
+    return {
+        "head_size": head_size,
+        "shoulder_to_hip": shoulder_to_hip,
+        "hip_to_ankle": hip_to_ankle,
+        "total_height_heads": shoulder_to_hip + hip_to_ankle,
+        "posture_bend": np.abs(y[..., LEFT_SHOULDER] - y[..., LEFT_HIP]),
+        "shoulder_width": shoulder_width,
+        "hip_width": hip_width,
+        "shoulder_hip_ratio": shoulder_width / (hip_width + 1e-6),
+        "torso_inclination": torso_inclination,
+        "joint_angles": angles,
+    }
+
+
+def classify_poses(features, standing_head_heights: float = STANDING_HEAD_HEIGHTS):
+    """Standing/sitting labels for every entry of a pose_features result"""
+    return np.where(features["total_height_heads"] > standing_head_heights, "standing", "sitting")
+
+
+def classify_elderly(features, posture_bend: float = ELDERLY_POSTURE_BEND):
+    """Elderly flags for every entry of a pose_features result"""
+    return features["posture_bend"] > posture_bend
+
+
+def from_coco_keypoints(keypoints, bbox):
+    """
+    Map YOLOv8-pose COCO-17 keypoints into the MediaPipe 33-landmark layout
+    Args:
+        keypoints: (17, 3) array of pixel x, y and confidence
+        bbox: Person box the landmarks are normalized to, like a MediaPipe crop
+    Returns:
+        np.ndarray: (33, 4) landmarks relative to the bbox crop
+    """
+    x1, y1, x2, y2 = bbox
+    width = max(x2 - x1, 1)
+    height = max(y2 - y1, 1)
+
+    mapped = np.asarray(keypoints, dtype=np.float32)[COCO_FOR_MEDIAPIPE]
+    landmarks = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+    landmarks[:, 0] = (mapped[:, 0] - x1) / width
+    landmarks[:, 1] = (mapped[:, 1] - y1) / height
+    landmarks[:, 3] = np.where(EXACT_MEDIAPIPE, mapped[:, 2], 0.0)
+    return landmarks
@@ -0,0 +1,414 @@
+# src/latency_harness.py
+"""
+Headless glass-to-alert latency harness
+
+Every frame gets its ID painted into a strip along the top edge when it is created, then
+goes through the real capture thread, motion gate, scheduler, pose backend, temporal
+confirmation and alerting of MonitoringController. Reading the ID back where the pose is
+decided and where the alert is queued gives the latency of each frame, with no camera,
+screen or Telegram involved:
+
+    python src/latency_harness.py --duration 30 --fps 15
+    python src/latency_harness.py --source data/clips/fall.mp4 --pipeline --output latency.json
+    python src/latency_harness.py --landmarks data/recordings/bedroom_20260101_080000.poserec
+
+With --landmarks the pose backend serves recorded landmarks instead of running the models,
+which also exercises the alert path on synthetic frames.
+"""
+import argparse
+import copy
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+from rich.table import Table
+
+from config import Config
+from controller import MonitoringController
+from logger import setup_logging, logging, console
+from pose_backends import PoseBackend
+from recording import load_recording
+from service import NullNotifier, PoseService, load_models, wait_for_models
+from startup import STARTUP
+
+# 24-bit frame ID plus an 8-bit check, one cell per bit along the top edge
+ID_BITS = 24
+CHECK_BITS = 8
+CELLS = ID_BITS + CHECK_BITS
+ID_MASK = (1 << ID_BITS) - 1
+STRIP_FRACTION = 1 / 24
+
+PERCENTILES = (50, 95, 99)
+
+
+def _check(frame_id: int) -> int:
+    # Never 0 for any ID, so an all-black strip doesn't decode
+    return (frame_id % 251) ^ 0xA5
+
+
+def encode_frame_id(frame, frame_id: int):
+    """Paint the frame ID as black and white cells across the top of the frame"""
+    height, width = frame.shape[:2]
+    strip = max(4, int(height * STRIP_FRACTION))
+    frame_id &= ID_MASK
+    bits = frame_id | (_check(frame_id) << ID_BITS)
+    edges = np.linspace(0, width, CELLS + 1).astype(int)
+    for cell in range(CELLS):
+        frame[:strip, edges[cell]:edges[cell + 1]] = 255 if (bits >> cell) & 1 else 0
+    return frame
+
+
+def decode_frame_id(frame):
+    """
+    Read back the ID painted by encode_frame_id, the strip scales with the frame so resized copies work
+    Returns:
+        int: Frame ID, or None when the strip is missing or damaged
+    """
+    height, width = frame.shape[:2]
+    strip = max(4, int(height * STRIP_FRACTION))
+    centers = ((np.arange(CELLS) + 0.5) * width / CELLS).astype(int)
+    row = frame[strip // 2, centers]
+    set_bits = (row.mean(axis=1) if row.ndim == 2 else row) > 127
+    bits = int(np.dot(set_bits.astype(np.int64), np.left_shift(1, np.arange(CELLS, dtype=np.int64))))
+    frame_id = bits & ID_MASK
+    if bits >> ID_BITS != _check(frame_id):
+        return None
+    return frame_id
+
+
+class FrameLedger:
+    """Creation, capture, decision and alert times of every stamped frame"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.created = {}
+        self.captured = {}
+        self.decided = {}
+        self.alerted = {}
+        self.undecodable = 0
+
+    def create(self) -> int:
+        with self.lock:
+            frame_id = self.next_id
+            self.next_id += 1
+            self.created[frame_id] = time.time()
+        return frame_id
+
+    def mark(self, table: dict, frame, timestamp: float = None):
+        """Note the first time a frame reaches a point of the pipeline"""
+        now = time.time() if timestamp is None else timestamp
+        frame_id = decode_frame_id(frame)
+        with self.lock:
+            if frame_id is None or frame_id not in self.created:
+                self.undecodable += 1
+                return None
+            table.setdefault(frame_id, now)
+        return frame_id
+
+    def latencies(self, start: dict, end: dict, since: float = 0.0):
+        """Seconds from one point to another for frames created after `since`"""
+        with self.lock:
+            return np.array([
+                end[frame_id] - start[frame_id]
+                for frame_id in end
+                if frame_id in start and self.created[frame_id] >= since
+            ])
+
+
+class StampedCapture:
+    """cv2.VideoCapture stand-in that paces frames like a camera and stamps each with a new ID"""
+
+    def __init__(self, ledger: FrameLedger, source: str = None, fps: float = 15.0, size=(1280, 720)):
+        self.ledger = ledger
+        self.interval = 1.0 / fps
+        self.width, self.height = size
+        self.clip = cv2.VideoCapture(source) if source else None
+        self.frame_index = 0
+        self.next_frame_time = None
+        if self.clip is None:
+            # Textured background so the motion gate sees sensor-like noise
+            rng = np.random.default_rng(0)
+            self.background = rng.integers(90, 110, (self.height, self.width, 3), dtype=np.uint8)
+
+    def isOpened(self):
+        return self.clip is None or self.clip.isOpened()
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        if self.clip is not None:
+            self.clip.release()
+
+    def read(self):
+        now = time.perf_counter()
+        if self.next_frame_time is None:
+            self.next_frame_time = now
+        delay = self.next_frame_time - now
+        if delay > 0:
+            time.sleep(delay)
+        self.next_frame_time += self.interval
+
+        frame = self._source_frame()
+        if frame is None:
+            return False, None
+        self.frame_index += 1
+        return True, encode_frame_id(frame, self.ledger.create())
+
+    def _source_frame(self):
+        if self.clip is None:
+            # A block pacing back and forth across the room keeps the motion gate open
+            frame = self.background.copy()
+            block_width = self.width // 8
+            span = self.width - block_width
+            x = abs((self.frame_index * self.width // 32) % (2 * span) - span)
+            top = self.height // 3
+            frame[top:top + self.height // 2, x:x + block_width] = (40, 60, 200)
+            return frame
+
+        ret, frame = self.clip.read()
+        if not ret:
+            # Clips loop so runs last as long as asked
+            self.clip.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.clip.read()
+        return frame if ret else None
+
+
+class RecordedPoseBackend(PoseBackend):
+    """Serves landmarks from a recording in a loop, the pose path without any model"""
+    name = "recorded"
+    stateful_detect = True
+
+    def __init__(self, service, records, latency_window: int = 300):
+        super().__init__(service, latency_window)
+        self.records = records
+        self.index = 0
+
+    def detect(self, frame):
+        record = self.records[self.index % len(self.records)]
+        self.index += 1
+        if not record["has_person"]:
+            return None
+        return record
+
+    def estimate_pose(self, frame, record):
+        return record["landmarks"].astype(np.float32), tuple(int(v) for v in record["bbox"])
+
+    def detect_people(self, frame):
+        # The recording holds the monitored person only, served as one confident box
+        record = self.detect(frame)
+        if record is None:
+            return np.empty((0, 4)), np.empty(0), []
+        return np.array([record["bbox"]]), np.ones(1), [record]
+
+    def estimate_poses(self, frame, people):
+        return [person["detection"]["landmarks"].astype(np.float32) for person in people]
+
+
+class HarnessNotifier(NullNotifier):
+    """Offline notifier that notes when each frame's alert is queued"""
+
+    def __init__(self, ledger: FrameLedger):
+        super().__init__()
+        self.ledger = ledger
+
+    def send_alert(self, pose, frame_or_risk_config, frame=None, camera="default"):
+        if frame is not None:
+            self.ledger.mark(self.ledger.alerted, frame)
+        return super().send_alert(pose, frame_or_risk_config, frame, camera)
+
+
+def harness_config(config: Config, args):
+    """Copy of the config with nothing interactive and nothing leaving the machine"""
+    raw = copy.deepcopy(config.config)
+    monitoring = raw["monitoring"]
+    monitoring.setdefault("display", {})["headless"] = True
+    monitoring.setdefault("preview", {})["enabled"] = False
+    monitoring.setdefault("recording", {})["enabled"] = False
+    monitoring.setdefault("clips", {})["enabled"] = False
+    monitoring.setdefault("startup", {})["report"] = False
+    if args.no_motion_gate:
+        # A zero keep-alive lets every frame through the gate
+        monitoring.setdefault("motion_gate", {})["max_skip_seconds"] = 0
+    if args.pipeline:
+        monitoring.setdefault("pipeline", {})["enabled"] = True
+    if args.landmarks:
+        # yolo_pose has nothing to load, the recorded backend replaces it
+        monitoring.setdefault("pose", {})["backend"] = "yolo_pose"
+    return config.derive(raw)
+
+
+def instrument(controller: MonitoringController, ledger: FrameLedger):
+    """Note the decision time of every frame where the pose reaches temporal confirmation"""
+    handle_detection = controller.handle_detection
+
+    def timed_handle_detection(frame, landmarks, is_elderly, pose, bbox, captured_at=None, **kwargs):
+        frame_id = ledger.mark(ledger.decided, frame)
+        if frame_id is not None and captured_at is not None:
+            with ledger.lock:
+                ledger.captured.setdefault(frame_id, captured_at)
+        return handle_detection(frame, landmarks, is_elderly, pose, bbox, captured_at, **kwargs)
+
+    controller.handle_detection = timed_handle_detection
+
+
+def summarize(latencies):
+    if not len(latencies):
+        return {"count": 0}
+    summary = {"count": int(len(latencies))}
+    for percentile in PERCENTILES:
+        summary[f"p{percentile}_ms"] = float(np.percentile(latencies, percentile) * 1000)
+    summary["max_ms"] = float(latencies.max() * 1000)
+    return summary
+
+
+def run_harness(config: Config, args):
+    """
+    Stream stamped frames through a controller for the requested duration
+    Returns:
+        dict: Frame accounting, per-frame latency distributions and the controller's stage latencies
+    """
+    ledger = FrameLedger()
+    notifier = HarnessNotifier(ledger)
+
+    models = None
+    if args.landmarks:
+        _, records = load_recording(args.landmarks)
+        if not len(records):
+            raise ValueError(f"{args.landmarks} has no records")
+        pose_service = PoseService(config, models={"person_model": None, "pose_model": None})
+        pose_service.backend = RecordedPoseBackend(pose_service, records)
+    else:
+        models = load_models(config)
+        # Model loading is a startup cost, not part of the frame latency
+        wait_for_models(models)
+        pose_service = PoseService(config, models=models)
+
+    controller = MonitoringController(
+        config,
+        camera_name="latency-harness",
+        telegram_service=notifier,
+        pose_service=pose_service,
+        headless=True
+    )
+    size = (args.width, args.height)
+    controller.capture_factory = lambda source: StampedCapture(ledger, args.source, args.fps, size)
+    instrument(controller, ledger)
+
+    started_at = time.time()
+    measure_from = started_at + args.warmup
+    timer = threading.Timer(args.warmup + args.duration, controller.stop)
+    timer.start()
+    try:
+        controller.run(args.source or "synthetic")
+    finally:
+        timer.cancel()
+        if models:
+            for engine in models.values():
+                engine.stop()
+
+    with ledger.lock:
+        created = sum(1 for created_at in ledger.created.values() if created_at >= measure_from)
+        decided = sum(1 for frame_id in ledger.decided if ledger.created[frame_id] >= measure_from)
+        alerted = sum(1 for frame_id in ledger.alerted if ledger.created[frame_id] >= measure_from)
+
+    return {
+        "frames": {
+            "created": created,
+            "analysed": decided,
+            "not_analysed": created - decided,
+            "alerts": alerted,
+            "undecodable": ledger.undecodable,
+        },
+        "latency": {
+            "source_to_capture": summarize(ledger.latencies(ledger.created, ledger.captured, measure_from)),
+            "capture_to_decision": summarize(ledger.latencies(ledger.captured, ledger.decided, measure_from)),
+            "glass_to_decision": summarize(ledger.latencies(ledger.created, ledger.decided, measure_from)),
+            "glass_to_alert_queued": summarize(ledger.latencies(ledger.created, ledger.alerted, measure_from)),
+        },
+        "stages": controller.metrics.summary(),
+    }
+
+
+def create_latency_table(report):
+    frames = report["frames"]
+    table = Table(
+        title=f"Frame latency - {frames['analysed']}/{frames['created']} frames analysed, "
+              f"{frames['alerts']} alerts queued",
+        show_header=True
+    )
+    table.add_column("Path", style="blue")
+    table.add_column("Frames", style="green")
+    for percentile in PERCENTILES:
+        table.add_column(f"p{percentile} ms", style="yellow")
+    table.add_column("max ms", style="red")
+
+    # The controller's own glass_to_decision is covered by the per-frame one
+    stages = {stage: stats for stage, stats in report["stages"].items() if stage not in report["latency"]}
+    for path, stats in list(report["latency"].items()) + list(stages.items()):
+        if not stats.get("count"):
+            continue
+        table.add_row(
+            path,
+            str(stats["count"]),
+            *(f"{stats[f'p{percentile}_ms']:.1f}" for percentile in PERCENTILES),
+            f"{stats['max_ms']:.1f}" if "max_ms" in stats else ""
+        )
+    return table
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure per-frame latency through the monitoring controller")
+    parser.add_argument("--source", help="Clip to stamp and loop, synthetic frames when omitted")
+    parser.add_argument("--landmarks", help="Serve poses from a .poserec recording instead of the models")
+    parser.add_argument("--fps", type=float, default=15, help="Rate the source produces frames at")
+    parser.add_argument("--width", type=int, default=1280, help="Synthetic frame width")
+    parser.add_argument("--height", type=int, default=720, help="Synthetic frame height")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds measured")
+    parser.add_argument("--warmup", type=float, default=3, help="Seconds run before measuring")
+    parser.add_argument("--pipeline", action="store_true", help="Use the staged pipeline")
+    parser.add_argument("--no-motion-gate", action="store_true", help="Analyse every frame the scheduler allows")
+    parser.add_argument("--config", default="config/config.yaml", help="Base configuration")
+    parser.add_argument("--output", help="Write the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Keep per-frame logging and alert panels")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    load_dotenv()
+    setup_logging()
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        console.quiet = True
+
+    config = Config(config_path=args.config, lang=os.getenv("LANGUAGE", "pt"))
+    config = harness_config(config, args)
+    STARTUP.configure(config)
+
+    report = run_harness(config, args)
+
+    console.quiet = False
+    console.print(create_latency_table(report))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "source": args.source or "synthetic",
+                "landmarks": args.landmarks,
+                "fps": args.fps,
+                "pipeline": args.pipeline,
+                **report,
+            }, f, indent=2)
+        logging.info(f"Latency report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
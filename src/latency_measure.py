@@ -1,6 +1,6 @@
+import argparse
 import cv2
 import numpy as np
-import pygame
 import time
 import platform
 import psutil
@@ -10,6 +10,7 @@ import threading
 import os
 from queue import Queue
 from utils import get_video_source
+from ingest import INGEST_BACKENDS, PyAVCapture
 import sys
 
 delay = 3  # Delay inicial para o teste
@@ -70,6 +71,7 @@ def get_network_info():
 
 def flash_screen():
     """Create brighter, longer flashes"""
+    import pygame
     pygame.init()
     screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
     timestamps = []
@@ -171,35 +173,85 @@ def camera_thread(cap, detections, flash_times, stop_event):
                 stop_event.set()
                 break
 
-def measure_camera_latency(video_source, num_frames=100):
-    cap = cv2.VideoCapture(video_source)
+def open_capture(video_source, backend="opencv"):
+    """Open a source with one of the ingest backends"""
+    if backend == "pyav":
+        return PyAVCapture(video_source)
+    return cv2.VideoCapture(video_source)
+
+def measure_camera_latency(video_source, num_frames=100, backend="opencv"):
+    """
+    Time grab, decode and BGR conversion per frame
+    OpenCV decodes inside grab(), so its decode time is part of grab. PyAV reports the
+    packet read and the decode separately.
+    Returns:
+        Tuple(float, list, dict): Average acquisition time, per-frame times and per-step times in seconds
+    """
+    cap = open_capture(video_source, backend)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open {video_source} with {backend}")
     acquisition_times = []
+    steps = {"grab": [], "decode": [], "convert": []}
     
     for _ in range(num_frames):
         # Start timing before grab()
-        start_time = time.time()
+        start_time = time.perf_counter()
         
-        # grab() only gets the frame from camera buffer
+        # grab() gets the next frame from the stream
         grabbed = cap.grab()
+        grab_time = time.perf_counter() - start_time
         if not grabbed:
             break
             
-        # retrieve() decodes the frame
+        # retrieve() converts it to a BGR array
+        convert_start = time.perf_counter()
         ret, frame = cap.retrieve()
+        convert_time = time.perf_counter() - convert_start
         
         # Calculate acquisition time
-        acquisition_time = time.time() - start_time
-        acquisition_times.append(acquisition_time)
+        acquisition_times.append(time.perf_counter() - start_time)
+        if backend == "pyav":
+            steps["grab"].append(cap.last_timings["grab"])
+            steps["decode"].append(cap.last_timings["decode"])
+        else:
+            steps["grab"].append(grab_time)
+        steps["convert"].append(convert_time)
     
     cap.release()
+    if not acquisition_times:
+        raise RuntimeError(f"No frames read from {video_source} with {backend}")
     
     # Calculate statistics
     avg_acquisition = sum(acquisition_times) / len(acquisition_times)
-    print(f"\n--- Camera Acquisition Test ---")
+    print(f"\n--- Camera Acquisition Test ({backend}) ---")
     print(f"Average acquisition time (s): {avg_acquisition:.4f}")
-    print(f"Individual times (s): {acquisition_times}")
+    for step, times in steps.items():
+        if times:
+            print(f"Average {step} time (ms): {sum(times) / len(times) * 1000:.2f}")
+    
+    return avg_acquisition, acquisition_times, steps
+
+def compare_ingest_backends(video_source, backends=INGEST_BACKENDS, num_frames=300):
+    """
+    Run the acquisition test with every ingest backend on the same source
+    A local file works as a stand-in camera, or a clip served by ffmpeg:
+        ffmpeg -re -stream_loop -1 -i clip.mp4 -c copy -f mpegts udp://127.0.0.1:5000
+    """
+    results = {}
+    for backend in backends:
+        _, acquisition_times, steps = measure_camera_latency(video_source, num_frames, backend)
+        results[backend] = {"total": acquisition_times, **steps}
     
-    return avg_acquisition, acquisition_times
+    print("\n--- Ingest Backend Comparison (ms) ---")
+    print(f"{'Backend':<10}{'Frames':>8}{'Grab p50':>10}{'Decode p50':>12}{'Convert p50':>13}{'Total p50':>11}{'Total p95':>11}")
+    for backend, times in results.items():
+        def p50(values):
+            return f"{np.percentile(values, 50) * 1000:.2f}" if values else "-"
+        print(
+            f"{backend:<10}{len(times['total']):>8}{p50(times['grab']):>10}{p50(times['decode']):>12}"
+            f"{p50(times['convert']):>13}{p50(times['total']):>11}{np.percentile(times['total'], 95) * 1000:>11.2f}"
+        )
+    return results
 
 def print_results(latencies, system_info, network_info):
     """Print test results with millisecond latency"""
@@ -317,5 +369,17 @@ def main():
     cap.release()
     cv2.destroyAllWindows()
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Camera latency tests")
+    parser.add_argument("--compare-ingest", metavar="SOURCE",
+                        help="Compare ingest backends on a file or stream instead of the screen-flash test")
+    parser.add_argument("--backends", nargs="+", default=list(INGEST_BACKENDS), choices=INGEST_BACKENDS)
+    parser.add_argument("--frames", type=int, default=300, help="Frames read per backend")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    if args.compare_ingest:
+        compare_ingest_backends(args.compare_ingest, args.backends, args.frames)
+    else:
+        main()
\ No newline at end of file
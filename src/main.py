@@ -1,22 +1,73 @@
 # src/main.py
+# Imported first so the startup clock covers every other import
+from startup import STARTUP
 from dotenv import load_dotenv
 from controller import MonitoringController
-from logger import setup_logging
-from config import Config
+from supervisor import CameraSupervisor
+from metrics import MetricsServer
+from logger import setup_logging, logging, console
+from exceptions import CameraException
+from config import Config, ConfigWatcher
+from utils import get_video_sources
 
 
+import argparse
 import os
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Elderly monitoring system")
+    parser.add_argument(
+        "--supervisor",
+        action="store_true",
+        help="Run one pipeline per camera listed under monitoring.cameras"
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="No window and no drawing, use monitoring.preview for an on-demand MJPEG view"
+    )
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     load_dotenv()
     setup_logging()
+    STARTUP.record("imports", 0.0)
+    
+    with STARTUP.phase("config"):
+        config = Config(lang=os.getenv("LANGUAGE"))
+    STARTUP.configure(config)
     
-    config = Config(lang=os.getenv("LANGUAGE"))
-    controller = MonitoringController(config)
+    # One /metrics endpoint for the whole process, cameras are told apart by label
+    metrics_server = MetricsServer.from_config(config)
+    if metrics_server:
+        metrics_server.start()
     
-    video_source = get_video_source()
+    config_watcher = ConfigWatcher.from_config(config)
+    if config_watcher:
+        config_watcher.start()
     
-    controller.run(video_source)
+    try:
+        if args.supervisor:
+            CameraSupervisor(config).run()
+            return
+        
+        # Models keep loading in the background after this returns
+        with STARTUP.phase("services"):
+            controller = MonitoringController(config, headless=args.headless or None)
+        
+        video_source, evidence_source = get_video_sources(config)
+        
+        controller.run(video_source, evidence_source)
+    except CameraException as e:
+        logging.error(str(e))
+        console.print(f"[red]{e.message}[/red]")
+        raise SystemExit(1)
+    finally:
+        if config_watcher:
+            config_watcher.stop()
+        if metrics_server:
+            metrics_server.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
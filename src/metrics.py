@@ -0,0 +1,263 @@
+# src/metrics.py
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from logger import logging
+
+# Latency buckets in seconds, from sub-millisecond steps up to a stalled stream
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.015, 0.02, 0.03, 0.04, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0
+)
+
+# "alert" runs from queueing to the photo being delivered, "clip" from the capture of the frame that raised it
+STAGES = ("capture", "motion_gate", "detect", "pose", "classify", "draw", "alert", "clip")
+
+
+class Counter:
+    """Monotonic counter"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        with self.lock:
+            self.value += amount
+
+
+class Histogram:
+    """Fixed-bucket histogram, the bucket search happens outside the lock"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.upper_bounds = tuple(sorted(buckets))
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(self.upper_bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect_left(self.upper_bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.sum, self.count
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating inside the bucket it falls in"""
+        counts, _, count = self.snapshot()
+        if not count:
+            return 0.0
+        rank = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                if index == len(self.upper_bounds):
+                    return self.upper_bounds[-1]
+                lower = self.upper_bounds[index - 1] if index else 0.0
+                upper = self.upper_bounds[index]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.upper_bounds[-1]
+
+
+class MetricFamily:
+    """One metric name with a child series per label combination"""
+
+    def __init__(self, name: str, help_text: str, kind: str, label_names=(), factory=Counter):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self.factory = factory
+        self.lock = threading.Lock()
+        self.children = {}
+
+    def labels(self, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self.factory())
+        return child
+
+    def _label_text(self, key, extra: str = ""):
+        pairs = [f'{name}="{value}"' for name, value in zip(self.label_names, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self.children.items()):
+            if self.kind == "counter":
+                lines.append(f"{self.name}{self._label_text(key)} {child.value}")
+                continue
+            counts, total, count = child.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(child.upper_bounds + ("+Inf",), counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{self._label_text(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {total}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide set of metric families, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.families = {}
+
+    def _family(self, name, help_text, kind, label_names, factory):
+        with self.lock:
+            if name not in self.families:
+                self.families[name] = MetricFamily(name, help_text, kind, label_names, factory)
+            return self.families[name]
+
+    def counter(self, name: str, help_text: str, label_names=()):
+        return self._family(name, help_text, "counter", label_names, Counter)
+
+    def histogram(self, name: str, help_text: str, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._family(name, help_text, "histogram", label_names, lambda: Histogram(buckets))
+
+    def render(self) -> str:
+        lines = []
+        for family in list(self.families.values()):
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class CameraMetrics:
+    """Stage latencies and frame counters of one camera"""
+
+    def __init__(self, camera: str, registry: MetricsRegistry = REGISTRY):
+        self.camera = camera
+        stage_seconds = registry.histogram(
+            "monitoring_stage_seconds", "Time spent in each processing stage", ("camera", "stage")
+        )
+        self.stages = {stage: stage_seconds.labels(camera=camera, stage=stage) for stage in STAGES}
+        self.glass_to_decision = registry.histogram(
+            "monitoring_glass_to_decision_seconds", "Frame capture to pose decision latency", ("camera",)
+        ).labels(camera=camera)
+
+        frames = registry.counter("monitoring_frames_total", "Frames by outcome", ("camera", "outcome"))
+        self.frames_processed = frames.labels(camera=camera, outcome="processed")
+        self.frames_skipped = frames.labels(camera=camera, outcome="skipped")
+        self.frames_dropped = frames.labels(camera=camera, outcome="dropped")
+
+        alerts = registry.counter("monitoring_alerts_total", "Alert deliveries by result", ("camera", "result"))
+        self.alerts_sent = alerts.labels(camera=camera, result="sent")
+        self.alerts_failed = alerts.labels(camera=camera, result="failed")
+        self.alerts_dropped = alerts.labels(camera=camera, result="dropped")
+
+    def observe(self, stage: str, seconds: float):
+        self.stages[stage].observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage].observe(time.perf_counter() - start_time)
+
+    def summary(self):
+        """p50/p95/p99 in milliseconds for every stage that saw traffic"""
+        histograms = dict(self.stages, glass_to_decision=self.glass_to_decision)
+        return {
+            name: {
+                "count": histogram.count,
+                "p50_ms": histogram.quantile(0.50) * 1000,
+                "p95_ms": histogram.quantile(0.95) * 1000,
+                "p99_ms": histogram.quantile(0.99) * 1000,
+            }
+            for name, histogram in histograms.items() if histogram.count
+        }
+
+
+class NullMetrics:
+    """Stand-in when a caller doesn't track a camera"""
+
+    def observe(self, stage: str, seconds: float):
+        pass
+
+    def time(self, stage: str):
+        return nullcontext()
+
+
+NULL_METRICS = NullMetrics()
+
+_cameras = {}
+_cameras_lock = threading.Lock()
+
+
+def camera_metrics(camera: str) -> CameraMetrics:
+    """Shared CameraMetrics instance for a camera name"""
+    with _cameras_lock:
+        if camera not in _cameras:
+            _cameras[camera] = CameraMetrics(camera)
+        return _cameras[camera]
+
+
+class MetricsServer:
+    """Local /metrics endpoint in the Prometheus text exposition format"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9100, registry: MetricsRegistry = REGISTRY):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self.httpd = None
+        self.thread = None
+
+    @classmethod
+    def from_config(cls, config):
+        metrics_config = config.config["monitoring"].get("metrics", {})
+        if not metrics_config.get("enabled", False):
+            return None
+        return cls(
+            host=metrics_config.get("host", "127.0.0.1"),
+            port=metrics_config.get("port", 9100)
+        )
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logging.debug(f"Metrics: {format % args}")
+
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="metrics-server", daemon=True)
+        self.thread.start()
+        logging.info(f"Metrics available on http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
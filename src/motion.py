@@ -0,0 +1,127 @@
+# src/motion.py
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Skip inference while a heavily downscaled view of the scene stays static"""
+
+    def __init__(self, width: int = 80, height: int = 60, learning_rate: float = 0.05,
+                 sensitivity: float = 3.0, min_pixel_threshold: int = 8,
+                 min_changed_fraction: float = 0.005, max_skip_seconds: float = 5.0,
+                 roi_margin: float = 0.2):
+        self.size = (width, height)
+        self.learning_rate = learning_rate
+        self.sensitivity = sensitivity
+        self.min_pixel_threshold = min_pixel_threshold
+        self.min_changed_fraction = min_changed_fraction
+        self.max_skip_seconds = max_skip_seconds
+        self.roi_margin = roi_margin
+
+        # Preallocated working buffers, nothing full-size is kept or copied
+        self.small = np.empty((height, width, 3), dtype=np.uint8)
+        self.gray = np.empty((height, width), dtype=np.uint8)
+        self.background_u8 = np.empty((height, width), dtype=np.uint8)
+        self.diff = np.empty((height, width), dtype=np.uint8)
+        self.background = None
+
+        self.noise_level = float(min_pixel_threshold) / sensitivity
+        self.last_pass_time = 0.0
+
+        # Metrics
+        self.frames_checked = 0
+        self.frames_skipped = 0
+        self.last_changed_fraction = 0.0
+
+    @classmethod
+    def from_config(cls, config):
+        gate_config = config.config["monitoring"].get("motion_gate", {})
+        return cls(
+            width=gate_config.get("width", 80),
+            height=gate_config.get("height", 60),
+            learning_rate=gate_config.get("learning_rate", 0.05),
+            sensitivity=gate_config.get("sensitivity", 3.0),
+            min_pixel_threshold=gate_config.get("min_pixel_threshold", 8),
+            min_changed_fraction=gate_config.get("min_changed_fraction", 0.005),
+            max_skip_seconds=gate_config.get("max_skip_seconds", 5.0),
+            roi_margin=gate_config.get("roi_margin", 0.2)
+        )
+
+    def reset(self):
+        """Relearn the background from the next frame"""
+        self.background = None
+        self.last_pass_time = 0.0
+
+    def _roi_slice(self, roi, frame_shape):
+        """Map a full-frame bbox onto the downscaled image, with some margin"""
+        frame_height, frame_width = frame_shape[:2]
+        width, height = self.size
+        x1, y1, x2, y2 = roi
+        margin_x = (x2 - x1) * self.roi_margin
+        margin_y = (y2 - y1) * self.roi_margin
+        sx = width / frame_width
+        sy = height / frame_height
+        left = int(max(0, (x1 - margin_x) * sx))
+        right = int(min(width, np.ceil((x2 + margin_x) * sx)))
+        top = int(max(0, (y1 - margin_y) * sy))
+        bottom = int(min(height, np.ceil((y2 + margin_y) * sy)))
+        if right - left < 2 or bottom - top < 2:
+            return slice(None), slice(None)
+        return slice(top, bottom), slice(left, right)
+
+    def check(self, frame, roi=None, now: float = None) -> bool:
+        """
+        Decide whether the frame is worth analysing
+        Args:
+            frame: Full-size BGR frame
+            roi: Tracked person bbox in frame coordinates, restricts the check when given
+        Returns:
+            bool: True when there is motion (or a keep-alive is due)
+        """
+        now = time.time() if now is None else now
+        self.frames_checked += 1
+
+        cv2.resize(frame, self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        cv2.GaussianBlur(self.gray, (3, 3), 0, dst=self.gray)
+
+        if self.background is None:
+            self.background = self.gray.astype(np.float32)
+            self.last_pass_time = now
+            return True
+
+        cv2.convertScaleAbs(self.background, dst=self.background_u8)
+        cv2.absdiff(self.gray, self.background_u8, dst=self.diff)
+
+        rows, cols = self._roi_slice(roi, frame.shape) if roi is not None else (slice(None), slice(None))
+        region = self.diff[rows, cols]
+
+        # Threshold follows the sensor noise measured on static frames
+        threshold = max(self.min_pixel_threshold, self.sensitivity * self.noise_level)
+        self.last_changed_fraction = float(np.count_nonzero(region > threshold)) / region.size
+        moving = self.last_changed_fraction > self.min_changed_fraction
+
+        if not moving:
+            self.noise_level += 0.05 * (float(cv2.mean(region)[0]) - self.noise_level)
+
+        # Slowly absorb lighting changes into the background model
+        cv2.accumulateWeighted(self.gray, self.background, self.learning_rate)
+
+        if moving or now - self.last_pass_time >= self.max_skip_seconds:
+            self.last_pass_time = now
+            return True
+
+        self.frames_skipped += 1
+        return False
+
+    def get_stats(self):
+        """Return skip-rate metrics"""
+        return {
+            "frames_checked": self.frames_checked,
+            "frames_skipped": self.frames_skipped,
+            "skip_rate": self.frames_skipped / self.frames_checked if self.frames_checked else 0.0,
+            "noise_level": self.noise_level,
+            "last_changed_fraction": self.last_changed_fraction,
+        }
@@ -0,0 +1,426 @@
+# src/pipeline.py
+import threading
+import time
+from collections import deque
+
+import cv2
+from rich.table import Table
+
+from buffers import FramePool
+from capture import FrameReader
+from logger import logging, console
+from metrics import NULL_METRICS
+from startup import STARTUP
+
+# Queue drop policies
+NEWEST_WINS = "newest_wins"  # a full queue discards its oldest item
+DROP_NEW = "drop_new"        # a full queue rejects the incoming item
+BLOCK = "block"              # never drop, the producer waits (backpressure)
+DROP_POLICIES = (NEWEST_WINS, DROP_NEW, BLOCK)
+
+# Returned by the source stage when the video source is exhausted
+PIPELINE_END = object()
+
+
+class BoundedQueue:
+    """Bounded FIFO with a configurable policy for when it is full"""
+
+    def __init__(self, maxsize: int, policy: str = BLOCK, on_drop=None):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.items = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+        self.on_drop = on_drop
+
+    def put(self, item) -> bool:
+        with self.condition:
+            if len(self.items) >= self.maxsize:
+                if self.policy == NEWEST_WINS:
+                    self.items.popleft()
+                    self._dropped()
+                elif self.policy == DROP_NEW:
+                    self._dropped()
+                    return False
+                else:
+                    self.condition.wait_for(lambda: len(self.items) < self.maxsize or self.closed)
+            if self.closed:
+                return False
+            self.items.append(item)
+            self.condition.notify_all()
+            return True
+
+    def _dropped(self):
+        self.dropped += 1
+        if self.on_drop is not None:
+            self.on_drop()
+
+    def get(self, timeout: float = None):
+        """Next item, or None on timeout or once the queue is closed and drained"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.items or self.closed, timeout=timeout)
+            if not self.items:
+                return None
+            item = self.items.popleft()
+            self.condition.notify_all()
+            return item
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    @property
+    def depth(self) -> int:
+        return len(self.items)
+
+    @property
+    def drained(self) -> bool:
+        return self.closed and not self.items
+
+
+class Stage:
+    """Pool of worker threads applying one handler between two queues"""
+
+    def __init__(self, name: str, handler, input_queue: BoundedQueue = None,
+                 output_queue: BoundedQueue = None, workers: int = 1, closes: list = None,
+                 metrics=NULL_METRICS):
+        self.name = name
+        self.handler = handler
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.workers = max(1, workers)
+        # Queues closed once the last worker exits, so shutdown cascades downstream
+        self.closes = closes if closes is not None else ([output_queue] if output_queue else [])
+        self.metrics = metrics
+        self.threads = []
+        self.running = False
+        self.lock = threading.Lock()
+        self.active_workers = 0
+
+        # Statistics
+        self.processed = 0
+        self.errors = 0
+        self.total_service_time = 0.0
+        self.max_service_time = 0.0
+
+    def start(self):
+        self.running = True
+        self.active_workers = self.workers
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"stage-{self.name}-{index}", daemon=True)
+            self.threads.append(thread)
+            thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+
+    def join(self, timeout: float = 5.0):
+        for thread in self.threads:
+            thread.join(timeout=timeout)
+
+    @property
+    def alive(self) -> bool:
+        return any(thread.is_alive() for thread in self.threads)
+
+    def _worker_loop(self):
+        try:
+            while self.running:
+                if self.input_queue is not None:
+                    item = self.input_queue.get(timeout=0.5)
+                    if item is None:
+                        if self.input_queue.drained:
+                            break
+                        continue
+                else:
+                    item = None
+
+                start_time = time.perf_counter()
+                try:
+                    result = self.handler(item)
+                except Exception as e:
+                    self.errors += 1
+                    logging.error(f"Stage {self.name} failed: {str(e)}")
+                    continue
+                service_time = time.perf_counter() - start_time
+
+                if result is PIPELINE_END:
+                    break
+
+                self.metrics.observe(self.name, service_time)
+                with self.lock:
+                    self.processed += 1
+                    self.total_service_time += service_time
+                    self.max_service_time = max(self.max_service_time, service_time)
+
+                if result is not None and self.output_queue is not None:
+                    self.output_queue.put(result)
+        finally:
+            with self.lock:
+                self.active_workers -= 1
+                last_worker = self.active_workers == 0
+            if last_worker:
+                for queue in self.closes:
+                    queue.close()
+
+    def get_stats(self):
+        """Queue depth and service time of the stage"""
+        with self.lock:
+            processed = self.processed
+            return {
+                "workers": self.workers,
+                "queue_depth": self.input_queue.depth if self.input_queue else 0,
+                "queue_size": self.input_queue.maxsize if self.input_queue else 0,
+                "dropped": self.input_queue.dropped if self.input_queue else 0,
+                "processed": processed,
+                "errors": self.errors,
+                "avg_service_ms": self.total_service_time / processed * 1000 if processed else 0.0,
+                "max_service_ms": self.max_service_time * 1000,
+            }
+
+
+class MonitoringPipeline:
+    """capture -> detect -> pose -> classify -> alert, connected by bounded queues"""
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.pose_service = controller.pose_service
+        self.backend = controller.pose_service.backend
+        # Track association must see frames in order
+        self.multi_person = controller.pose_service.people is not None
+
+        pipeline_config = controller.config.config["monitoring"].get("pipeline", {})
+        stages_config = pipeline_config.get("stages", {})
+        self.report_interval = pipeline_config.get("report_interval", 10)
+
+        def queue_for(name, size, policy, on_drop=controller.metrics.frames_dropped.inc):
+            stage_config = stages_config.get(name, {})
+            return BoundedQueue(stage_config.get("queue_size", size), stage_config.get("policy", policy), on_drop)
+
+        def workers_for(name, stateful=False):
+            workers = stages_config.get(name, {}).get("workers", 1)
+            if stateful and workers > 1:
+                logging.warning(f"Stage {name} keeps per-stream state with the {self.backend.name} backend, using 1 worker")
+                return 1
+            return workers
+
+        self.queues = {
+            "detect": queue_for("detect", 2, NEWEST_WINS),
+            "pose": queue_for("pose", 2, NEWEST_WINS),
+            "classify": queue_for("classify", 8, BLOCK),
+            "alert": queue_for("alert", 16, BLOCK, controller.metrics.alerts_dropped.inc),
+        }
+        self.display_queue = BoundedQueue(1, NEWEST_WINS)
+
+        self.stages = [
+            Stage("capture", self.capture, None, self.queues["detect"]),
+            Stage("detect", self.detect, self.queues["detect"], self.queues["pose"],
+                  workers_for("detect", self.backend.stateful_detect or self.multi_person), metrics=controller.metrics),
+            Stage("pose", self.estimate_pose, self.queues["pose"], self.queues["classify"],
+                  workers_for("pose", self.backend.stateful_pose), metrics=controller.metrics),
+            # Confirmation state is sequential by nature
+            Stage("classify", self.classify, self.queues["classify"], None, 1,
+                  closes=[self.queues["alert"], self.display_queue]),
+            Stage("alert", self.deliver_alert, self.queues["alert"], None, workers_for("alert")),
+        ]
+
+        # Pool buffers only live until the gate and scheduler have seen them, or on screen for
+        # skipped frames: the one being captured, the display queue and the one being shown.
+        # Clip buffer and preview encode to JPEG right away.
+        self.frame_pool = FramePool(self.display_queue.maxsize + 2)
+
+        self.reader = None
+        self.frame_id = 0
+        self.last_classified_id = -1
+        self.stale_frames = 0
+        self.next_process_time = 0.0
+
+    # Stage handlers
+
+    def capture(self, _):
+        ret, frame, captured_at = self.reader.read(timeout=0.5)
+        if not ret:
+            return PIPELINE_END if self.reader.ended else None
+
+        controller = self.controller
+        controller.record_capture(self.reader, captured_at)
+        resized = self.frame_pool.resize(frame, (self.pose_service.display_width, self.pose_service.display_height))
+        if controller.clip_buffer is not None:
+            controller.clip_buffer.add(resized, captured_at)
+
+        if not controller.has_significant_change(resized):
+            if not controller.headless:
+                self.display_queue.put(resized)
+            elif controller.preview_channel and controller.preview_channel.wants_frame():
+                controller.preview_channel.publish(resized)
+            return None
+
+        now = time.time()
+        if now < self.next_process_time:
+            return None
+        # The scheduler sees the decision of the last classified frame
+        self.next_process_time = now + controller.scheduler.interval
+
+        self.frame_id += 1
+        # Queues drop and hold frames out of order, a ring can't know when a frame is released.
+        # Analysed frames, a fraction of those captured, own their copy down to display.
+        return {"frame_id": self.frame_id, "captured_at": captured_at, "frame": resized.copy()}
+
+    def detect(self, item):
+        if self.multi_person:
+            item["people"] = self.pose_service.detect_people(item["frame"], item["captured_at"])
+            return item
+        item["detection"] = self.backend.detect(item["frame"])
+        return item
+
+    def estimate_pose(self, item):
+        if self.multi_person:
+            self.pose_service.estimate_people(item["frame"], item["people"])
+            return item
+        landmarks, bbox = None, None
+        if item["detection"] is not None:
+            landmarks, bbox = self.backend.estimate_pose(item["frame"], item["detection"])
+        item.update(landmarks=landmarks, bbox=bbox)
+        return item
+
+    def classify(self, item):
+        # Parallel workers upstream can reorder frames, confirmation only moves forward
+        if item["frame_id"] <= self.last_classified_id:
+            self.stale_frames += 1
+            return None
+        self.last_classified_id = item["frame_id"]
+
+        controller = self.controller
+        if self.multi_person:
+            with controller.metrics.time("classify"):
+                people = self.pose_service.classify_people(item["people"])
+            controller.render_frame = controller.should_render()
+            frame, *_ = controller.handle_people(item["frame"], people, item["captured_at"])
+        else:
+            frame = self.classify_single(item)
+        controller.scheduler.update(controller.current_risk())
+        self.reader.set_idle(controller.idle_keyframes_only and controller.scheduler.idle)
+        controller.frames_processed += 1
+        controller.metrics.frames_processed.inc()
+
+        age = time.time() - item["captured_at"]
+        controller.metrics.glass_to_decision.observe(age)
+        STARTUP.first_decision(controller.camera_name)
+        controller.processing_times.append(age * 1000)
+
+        if controller.render_frame:
+            if not controller.headless:
+                self.display_queue.put(frame)
+            if controller.preview_channel:
+                controller.preview_channel.publish(frame)
+        return None
+
+    def classify_single(self, item):
+        controller = self.controller
+        landmarks = item["landmarks"]
+        self.pose_service.person_detected = item["bbox"] is not None
+        self.pose_service.person_bbox = item["bbox"]
+
+        is_elderly, pose = None, None
+        if landmarks is not None:
+            with controller.metrics.time("classify"):
+                is_elderly, pose = self.pose_service.classify(landmarks)
+
+        controller.render_frame = controller.should_render()
+        frame, *_ = controller.handle_detection(
+            item["frame"], landmarks, is_elderly, pose, item["bbox"], item["captured_at"]
+        )
+        return frame
+
+    def queue_alert(self, pose, risk_config, frame, captured_at=None):
+        # Alerts are never dropped, a full queue holds back classification instead
+        self.queues["alert"].put((pose, risk_config, frame, captured_at))
+
+    def deliver_alert(self, alert):
+        pose, risk_config, frame, captured_at = alert
+        self.controller.deliver_alert(pose, risk_config, frame, captured_at)
+        return None
+
+    # Lifecycle
+
+    def get_stats(self):
+        stats = {stage.name: stage.get_stats() for stage in self.stages}
+        stats["classify"]["stale"] = self.stale_frames
+        return stats
+
+    def create_stage_table(self):
+        table = Table(title=f"Pipeline - {self.controller.camera_name}", show_header=True)
+
+        table.add_column("Stage", style="blue")
+        table.add_column("Workers", style="green")
+        table.add_column("Queue", style="yellow")
+        table.add_column("Dropped", style="red")
+        table.add_column("Avg ms", style="green")
+        table.add_column("Max ms", style="green")
+
+        for name, stats in self.get_stats().items():
+            table.add_row(
+                name,
+                str(stats["workers"]),
+                f"{stats['queue_depth']}/{stats['queue_size']}",
+                str(stats["dropped"]),
+                f"{stats['avg_service_ms']:.1f}",
+                f"{stats['max_service_ms']:.1f}"
+            )
+        return table
+
+    def stop(self):
+        for stage in self.stages:
+            stage.stop()
+        for queue in list(self.queues.values()) + [self.display_queue]:
+            queue.close()
+
+    def run(self, video_source):
+        controller = self.controller
+        capture_config = controller.config.config["monitoring"].get("capture", {})
+        self.reader = FrameReader(
+            video_source,
+            buffer_size=capture_config.get("buffer_size", 2),
+            reconnect_delay=capture_config.get("reconnect_delay", 2.0),
+            capture_factory=controller.capture_factory
+        ).start()
+        controller.alert_sink = self.queue_alert
+        window_name = f"Elderly Monitoring System - {controller.camera_name}"
+        controller.running = True
+
+        for stage in self.stages:
+            stage.start()
+
+        last_report = time.time()
+        try:
+            while controller.running and any(stage.alive for stage in self.stages):
+                if not controller.headless:
+                    frame = self.display_queue.get(timeout=0.05)
+                    if frame is not None:
+                        cv2.imshow(window_name, frame)
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        break
+                else:
+                    time.sleep(0.1)
+
+                if time.time() - last_report >= self.report_interval:
+                    console.print(self.create_stage_table())
+                    logging.info(f"[{controller.camera_name}] Pipeline stats: {self.get_stats()}")
+                    last_report = time.time()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            for stage in self.stages:
+                stage.join()
+            self.reader.stop()
+            controller.alert_sink = None
+            controller.running = False
+            logging.info(f"[{controller.camera_name}] Capture stats: {self.reader.get_stats()}")
+            logging.info(f"[{controller.camera_name}] Pipeline stats: {self.get_stats()}")
+            if not controller.headless:
+                cv2.destroyAllWindows()
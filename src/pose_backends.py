@@ -0,0 +1,248 @@
+# src/pose_backends.py
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+
+import cv2
+import numpy as np
+
+from buffers import ScratchBuffer
+from landmarks import from_coco_keypoints, to_array
+from logger import logging
+from metrics import NULL_METRICS
+from startup import load_in_background
+from tracker import RoiTracker
+
+
+class PoseBackend(ABC):
+    """Base class for pose backends, keeps per-frame latency"""
+    name = "base"
+
+    def __init__(self, service, latency_window: int = 300):
+        self.service = service
+        self.latencies = deque(maxlen=latency_window)
+
+    # Stages that keep per-stream state can't be spread over several pipeline workers
+    stateful_detect = False
+    stateful_pose = False
+    # Runs in a worker process, PoseService hands it whole requests
+    remote = False
+
+    @abstractmethod
+    def detect(self, frame):
+        """
+        Locate the person
+        Returns:
+            Detection passed on to estimate_pose, or None when nobody was found
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def estimate_pose(self, frame, detection):
+        """
+        Estimate landmarks for a detection
+        Returns:
+            Tuple(landmarks, bbox): (33, 4) landmark array normalized to the bbox crop, or (None, None)
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def detect_people(self, frame):
+        """
+        Locate everyone in the frame with one detector call
+        Returns:
+            Tuple(boxes, scores, detections): (N, 4) boxes, (N,) confidences and per-box data for estimate_poses
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def estimate_poses(self, frame, people):
+        """
+        Estimate landmarks for every tracked person
+        Returns:
+            list: (33, 4) landmark array normalized to each person's bbox crop, or None, per person
+        """
+        raise NotImplementedError
+
+    def estimate(self, frame, metrics=NULL_METRICS):
+        """Find the person and their landmarks"""
+        with metrics.time("detect"):
+            detection = self.detect(frame)
+        if detection is None:
+            return None, None
+        with metrics.time("pose"):
+            return self.estimate_pose(frame, detection)
+
+    def timed_estimate(self, frame, metrics=NULL_METRICS):
+        start_time = time.perf_counter()
+        landmarks, bbox = self.estimate(frame, metrics)
+        latency = (time.perf_counter() - start_time) * 1000
+        self.latencies.append(latency)
+        logging.debug(f"{self.name} backend: {latency:.1f}ms")
+        return landmarks, bbox
+
+    def get_stats(self):
+        """Return per-frame latency statistics in milliseconds"""
+        if not self.latencies:
+            return {"backend": self.name, "frames": 0}
+        latencies = np.array(self.latencies)
+        return {
+            "backend": self.name,
+            "frames": len(latencies),
+            "avg_ms": float(latencies.mean()),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+        }
+
+
+class MediaPipeBackend(PoseBackend):
+    """YOLO person detector with ROI tracking, then MediaPipe Pose on the crop"""
+    name = "mediapipe"
+
+    def __init__(self, service, latency_window: int = 300):
+        super().__init__(service, latency_window)
+        # Importing mediapipe and building its graph overlaps with the camera connecting
+        self.pose_detector_future = load_in_background("mediapipe", self._create_pose_detector)
+        self._pose_detector = None
+        # MediaPipe Pose follows a single person, so each track gets its own graph
+        self.track_detectors = {}
+        # RGB crops change size every frame, they are converted into one scratch buffer
+        self.rgb_crop = ScratchBuffer()
+
+    @staticmethod
+    def _create_pose_detector(warm_up: bool = True):
+        import mediapipe as mp
+        pose_detector = mp.solutions.pose.Pose(
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        if warm_up:
+            # The first process call loads the TFLite models
+            pose_detector.process(np.zeros((256, 256, 3), dtype=np.uint8))
+        return pose_detector
+
+    @property
+    def pose_detector(self):
+        if self._pose_detector is None:
+            self._pose_detector = self.pose_detector_future.result()
+        return self._pose_detector
+
+    stateful_detect = True
+    stateful_pose = True
+
+    def detect(self, frame):
+        service = self.service
+        tracker = service.tracker
+
+        # Phase 1: YOLO detection when the tracker asks for it, optical flow otherwise
+        if tracker.needs_detection():
+            person, bbox = service.detect_person(frame)
+
+            if person is None:
+                tracker.reset()
+                return None
+
+            tracker.init(frame, bbox)
+        else:
+            tracker.update(frame)
+
+        if not tracker.active or tracker.bbox is None:
+            return None
+        return tracker.bbox
+
+    def estimate_pose(self, frame, bbox):
+        tracker = self.service.tracker
+
+        # Phase 2: MediaPipe pose tracking
+        x1, y1, x2, y2 = bbox
+        person_frame = frame[y1:y2, x1:x2]
+
+        if person_frame.size == 0:
+            tracker.lost()
+            return None, None
+
+        results = self.pose_detector.process(self.rgb_crop.cvt_color(person_frame, cv2.COLOR_BGR2RGB))
+
+        if not results.pose_landmarks:
+            # Empty crop usually means the ROI drifted off the person
+            tracker.lost()
+            return None, None
+
+        landmarks = to_array(results.pose_landmarks)
+        tracker.seed_from_landmarks(landmarks, bbox)
+        return landmarks, bbox
+
+    def detect_people(self, frame):
+        results = self.service.person_model(frame)[0]
+        boxes = results.boxes.data.cpu().numpy() if results.boxes is not None else np.empty((0, 6))
+        persons = boxes[boxes[:, 5] == 0]
+        return persons[:, :4], persons[:, 4], None
+
+    def estimate_poses(self, frame, people):
+        # No batch API in MediaPipe Pose, the crops go through their track's graph in turn.
+        # Resolving the shared detector waits for the background mediapipe import.
+        self.pose_detector
+        poses = []
+        for person in people:
+            # Predicted boxes can reach past the frame, the landmarks are mapped back with the box cropped
+            bbox = RoiTracker._clip(person["bbox"], frame.shape)
+            if bbox is None:
+                poses.append(None)
+                continue
+            person["bbox"] = bbox
+            x1, y1, x2, y2 = bbox
+            person_frame = frame[y1:y2, x1:x2]
+            track_id = person["track_id"]
+            if track_id not in self.track_detectors:
+                self.track_detectors[track_id] = self._create_pose_detector(warm_up=False)
+            results = self.track_detectors[track_id].process(self.rgb_crop.cvt_color(person_frame, cv2.COLOR_BGR2RGB))
+            poses.append(to_array(results.pose_landmarks) if results.pose_landmarks else None)
+
+        # Close the graphs of tracks the tracker has dropped
+        live = self.service.people.track_ids()
+        for track_id in [track_id for track_id in self.track_detectors if track_id not in live]:
+            self.track_detectors.pop(track_id).close()
+        return poses
+
+
+class YoloPoseBackend(PoseBackend):
+    """Single YOLOv8-pose pass giving both the person box and COCO keypoints"""
+    name = "yolo_pose"
+
+    def detect(self, frame):
+        results = self.service.pose_model(frame)[0]
+        if results.boxes is None or len(results.boxes) == 0 or results.keypoints is None:
+            return None
+
+        boxes = results.boxes.data.cpu().numpy()
+        persons = np.flatnonzero(boxes[:, 5] == 0)
+        if len(persons) == 0:
+            return None
+
+        best = persons[np.argmax(boxes[persons, 4])]
+        bbox = tuple(int(v) for v in boxes[best, :4])
+        return bbox, results.keypoints.data[best].cpu().numpy()
+
+    def estimate_pose(self, frame, detection):
+        bbox, keypoints = detection
+        return from_coco_keypoints(keypoints, bbox), bbox
+
+    def detect_people(self, frame):
+        # Boxes and keypoints for everyone come out of the same pass
+        results = self.service.pose_model(frame)[0]
+        if results.boxes is None or len(results.boxes) == 0 or results.keypoints is None:
+            return np.empty((0, 4)), np.empty(0), []
+
+        boxes = results.boxes.data.cpu().numpy()
+        persons = np.flatnonzero(boxes[:, 5] == 0)
+        keypoints = results.keypoints.data.cpu().numpy()
+        return boxes[persons, :4], boxes[persons, 4], list(keypoints[persons])
+
+    def estimate_poses(self, frame, people):
+        return [from_coco_keypoints(person["detection"], person["bbox"]) for person in people]
+
+
+POSE_BACKENDS = {
+    MediaPipeBackend.name: MediaPipeBackend,
+    YoloPoseBackend.name: YoloPoseBackend,
+}
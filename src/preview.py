@@ -0,0 +1,139 @@
+# src/preview.py
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+from logger import logging
+
+BOUNDARY = "frame"
+
+
+class PreviewChannel:
+    """Latest preview JPEG of one camera, only produced while someone is watching"""
+
+    def __init__(self, max_fps: float = 5, jpeg_quality: int = 70):
+        self.min_interval = 1.0 / max_fps
+        self.jpeg_quality = jpeg_quality
+        self.condition = threading.Condition()
+        self.jpeg = None
+        self.sequence = 0
+        self.viewers = 0
+        self.last_publish = 0.0
+
+    def wants_frame(self, now: float = None) -> bool:
+        """True when a viewer is connected and the preview FPS cap allows a new frame"""
+        if not self.viewers:
+            return False
+        now = time.time() if now is None else now
+        return now - self.last_publish >= self.min_interval
+
+    def publish(self, frame):
+        success, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not success:
+            return
+        with self.condition:
+            self.jpeg = encoded.tobytes()
+            self.sequence += 1
+            self.last_publish = time.time()
+            self.condition.notify_all()
+
+    def wait_frame(self, last_sequence: int, timeout: float = 5.0):
+        with self.condition:
+            self.condition.wait_for(lambda: self.sequence != last_sequence, timeout=timeout)
+            return self.sequence, self.jpeg
+
+
+class PreviewServer:
+    """Local MJPEG endpoint, one stream per camera at /<camera>.mjpg"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, max_fps: float = 5, jpeg_quality: int = 70):
+        self.host = host
+        self.port = port
+        self.max_fps = max_fps
+        self.jpeg_quality = jpeg_quality
+        self.channels = {}
+        self.httpd = None
+        self.thread = None
+
+    @classmethod
+    def from_config(cls, config):
+        preview_config = config.config["monitoring"].get("preview", {})
+        if not preview_config.get("enabled", False):
+            return None
+        return cls(
+            host=preview_config.get("host", "127.0.0.1"),
+            port=preview_config.get("port", 8080),
+            max_fps=preview_config.get("max_fps", 5),
+            jpeg_quality=preview_config.get("jpeg_quality", 70)
+        )
+
+    def channel(self, name: str) -> PreviewChannel:
+        if name not in self.channels:
+            self.channels[name] = PreviewChannel(self.max_fps, self.jpeg_quality)
+        return self.channels[name]
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logging.debug(f"Preview: {format % args}")
+
+            def do_GET(self):
+                if self.path in ("/", "/index.html"):
+                    links = "".join(
+                        f'<li><a href="/{name}.mjpg">{name}</a></li>' for name in server.channels
+                    )
+                    body = f"<html><body><ul>{links}</ul></body></html>".encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                name = self.path.strip("/").removesuffix(".mjpg")
+                if name not in server.channels:
+                    self.send_error(404)
+                    return
+                self.stream(server.channels[name])
+
+            def stream(self, channel):
+                self.send_response(200)
+                self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+
+                with channel.condition:
+                    channel.viewers += 1
+                sequence = -1
+                try:
+                    while True:
+                        sequence, jpeg = channel.wait_frame(sequence)
+                        if jpeg is None:
+                            continue
+                        self.wfile.write(
+                            f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode()
+                        )
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b"\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with channel.condition:
+                        channel.viewers -= 1
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="preview-server", daemon=True)
+        self.thread.start()
+        logging.info(f"Preview server listening on http://{self.host}:{self.port}/")
+        return self
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
@@ -0,0 +1,267 @@
+# src/recording.py
+"""
+Compact landmark recordings
+
+A recording is a small JSON header followed by fixed-size records, so a whole
+day of analysed frames can be memory-mapped and re-scored without YOLO or MediaPipe:
+
+    python src/recording.py data/recordings/bedroom_20260101_080000.poserec \
+        --standing-head-heights 5.0 --elderly-bend 0.12 --output alerts.json
+"""
+import argparse
+import copy
+import json
+import os
+import struct
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+
+from config import Config
+from landmarks import (
+    NUM_LANDMARKS, STANDING_HEAD_HEIGHTS, ELDERLY_POSTURE_BEND,
+    pose_features, classify_poses, classify_elderly
+)
+from logger import setup_logging, logging, console
+
+MAGIC = b"POSEREC\x00"
+VERSION = 1
+HEADER_ALIGN = 64
+
+# One analysed frame. Landmarks are normalized to the bbox crop, so float16 keeps
+# well below a pixel of error while halving the file size.
+FRAME_DTYPE = np.dtype([
+    ("timestamp", "<f8"),
+    ("frame_height", "<u2"),
+    ("frame_width", "<u2"),
+    ("has_person", "u1"),
+    ("bbox", "<i4", (4,)),
+    ("landmarks", "<f2", (NUM_LANDMARKS, 4)),
+])
+
+
+class LandmarkRecorder:
+    """Append analysed frames to a recording, written in small batches"""
+
+    def __init__(self, path, camera: str = "default", backend: str = None, flush_every: int = 100):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, "wb")
+        self.buffer = np.zeros(flush_every, dtype=FRAME_DTYPE)
+        self.pending = 0
+        self.frames_written = 0
+
+        metadata = json.dumps({
+            "version": VERSION,
+            "camera": camera,
+            "backend": backend,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "dtype": FRAME_DTYPE.descr,
+        }).encode()
+        # Records start on an aligned offset right after the header
+        header_size = len(MAGIC) + 4 + len(metadata)
+        padding = -header_size % HEADER_ALIGN
+        self.file.write(MAGIC + struct.pack("<I", len(metadata) + padding) + metadata + b" " * padding)
+
+    @classmethod
+    def from_config(cls, config, camera: str = "default"):
+        recording_config = config.config["monitoring"].get("recording", {})
+        if not recording_config.get("enabled", False):
+            return None
+        directory = Path(recording_config.get("directory", "data/recordings"))
+        filename = f"{camera}_{datetime.now():%Y%m%d_%H%M%S}.poserec"
+        return cls(
+            directory / filename,
+            camera=camera,
+            backend=config.config["monitoring"].get("pose", {}).get("backend", "mediapipe"),
+            flush_every=recording_config.get("flush_every", 100)
+        )
+
+    def record(self, timestamp: float, frame_shape, landmarks, bbox):
+        row = self.buffer[self.pending]
+        row["timestamp"] = timestamp
+        row["frame_height"], row["frame_width"] = frame_shape[:2]
+        if landmarks is None:
+            row["has_person"] = 0
+            row["bbox"] = 0
+            row["landmarks"] = 0
+        else:
+            row["has_person"] = 1
+            row["bbox"] = bbox
+            row["landmarks"] = landmarks
+        self.pending += 1
+        if self.pending == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.file.write(self.buffer[:self.pending].tobytes())
+            self.frames_written += self.pending
+            self.pending = 0
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        logging.info(f"Recorded {self.frames_written} frames to {self.path}")
+
+
+def load_recording(path):
+    """
+    Memory-map a recording
+    Returns:
+        Tuple(dict, np.memmap): Header metadata and the records, a partially written last record is ignored
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a landmark recording")
+        (metadata_size,) = struct.unpack("<I", f.read(4))
+        metadata = json.loads(f.read(metadata_size))
+
+    if metadata.get("version") != VERSION:
+        raise ValueError(f"Unsupported recording version: {metadata.get('version')}")
+
+    offset = len(MAGIC) + 4 + metadata_size
+    count = (os.path.getsize(path) - offset) // FRAME_DTYPE.itemsize
+    if count == 0:
+        return metadata, np.zeros(0, dtype=FRAME_DTYPE)
+    return metadata, np.memmap(path, dtype=FRAME_DTYPE, mode="r", offset=offset, shape=(count,))
+
+
+def classify_records(records, standing_head_heights: float = STANDING_HEAD_HEIGHTS,
+                     posture_bend: float = ELDERLY_POSTURE_BEND, chunk_size: int = 50000):
+    """
+    Elderly flags and pose labels for every record at once
+    Returns:
+        Tuple(np.ndarray, np.ndarray): Elderly flags and pose labels, unknown where nobody was seen
+    """
+    is_elderly = np.zeros(len(records), dtype=bool)
+    poses = np.full(len(records), "unknown", dtype="<U8")
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        people = np.flatnonzero(chunk["has_person"])
+        if not len(people):
+            continue
+        features = pose_features(chunk["landmarks"][people].astype(np.float32))
+        is_elderly[start + people] = classify_elderly(features, posture_bend)
+        poses[start + people] = classify_poses(features, standing_head_heights)
+    return is_elderly, poses
+
+
+def replay_recording(controller, records, is_elderly, poses):
+    """
+    Feed classified records through temporal confirmation and alerting
+    Returns:
+        list: Alert episodes, consecutive alerts for the same pose are merged
+    """
+    notifier = controller.telegram_service
+    frames = {}
+    episodes = []
+
+    for index in range(len(records)):
+        record = records[index]
+        shape = (int(record["frame_height"]), int(record["frame_width"]))
+        # Alerts take a copy of the frame, a blank one of the right size is enough offline
+        frame = frames.get(shape)
+        if frame is None:
+            frame = frames[shape] = np.zeros(shape + (3,), dtype=np.uint8)
+
+        alerts_before = notifier.alerts_sent
+        if record["has_person"]:
+            landmarks = record["landmarks"].astype(np.float32)
+            controller.handle_detection(
+                frame, landmarks, bool(is_elderly[index]), str(poses[index]),
+                tuple(int(v) for v in record["bbox"]), float(record["timestamp"])
+            )
+        else:
+            controller.handle_detection(frame, None, None, None, None, float(record["timestamp"]))
+
+        timestamp = float(record["timestamp"])
+        for _, pose, risk in notifier.alerts[alerts_before:]:
+            last = episodes[-1] if episodes else None
+            if last and last["pose"] == pose and last["last_frame"] == index - 1:
+                last.update(end=timestamp, last_frame=index, alerts=last["alerts"] + 1)
+            else:
+                episodes.append({
+                    "pose": pose, "risk": risk, "start": timestamp, "end": timestamp,
+                    "first_frame": index, "last_frame": index, "alerts": 1,
+                })
+    return episodes
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Re-score a landmark recording without running the models")
+    parser.add_argument("recording", help="Path to a .poserec file")
+    parser.add_argument("--standing-head-heights", type=float, default=STANDING_HEAD_HEIGHTS,
+                        help="Body height in heads above which a pose counts as standing")
+    parser.add_argument("--elderly-bend", type=float, default=ELDERLY_POSTURE_BEND,
+                        help="Shoulder/hip bend above which the person counts as elderly")
+    parser.add_argument("--config", default="config/config.yaml", help="Base configuration")
+    parser.add_argument("--output", help="Write alert episodes as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Keep per-frame logging and alert panels")
+    return parser.parse_args()
+
+
+def main():
+    # Imported here so recording can be used from the controller without a cycle
+    from controller import MonitoringController
+    from service import NullNotifier, PoseService
+
+    args = parse_args()
+    load_dotenv()
+    setup_logging()
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        console.quiet = True
+
+    metadata, records = load_recording(args.recording)
+    config = Config(config_path=args.config, lang=os.getenv("LANGUAGE", "pt"))
+    raw = copy.deepcopy(config.config)
+    monitoring = raw["monitoring"]
+    monitoring.setdefault("recording", {})["enabled"] = False
+    # yolo_pose has nothing to load, the models themselves are never called offline
+    monitoring.setdefault("pose", {})["backend"] = "yolo_pose"
+    replay_config = config.derive(raw)
+
+    start_time = time.perf_counter()
+    is_elderly, poses = classify_records(records, args.standing_head_heights, args.elderly_bend)
+    classify_time = time.perf_counter() - start_time
+
+    controller = MonitoringController(
+        replay_config,
+        camera_name=metadata.get("camera", "default"),
+        telegram_service=NullNotifier(),
+        pose_service=PoseService(replay_config, models={"person_model": None, "pose_model": None}),
+        headless=True
+    )
+    episodes = replay_recording(controller, records, is_elderly, poses)
+    elapsed = time.perf_counter() - start_time
+
+    console.quiet = False
+    console.print(
+        f"[green]{len(records)} frames from {metadata.get('camera')} re-scored in {elapsed:.2f}s "
+        f"(classification {classify_time:.2f}s), {len(episodes)} alert episodes[/green]"
+    )
+    for episode in episodes:
+        console.print(
+            f"  {datetime.fromtimestamp(episode['start']):%H:%M:%S} - {datetime.fromtimestamp(episode['end']):%H:%M:%S}"
+            f"  {episode['pose']} ({episode['risk']}), {episode['alerts']} alerts"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "recording": args.recording,
+                "metadata": metadata,
+                "frames": len(records),
+                "standing_head_heights": args.standing_head_heights,
+                "elderly_bend": args.elderly_bend,
+                "episodes": episodes,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# src/runtime.py
+import hashlib
+import shutil
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from exceptions import DetectionException
+from logger import logging
+
+# Inference runtimes a YOLO model can be served from
+RUNTIMES = ("pytorch", "onnx", "openvino")
+
+CALIBRATION_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def _artifact_key(weights: Path, runtime: str, int8: bool, imgsz: int) -> str:
+    """Cache key that changes whenever the source weights or export settings change"""
+    stat = weights.stat()
+    digest = hashlib.sha1(f"{weights.name}:{stat.st_size}:{stat.st_mtime_ns}:{imgsz}".encode()).hexdigest()[:10]
+    suffix = "_int8" if int8 else ""
+    return f"{weights.stem}_{runtime}{suffix}_{imgsz}_{digest}"
+
+
+def _calibration_images(calibration_dir: Path, limit: int):
+    images = sorted(p for p in calibration_dir.iterdir() if p.suffix.lower() in CALIBRATION_EXTENSIONS)
+    if not images:
+        raise DetectionException(f"No calibration frames found in {calibration_dir}", model_name="int8")
+    return images[:limit]
+
+
+def _write_calibration_dataset(calibration_dir: Path, task: str, cache_dir: Path) -> Path:
+    """Describe our own frames as an ultralytics dataset, used for OpenVINO INT8 calibration"""
+    dataset_file = cache_dir / f"calibration_{task}.yaml"
+    lines = [
+        f"path: {calibration_dir.resolve()}",
+        "train: .",
+        "val: .",
+        "names:",
+        "  0: person",
+    ]
+    if task == "pose":
+        lines.append("kpt_shape: [17, 3]")
+    dataset_file.write_text("\n".join(lines) + "\n")
+    return dataset_file
+
+
+def _letterbox(image, imgsz: int):
+    """Resize keeping aspect ratio and pad to a square, the same way ultralytics does"""
+    height, width = image.shape[:2]
+    scale = imgsz / max(height, width)
+    resized = cv2.resize(image, (int(round(width * scale)), int(round(height * scale))))
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top = (imgsz - resized.shape[0]) // 2
+    left = (imgsz - resized.shape[1]) // 2
+    canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    return canvas
+
+
+class FrameCalibrationReader:
+    """Feed calibration frames to ONNX Runtime static quantization"""
+
+    def __init__(self, images, input_name: str, imgsz: int):
+        self.images = iter(images)
+        self.input_name = input_name
+        self.imgsz = imgsz
+
+    def get_next(self):
+        for path in self.images:
+            image = cv2.imread(str(path))
+            if image is None:
+                continue
+            tensor = cv2.cvtColor(_letterbox(image, self.imgsz), cv2.COLOR_BGR2RGB)
+            tensor = tensor.transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+            return {self.input_name: tensor}
+        return None
+
+
+def _quantize_onnx(onnx_path: Path, output_path: Path, calibration_dir: Path, imgsz: int, limit: int):
+    import onnxruntime
+    from onnxruntime.quantization import QuantType, quantize_static
+
+    session = onnxruntime.InferenceSession(str(onnx_path), providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+    reader = FrameCalibrationReader(_calibration_images(calibration_dir, limit), input_name, imgsz)
+    quantize_static(
+        str(onnx_path),
+        str(output_path),
+        reader,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8
+    )
+
+
+def _export(weights: Path, runtime: str, task: str, int8: bool, imgsz: int,
+            calibration_dir: Path, calibration_limit: int, target: Path):
+    from ultralytics import YOLO
+
+    model = YOLO(str(weights))
+    cache_dir = target.parent
+
+    if runtime == "openvino":
+        # Dynamic shapes so the batching engine can send several frames per call
+        export_kwargs = {"format": "openvino", "imgsz": imgsz, "dynamic": True}
+        if int8:
+            export_kwargs.update(
+                int8=True,
+                data=str(_write_calibration_dataset(calibration_dir, task, cache_dir)),
+                fraction=1.0
+            )
+        exported = Path(model.export(**export_kwargs))
+        shutil.move(str(exported), str(target))
+        return
+
+    exported = Path(model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True))
+    if int8:
+        _quantize_onnx(exported, target, calibration_dir, imgsz, calibration_limit)
+        exported.unlink()
+    else:
+        shutil.move(str(exported), str(target))
+
+
+def load_yolo(weights: str, config, task: str = "detect"):
+    """
+    Load a YOLO model on the configured runtime
+    Exported ONNX/OpenVINO artifacts are cached on disk and loaded through ultralytics,
+    so callers get the same predict API and result objects whatever the runtime.
+    """
+    from ultralytics import YOLO
+
+    runtime_config = config.config["monitoring"].get("runtime", {})
+    runtime = runtime_config.get("backend", "pytorch")
+    if runtime not in RUNTIMES:
+        raise DetectionException(f"Unknown inference runtime: {runtime}", model_name=weights)
+
+    if runtime == "pytorch":
+        return YOLO(weights, task=task)
+
+    weights_path = Path(weights)
+    if not weights_path.exists():
+        # Let ultralytics fetch the .pt once so there is something to export
+        YOLO(weights)
+    int8 = runtime_config.get("int8", False)
+    imgsz = runtime_config.get("imgsz", 640)
+    cache_dir = Path(runtime_config.get("cache_dir", "models/cache"))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    key = _artifact_key(weights_path, runtime, int8, imgsz)
+    target = cache_dir / (f"{key}.onnx" if runtime == "onnx" else f"{key}_openvino_model")
+
+    if not target.exists():
+        logging.info(f"Exporting {weights} to {runtime}{' INT8' if int8 else ''}, cached at {target}")
+        _export(
+            weights_path,
+            runtime,
+            task,
+            int8,
+            imgsz,
+            Path(runtime_config.get("calibration_dir", "data/calibration")),
+            runtime_config.get("calibration_frames", 300),
+            target
+        )
+    else:
+        logging.info(f"Loading cached {runtime} model {target}")
+
+    return YOLO(str(target), task=task)
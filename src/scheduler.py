@@ -0,0 +1,96 @@
+# src/scheduler.py
+import time
+
+from logger import logging
+
+
+class AnalysisScheduler:
+    """Per-camera analysis rate, full speed while risky and slow while nobody is around"""
+
+    def __init__(self, max_fps: float, idle_fps: float = 1.0, check_intervals: dict = None,
+                 cooldown: float = 5.0, enabled: bool = True):
+        self.max_fps = max_fps
+        self.idle_fps = idle_fps
+        # risk level -> check_interval, in frame slots at max_fps
+        self.check_intervals = check_intervals or {}
+        self.cooldown = cooldown
+        self.enabled = enabled
+
+        self.interval = 1.0 / max_fps
+        self.risk = None
+        self.pending_interval = None
+        self.pending_since = 0.0
+
+        # Counters
+        self.transitions = 0
+        self.time_at_rate = {}
+        self.last_update = None
+
+    @classmethod
+    def from_config(cls, config):
+        monitoring = config.config["monitoring"]
+        scheduler_config = monitoring.get("scheduler", {})
+        return cls(
+            max_fps=monitoring["performance"]["fps"],
+            idle_fps=scheduler_config.get("idle_fps", 1.0),
+            check_intervals={
+                risk: level.get("check_interval", 1) for risk, level in monitoring["risk_levels"].items()
+            },
+            cooldown=scheduler_config.get("cooldown", 5.0),
+            enabled=scheduler_config.get("enabled", True)
+        )
+
+    @property
+    def idle(self) -> bool:
+        """Nobody in view and already slowed down to the idle rate"""
+        return self.enabled and self.risk is None and self.interval == self.target_interval(None)
+
+    def target_interval(self, risk) -> float:
+        """Seconds between analysed frames for a risk level, None meaning nobody is in view"""
+        if risk is None:
+            return 1.0 / self.idle_fps
+        return self.check_intervals.get(risk, 1) / self.max_fps
+
+    def update(self, risk, now: float = None) -> float:
+        """
+        Move towards the rate of the current risk
+        Faster rates apply at once, slower ones only after holding for the cooldown.
+        Returns:
+            float: Seconds until the next frame should be analysed
+        """
+        if not self.enabled:
+            return self.interval
+
+        now = time.time() if now is None else now
+        if self.last_update is not None:
+            fps = round(1.0 / self.interval, 2)
+            self.time_at_rate[fps] = self.time_at_rate.get(fps, 0.0) + now - self.last_update
+        self.last_update = now
+
+        target = self.target_interval(risk)
+        if target <= self.interval:
+            # Escalation never waits
+            self._switch(target, risk)
+        elif target != self.pending_interval:
+            self.pending_interval = target
+            self.pending_since = now
+        elif now - self.pending_since >= self.cooldown:
+            self._switch(target, risk)
+        return self.interval
+
+    def _switch(self, interval: float, risk):
+        if interval != self.interval:
+            self.transitions += 1
+            logging.info(f"Analysis rate {1.0 / self.interval:.1f} -> {1.0 / interval:.1f} FPS (risk: {risk or 'idle'})")
+        self.interval = interval
+        self.risk = risk
+        self.pending_interval = None
+
+    def get_stats(self):
+        """Current rate and seconds spent at each rate"""
+        return {
+            "fps": 1.0 / self.interval,
+            "risk": self.risk,
+            "transitions": self.transitions,
+            "seconds_at_fps": {fps: round(seconds, 1) for fps, seconds in self.time_at_rate.items()},
+        }
@@ -1,31 +1,68 @@
 # src/service.py
 
+import io
 import os
 import logging
+import queue
+import threading
 import cv2
 import numpy as np
-import mediapipe as mp
 import time
 
+from collections.abc import Mapping
 from datetime import datetime
-from telegram import Bot
-from telegram.ext import Updater, CommandHandler
-from exceptions import NotificationException
-from ultralytics import YOLO
+from exceptions import NotificationException, DetectionException
+from inference import BatchInferenceEngine
+from runtime import load_yolo
+from tracker import RoiTracker, PersonTracker
+from landmarks import (
+    POSE_CONNECTIONS, to_array, pose_features, classify_poses, classify_elderly
+)
+from utils import calculate_angle
+from pose_backends import POSE_BACKENDS
+from metrics import NULL_METRICS, camera_metrics
 from enums import PoseType, GenderType
 from config import Config
+from startup import STARTUP, load_in_background
+from workers import InferencePool, RemoteBackend
 
 class TelegramService:
     def __init__(self, config: Config):
+        # python-telegram-bot pulls in a large dependency tree, only pay for it once a bot is needed
+        with STARTUP.phase("telegram import"):
+            from telegram import Bot
+            from telegram.ext import Updater, CommandHandler
         self.config = config
         self.token = os.getenv('TELEGRAM_BOT_TOKEN')
         self.chat_id = os.getenv('TELEGRAM_CHAT_ID')
-        self.bot = Bot(token=self.token)
-        self.updater = Updater(token=self.token, use_context=True)
+        telegram_config = config.config["monitoring"]["notifications"]["telegram"]
+        
+        # A local fake Bot API server can be used by pointing base_url at it
+        base_url = os.getenv('TELEGRAM_API_URL') or telegram_config.get("base_url")
+        bot_kwargs = {"base_url": base_url} if base_url else {}
+        self.bot = Bot(token=self.token, **bot_kwargs)
+        self.updater = Updater(token=self.token, use_context=True, **bot_kwargs)
         self.dispatcher = self.updater.dispatcher
         self.alert_acknowledged = False
         self.last_alert_time = 0
-        self.alert_interval = 300  # 5 minutes
+        self.last_alert_times = {}  # Throttling is kept per camera, from delivered alerts only
+        self.alerts_in_flight = set()  # Cameras with an alert queued or being sent
+        self.alert_interval = telegram_config.get("alert_interval", 300)  # 5 minutes
+        self.retry_count = telegram_config.get("retry_count", 3)
+        self.retry_backoff = telegram_config.get("retry_backoff", 1.0)
+        self.jpeg_quality = telegram_config.get("jpeg_quality", 85)
+        
+        # Alerts are delivered by a background worker so the frame loop never waits on the network
+        self.alert_queue = queue.Queue(maxsize=telegram_config.get("queue_size", 32))
+        self.alerts_sent = 0
+        self.alerts_failed = 0
+        self.alerts_dropped = 0
+        # Cameras with a main-stream provider send a full-resolution frame instead of the analysis one
+        self.snapshot_providers = {}
+        # Clips follow up on the last photo sent for the camera
+        self.last_message_ids = {}
+        self.worker = threading.Thread(target=self._delivery_loop, name="telegram-alerts", daemon=True)
+        self.worker.start()
         
         # Add command handlers
         self.dispatcher.add_handler(CommandHandler("ok", self.handle_ok))
@@ -35,6 +72,8 @@ class TelegramService:
         
     def stop(self):
         self.updater.stop()
+        self.alert_queue.put(None)
+        self.worker.join(timeout=self.retry_count * self.retry_backoff * 4 + 5)
         
     def handle_ok(self, update, context):
         """Handle OK response from Telegram"""
@@ -42,75 +81,293 @@ class TelegramService:
         logging.info("Alert acknowledged by user")
         update.message.reply_text("Alert acknowledged. Stopping notifications.")
 
-    def send_alert(self, pose, frame_or_risk_config, frame=None):
+    def register_snapshot_provider(self, camera, provider):
+        self.snapshot_providers[camera] = provider
+
+    def unregister_snapshot_provider(self, camera):
+        self.snapshot_providers.pop(camera, None)
+
+    def should_alert(self, camera="default"):
+        """Cheap throttling check, callers can skip preparing an alert that would be dropped"""
+        last_alert_time = self.last_alert_times.get(camera, 0)
+        return (
+            (time.time() - last_alert_time >= self.alert_interval or not last_alert_time)
+            and camera not in self.alerts_in_flight
+            and not self.alert_acknowledged
+        )
+
+    def send_alert(self, pose, frame_or_risk_config, frame=None, camera="default"):
         """
-        Send alert via Telegram
+        Queue an alert for delivery via Telegram
         Args:
             pose: PoseType value
             frame_or_risk_config: Either risk_config dict or frame when using legacy format
             frame: Frame image (optional, used with risk_config)
+            camera: Camera name, alert throttling is tracked per camera
+        Returns:
+            bool: True when the alert was queued
         """
+        # Handle both parameter formats
+        if isinstance(frame_or_risk_config, Mapping):
+            risk_config = frame_or_risk_config
+            frame_to_send = frame
+        else:
+            # Get risk config from pose when not provided
+            risk_config = self.config.get_risk_level(pose)
+            frame_to_send = frame_or_risk_config
+
+        if not self.should_alert(camera):
+            return False
+        
+        # Bursts wait for this one, the alert_interval throttle only starts once it is delivered.
+        # Marked before queueing, the worker may be done with it before put_nowait returns.
+        self.alerts_in_flight.add(camera)
         try:
-            current_time = time.time()
-            
-            # Handle both parameter formats
-            if isinstance(frame_or_risk_config, dict):
-                risk_config = frame_or_risk_config
-                frame_to_send = frame
-            else:
-                # Get risk config from pose when not provided
-                risk_config = self.config.get_risk_level(pose)
-                frame_to_send = frame_or_risk_config
-
-            if (current_time - self.last_alert_time >= self.alert_interval or 
-                not self.last_alert_time) and not self.alert_acknowledged:
-                
-                # Get alert message
-                message = self.config.get_message(f"messages.alerts.{risk_config['risk']}")
-                
-                # Instead of sending text first, just send a single photo with caption:
-                if frame_to_send is not None:
-                    temp_image = f"alert_{risk_config['risk']}_{int(time.time())}.jpg"
-                    cv2.imwrite(temp_image, frame_to_send)
-                    
-                    with open(temp_image, 'rb') as photo:
-                        self.bot.send_photo(
-                            chat_id=self.chat_id,
-                            photo=photo,
-                            caption=message
-                        )
-                    os.remove(temp_image)
-                else:
-                    # If no frame, optionally just send text, or skip if you always want a photo
-                    self.bot.send_message(
-                        chat_id=self.chat_id,
-                        text=message
-                    )
-
-                self.last_alert_time = current_time
-                logging.info(f"Alert sent with caption: {message}")
-                
-        except Exception as e:
-            raise NotificationException(str(e))
+            self.alert_queue.put_nowait((self._deliver, risk_config['risk'], frame_to_send, camera, time.time()))
+        except queue.Full:
+            self.alerts_in_flight.discard(camera)
+            self.alerts_dropped += 1
+            camera_metrics(camera).alerts_dropped.inc()
+            logging.warning(f"Alert queue full, dropping {risk_config['risk']} alert for {camera}")
+            return False
+        return True
+
+    def send_clip(self, risk, clip, camera="default", captured_at=None):
+        """
+        Queue an event clip, sent as a reply to the camera's last alert photo
+        Args:
+            captured_at: Capture time of the frame that raised the alert, the clip is stamped with it
+        Returns:
+            bool: True when the clip was queued
+        """
+        try:
+            self.alert_queue.put_nowait((self._deliver_clip, risk, clip, camera, captured_at or time.time()))
+        except queue.Full:
+            logging.warning(f"Alert queue full, dropping {risk} clip for {camera}")
+            return False
+        return True
+
+    def _delivery_loop(self):
+        while True:
+            alert = self.alert_queue.get()
+            if alert is None:
+                break
+            deliver, risk, payload, camera, queued_at = alert
+            is_clip = deliver == self._deliver_clip
+            metrics = camera_metrics(camera)
+            try:
+                deliver(risk, payload, camera, queued_at)
+                if not is_clip:
+                    self.alerts_sent += 1
+                    metrics.alerts_sent.inc()
+                    # A failed alert doesn't silence the camera, the next decision alerts again
+                    self.last_alert_times[camera] = queued_at
+                    self.last_alert_time = queued_at
+            except Exception as e:
+                # Not only NotificationException, e.g. a failing snapshot provider or encoder,
+                # whatever goes wrong with one item the worker has to survive for the next alert
+                self.alerts_failed += 1
+                metrics.alerts_failed.inc()
+                logging.error(f"{'Clip' if is_clip else 'Alert'} delivery failed: {str(e)}")
+            finally:
+                if not is_clip:
+                    self.alerts_in_flight.discard(camera)
+                # Queue wait included, that's what the family on the other end experiences.
+                # Clips are timed from the event itself, post-roll and encoding included.
+                metrics.observe("clip" if is_clip else "alert", time.time() - queued_at)
+
+    def _deliver(self, risk, frame, camera, queued_at):
+        # Get alert message
+        message = self.config.get_message(f"messages.alerts.{risk}")
+        if camera != "default":
+            message = f"[{camera}] {message}"
+        
+        provider = self.snapshot_providers.get(camera)
+        if provider is not None:
+            # Opening the main stream happens here, off the frame loop
+            evidence = provider.snapshot()
+            if evidence is not None:
+                frame = evidence
+        
+        photo = None
+        if frame is not None:
+            # Encode in memory, nothing touches the disk
+            success, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if success:
+                photo = encoded.tobytes()
+        
+        def send():
+            # Instead of sending text first, just send a single photo with caption:
+            if photo is not None:
+                photo_file = io.BytesIO(photo)
+                photo_file.name = f"alert_{camera}_{risk}.jpg"
+                return self.bot.send_photo(
+                    chat_id=self.chat_id,
+                    photo=photo_file,
+                    caption=message
+                )
+            # If no frame, optionally just send text, or skip if you always want a photo
+            return self.bot.send_message(
+                chat_id=self.chat_id,
+                text=message
+            )
+        
+        sent = self._with_retries(send)
+        self.last_message_ids[camera] = getattr(sent, "message_id", None)
+        logging.info(f"Alert sent with caption: {message} ({(time.time() - queued_at) * 1000:.0f}ms after queueing)")
+
+    def _deliver_clip(self, risk, clip, camera, captured_at):
+        event_time = datetime.fromtimestamp(captured_at)
+        caption = event_time.strftime("%Y-%m-%d %H:%M:%S")
+        if camera != "default":
+            caption = f"[{camera}] {caption}"
+
+        def send():
+            video_file = io.BytesIO(clip)
+            video_file.name = f"alert_{camera}_{risk}_{event_time:%Y%m%d_%H%M%S}.mp4"
+            return self.bot.send_video(
+                chat_id=self.chat_id,
+                video=video_file,
+                caption=caption,
+                reply_to_message_id=self.last_message_ids.get(camera),
+                supports_streaming=True
+            )
+        
+        self._with_retries(send)
+        logging.info(f"Alert clip sent for {camera} ({len(clip) / 1024:.0f}KB, "
+                     f"{time.time() - captured_at:.1f}s after the event)")
+
+    def _with_retries(self, send):
+        """Call send, retrying with exponential backoff, NotificationException after the last attempt"""
+        for attempt in range(self.retry_count + 1):
+            try:
+                return send()
+            except Exception as e:
+                if attempt == self.retry_count:
+                    raise NotificationException(str(e), notification_type="telegram", recipient=self.chat_id)
+                delay = self.retry_backoff * (2 ** attempt)
+                logging.warning(f"Alert delivery attempt {attempt + 1} failed, retrying in {delay:.1f}s: {str(e)}")
+                time.sleep(delay)
+
+
+class NullNotifier:
+    """Stands in for TelegramService offline, alerts are kept instead of sent"""
+
+    def __init__(self):
+        self.alerts = []  # (camera, pose, risk)
+
+    @property
+    def alerts_sent(self):
+        return len(self.alerts)
+
+    def register_snapshot_provider(self, camera, provider):
+        pass
+
+    def unregister_snapshot_provider(self, camera):
+        pass
+
+    def should_alert(self, camera="default"):
+        return True
+
+    def send_clip(self, risk, clip, camera="default", captured_at=None):
+        return True
+
+    def send_alert(self, pose, frame_or_risk_config, frame=None, camera="default"):
+        risk = frame_or_risk_config["risk"] if isinstance(frame_or_risk_config, Mapping) else None
+        self.alerts.append((camera, pose, risk))
+        return True
+
+    def stop(self):
+        pass
+
+
+
+def load_models(config: Config, streams: int = 1):
+    """
+    Load the YOLO models once so several cameras can share them
+    Both models load and warm up on background threads, frames sent before they are
+    ready wait in the engine queue, so the camera can connect in the meantime.
+    With monitoring.workers enabled the models load in worker processes instead.
+    """
+    pool = InferencePool.from_config(config, streams)
+    if pool is not None:
+        return {"inference_pool": pool.start()}
+
+    inference_config = config.config["monitoring"].get("inference", {})
+    max_batch_size = inference_config.get("max_batch_size", 4)
+    max_wait_ms = inference_config.get("max_wait_ms", 10)
+    pipeline_config = config.config["monitoring"].get("pipeline", {})
+    if pipeline_config.get("enabled", False):
+        # Every detect worker of every stream can have a frame waiting
+        streams *= pipeline_config.get("stages", {}).get("detect", {}).get("workers", 1)
+    predict_kwargs = {"verbose": False}
+    imgsz = config.config["monitoring"].get("runtime", {}).get("imgsz", 640)
+    if config.config["monitoring"].get("runtime", {}).get("backend", "pytorch") != "pytorch":
+        # Exported models are compiled for a fixed input size
+        predict_kwargs["imgsz"] = imgsz
+    warm_up = config.config["monitoring"].get("startup", {}).get("warm_up", True)
+    people = PersonTracker.from_config(config)
+    if people is not None:
+        # The tracker needs the low-score boxes YOLO drops by default
+        predict_kwargs["conf"] = people.low_threshold
+
+    def load(weights, task):
+        model = load_yolo(weights, config, task=task)
+        if warm_up:
+            # The first call initializes the runtime (CUDA context, ONNX session, layer fusion)
+            with STARTUP.phase(f"{task} warm-up"):
+                model([np.zeros((imgsz, imgsz, 3), dtype=np.uint8)], **predict_kwargs)
+        return model
+
+    return {
+        "person_model": BatchInferenceEngine(
+            load_in_background("person model", lambda: load('yolov8n.pt', "detect")),
+            max_batch_size, max_wait_ms, "person", predict_kwargs, producers=streams
+        ).start(),
+        "pose_model": BatchInferenceEngine(
+            load_in_background("pose model", lambda: load('yolov8n-pose.pt', "pose")),
+            max_batch_size, max_wait_ms, "pose", predict_kwargs, producers=streams
+        ).start(),
+    }
+
+
+def wait_for_models(models: dict, timeout: float = None):
+    """Block until every shared model has loaded"""
+    for engine in models.values():
+        if engine is not None:
+            engine.wait_ready(timeout)
 
 
 class PoseService:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, models: dict = None):
         self.config = config
-        self.person_model = YOLO('yolov8n.pt')
-        self.pose_model = YOLO('yolov8n-pose.pt')
-        self.mp_pose = mp.solutions.pose
-        self.mp_drawing = mp.solutions.drawing_utils
-        self.pose_detector = self.mp_pose.Pose(
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        models = models or load_models(config)
+        self.person_model = models.get("person_model")
+        self.pose_model = models.get("pose_model")
+        self.inference_pool = models.get("inference_pool")
         # Display settings
         self.display_width = 640
         self.display_height = 480
-        # Person tracking
+        # Person tracking, YOLO only runs again on cadence or when tracking degrades
+        tracking_config = config.config["monitoring"].get("tracking", {})
+        self.tracker = RoiTracker(
+            redetect_interval=tracking_config.get("redetect_interval", 30),
+            min_confidence=tracking_config.get("min_confidence", 0.5)
+        )
+        # Several people: persistent track IDs, None keeps the single-person path
+        self.people = PersonTracker.from_config(config)
+        self.target_track_id = None
         self.person_detected = False
         self.person_bbox = None
+        # Pose backend: "mediapipe" (YOLO + MediaPipe cascade) or "yolo_pose" (single pass)
+        backend_name = config.config["monitoring"].get("pose", {}).get("backend", "mediapipe")
+        if backend_name not in POSE_BACKENDS:
+            raise DetectionException(f"Unknown pose backend: {backend_name}", model_name=backend_name)
+        if self.inference_pool is not None:
+            # Models and tracking state live in the worker this camera is pinned to
+            self.backend = RemoteBackend(self, self.inference_pool.open_stream(), backend_name)
+        else:
+            self.backend = POSE_BACKENDS[backend_name](self)
 
     def detect_person(self, frame):
         """Detect person in frame using YOLOv8"""
@@ -121,7 +378,7 @@ class PoseService:
             return None, None
         
         person = persons[np.argmax([det[4] for det in persons])]
-        return person, map(int, person[:4])
+        return person, tuple(map(int, person[:4]))
 
     def draw_skeleton(self, frame, landmarks, bbox):
         """Draw skeleton on frame"""
@@ -129,122 +386,59 @@ class PoseService:
             return False, None
             
         x1, y1, x2, y2 = bbox
-        frame_height, frame_width = frame.shape[:2]
-        crop_height = y2 - y1
-        crop_width = x2 - x1
-        
-        # Create new pose landmarks using mediapipe solution proto
-        landmarks_copy = self.mp_pose.PoseLandmark(0)
-        landmarks_copy.landmark = [self.mp_pose.PoseLandmark(i) for i in range(33)]  # Initialize with 33 landmarks
-        for idx, landmark in enumerate(landmarks.landmark):
-            # Scale back to original frame
-            x = int(landmark.x * crop_width + x1)
-            y = int(landmark.y * crop_height + y1)
-            
-            # Update landmark coordinates
-            landmarks_copy.landmark[idx].x = x / frame_width
-            landmarks_copy.landmark[idx].y = y / frame_height
-            landmarks_copy.landmark[idx].z = landmark.z
-            landmarks_copy.landmark[idx].visibility = landmark.visibility
-        
-        self.mp_drawing.draw_landmarks(
-            frame,
-            landmarks_copy,
-            self.mp_pose.POSE_CONNECTIONS,
-            landmark_drawing_spec=self.mp_drawing.DrawingSpec(
-                color=(0, 0, 255),
-                thickness=2,
-                circle_radius=2
-            ),
-            connection_drawing_spec=self.mp_drawing.DrawingSpec(
-                color=(0, 255, 0),
-                thickness=1
-            )
-        )
-        return True, landmarks_copy
+        landmarks = to_array(landmarks)
+        
+        # Scale landmarks back from the crop to the original frame
+        pixels = (landmarks[:, :2] * (x2 - x1, y2 - y1) + (x1, y1)).astype(int)
+        visible = landmarks[:, 3] >= 0.5
+        
+        for start, end in POSE_CONNECTIONS:
+            if visible[start] and visible[end]:
+                cv2.line(frame, tuple(pixels[start]), tuple(pixels[end]), (0, 255, 0), 1)
+        for point in pixels[visible]:
+            cv2.circle(frame, tuple(point), 2, (0, 0, 255), 2)
+        return True, landmarks
 
-    def estimate_elderly_from_pose(self, landmarks):
+    def estimate_elderly_from_pose(self, landmarks, features=None):
         """Simple elderly detection based on posture bend"""
-        if not landmarks:
+        if landmarks is None:
             return False
-            
-        shoulders = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_SHOULDER].y
-        hips = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_HIP].y
         
-        posture_bend = abs(shoulders - hips)
+        features = features or pose_features(to_array(landmarks))
+        posture_bend = float(features["posture_bend"])
         logging.debug(f"Posture bend: {posture_bend:.3f}")
-        return posture_bend > 0.15
+        return bool(classify_elderly(features))
 
     def calculate_angle(self, point1, point2, point3):
         """Calculate angle between three points"""
-        vector1 = np.array([point1.x - point2.x, point1.y - point2.y])
-        vector2 = np.array([point3.x - point2.x, point3.y - point2.y])
-        
-        cosine_angle = np.dot(vector1, vector2) / (np.linalg.norm(vector1) * np.linalg.norm(vector2))
-        angle = np.arccos(cosine_angle)
-        
-        return np.degrees(angle)
+        return calculate_angle(point1, point2, point3)
 
-    def classify_pose(self, landmarks):
+    def classify_pose(self, landmarks, features=None):
         """Classify pose using body proportions relative to head size"""
-        if not landmarks:
+        if landmarks is None:
             return PoseType.UNKNOWN.value
-            
-        # Get head landmarks
-        nose = landmarks.landmark[self.mp_pose.PoseLandmark.NOSE]
-        left_ear = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_EAR]
-        right_ear = landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_EAR]
         
-        # Body landmarks
-        left_shoulder = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_SHOULDER]
-        right_shoulder = landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_SHOULDER]
-        left_hip = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_HIP]
-        right_hip = landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_HIP]
-        left_ankle = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_ANKLE]
-        right_ankle = landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_ANKLE]
-
-        # Calculate head size (average of width and height)
-        head_width = abs(left_ear.x - right_ear.x)
-        head_height = abs((left_ear.y + right_ear.y)/2 - nose.y)
-        head_size = (head_width + head_height) / 2
-
-        # Calculate body segments in terms of head sizes
-        shoulder_to_hip = abs((left_shoulder.y + right_shoulder.y)/2 - 
-                             (left_hip.y + right_hip.y)/2) / head_size
-        
-        hip_to_ankle = abs((left_hip.y + right_hip.y)/2 - 
-                          (left_ankle.y + right_ankle.y)/2) / head_size
-        
-        total_height_heads = (shoulder_to_hip + hip_to_ankle)
+        features = features or pose_features(to_array(landmarks))
         
         logging.debug(f"""
             Pose measurements:
-            - Head size: {head_size:.3f}
-            - Shoulders to hips (in heads): {shoulder_to_hip:.1f}
-            - Hips to ankles (in heads): {hip_to_ankle:.1f}
-            - Total height (in heads): {total_height_heads:.1f}
+            - Head size: {features["head_size"]:.3f}
+            - Shoulders to hips (in heads): {features["shoulder_to_hip"]:.1f}
+            - Hips to ankles (in heads): {features["hip_to_ankle"]:.1f}
+            - Total height (in heads): {features["total_height_heads"]:.1f}
+            - Torso inclination: {features["torso_inclination"]:.1f}
         """)
 
-        # Standing adult is ~7-8 head heights tall
-        # Sitting adult is ~4-5 head heights tall
-        if total_height_heads > 5.5:  # Threshold for standing
-            return PoseType.STANDING.value
-        else:
-            return PoseType.SITTING.value
+        return str(classify_poses(features))
 
-    def estimate_gender(self, landmarks):
+    def estimate_gender(self, landmarks, features=None):
         """Enhanced gender detection"""
-        if not landmarks:
+        if landmarks is None:
             return False
-            
-        left_shoulder = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_SHOULDER]
-        right_shoulder = landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_SHOULDER]
-        left_hip = landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_HIP]
-        right_hip = landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_HIP]
         
-        shoulder_width = abs(right_shoulder.x - left_shoulder.x)
-        hip_width = abs(right_hip.x - left_hip.x)
-        shoulder_hip_ratio = shoulder_width / (hip_width + 1e-6)
+        features = features or pose_features(to_array(landmarks))
+        shoulder_width = float(features["shoulder_width"])
+        shoulder_hip_ratio = float(features["shoulder_hip_ratio"])
         
         # Adjusted thresholds for male detection
         is_male = (
@@ -255,48 +449,109 @@ class PoseService:
         logging.debug(f"Gender detection metrics: ratio={shoulder_hip_ratio:.2f}, width={shoulder_width:.2f}")
         return is_male
 
-    def analyze_pose(self, frame):
-        """Two-phase detection pipeline"""
-        process_frame = frame.copy()
+    def analyze_pose(self, frame, metrics=NULL_METRICS):
+        """Run the configured pose backend and classify the result"""
+        landmarks, bbox = self.backend.timed_estimate(frame, metrics)
         
-        # Phase 1: Initial YOLO detection (only if person not detected)
-        if not self.person_detected:
-            person_results = self.person_model(process_frame)[0]
-            persons = [det for det in person_results.boxes.data if det[5] == 0]
-            
-            if not persons:
-                return None, None, None, None
-            
-            # Store detected person
-            person = persons[np.argmax([det[4] for det in persons])]
-            self.person_bbox = tuple(map(int, person[:4]))
-            self.person_detected = True
-            
-            # Draw initial bounding box
-            x1, y1, x2, y2 = self.person_bbox
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            return None, None, None, self.person_bbox
-        
-        # Phase 2: MediaPipe pose tracking
-        if self.person_bbox:
-            x1, y1, x2, y2 = self.person_bbox
-            person_frame = process_frame[y1:y2, x1:x2]
-            
-            if person_frame.size == 0:
-                return None, None, None, None
-                
-            image_rgb = cv2.cvtColor(person_frame, cv2.COLOR_BGR2RGB)
-            results = self.pose_detector.process(image_rgb)
-            
-            if not results.pose_landmarks:
-                return None, None, None, None
-                
-            is_elderly = self.estimate_elderly_from_pose(results.pose_landmarks)
-            pose = self.classify_pose(results.pose_landmarks)
-            
-            return results.pose_landmarks, is_elderly, pose, self.person_bbox
+        self.person_detected = bbox is not None
+        self.person_bbox = bbox
+        
+        if landmarks is None:
+            return None, None, None, None
         
-        return None, None, None, None
+        with metrics.time("classify"):
+            is_elderly, pose = self.classify(landmarks)
+        return landmarks, is_elderly, pose, bbox
+
+    def classify(self, landmarks):
+        """Elderly estimate and pose label from one vectorized feature pass"""
+        features = pose_features(landmarks)
+        is_elderly = self.estimate_elderly_from_pose(landmarks, features)
+        pose = self.classify_pose(landmarks, features)
+        return is_elderly, pose
+
+    def reset_tracking(self):
+        if self.backend.remote:
+            self.backend.reset()
+        self.tracker.reset()
+        if self.people is not None:
+            self.people.reset()
+        self.target_track_id = None
+
+    def detect_people(self, frame, timestamp=None):
+        """Detect everyone with one model call and assign persistent track IDs"""
+        if self.backend.remote:
+            # Tracking, pose and classification all happen in the worker
+            return self.backend.analyze_people(frame, timestamp)
+        boxes, scores, detections = self.backend.detect_people(frame)
+        return self.people.update(boxes, scores, detections, timestamp)
+
+    def estimate_people(self, frame, people):
+        """Landmarks for all tracked people from one backend call"""
+        if self.backend.remote:
+            return people
+        poses = self.backend.estimate_poses(frame, people) if people else []
+        for person, landmarks in zip(people, poses):
+            person["landmarks"] = landmarks
+        return people
+
+    def classify_people(self, people):
+        """Pose label and smoothed elderly decision for each track"""
+        # Remote people arrive classified by the worker that holds their tracks
+        if not self.backend.remote:
+            for person in people:
+                person["is_elderly"], person["pose"] = None, None
+                if person.get("landmarks") is None:
+                    continue
+                is_elderly, person["pose"] = self.classify(person["landmarks"])
+                person["is_elderly"] = self.people.vote_elderly(person["track_id"], is_elderly)
+
+        self.person_detected = bool(people)
+        if people:
+            # The motion gate watches everyone, not only the target
+            boxes = np.array([person["bbox"] for person in people])
+            self.person_bbox = (*boxes[:, :2].min(axis=0).tolist(), *boxes[:, 2:].max(axis=0).tolist())
+        else:
+            self.person_bbox = None
+        return people
+
+    def select_target(self, people):
+        """
+        Person to monitor
+        Elderly tracks win over others, then the riskiest pose, then the current target.
+        Returns:
+            dict: The chosen person, or None when nobody has landmarks
+        """
+        candidates = [person for person in people if person.get("landmarks") is not None]
+        if not candidates:
+            self.target_track_id = None
+            return None
+
+        def rank(person):
+            return (
+                bool(person["is_elderly"]),
+                self.config.get_risk_level(person["pose"])["level"],
+                person["track_id"] == self.target_track_id,
+                person["score"],
+            )
+
+        target = max(candidates, key=rank)
+        self.target_track_id = target["track_id"]
+        return target
+
+    def analyze_people(self, frame, metrics=NULL_METRICS, timestamp=None):
+        """
+        Track, estimate and classify everyone in the frame
+        Returns:
+            list: One dict per tracked person with track_id, bbox, landmarks, pose and is_elderly
+        """
+        with metrics.time("detect"):
+            people = self.detect_people(frame, timestamp)
+        if people:
+            with metrics.time("pose"):
+                self.estimate_people(frame, people)
+        with metrics.time("classify"):
+            return self.classify_people(people)
 
 class MonitoringController:
     def process_frame(self, frame):
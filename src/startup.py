@@ -0,0 +1,108 @@
+# src/startup.py
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from rich.table import Table
+
+from logger import logging, console
+from metrics import REGISTRY
+
+# Taken when this module is first imported, main.py imports it before anything heavy
+PROCESS_START = time.perf_counter()
+
+STARTUP_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+
+class StartupProfiler:
+    """Wall-clock phases from process start to the first pose decision"""
+
+    def __init__(self, target: float = None):
+        # Seconds from process start to the first decision we aim for
+        self.target = target
+        self.report_enabled = True
+        self.lock = threading.Lock()
+        self.phases = []  # (name, start, end) relative to process start
+        self.first_decisions = {}
+        self.phase_seconds = REGISTRY.histogram(
+            "monitoring_startup_seconds", "Startup phase durations", ("phase",), buckets=STARTUP_BUCKETS
+        )
+
+    def configure(self, config):
+        startup_config = config.config["monitoring"].get("startup", {})
+        self.target = startup_config.get("target_seconds", self.target)
+        self.report_enabled = startup_config.get("report", True)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - PROCESS_START
+
+    def record(self, name: str, start: float, end: float = None):
+        """Add a phase by its offsets from process start"""
+        end = self.elapsed() if end is None else end
+        with self.lock:
+            self.phases.append((name, start, end))
+        self.phase_seconds.labels(phase=name).observe(end - start)
+        logging.info(f"Startup phase {name}: {end - start:.2f}s")
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block, phases on different threads may overlap"""
+        start = self.elapsed()
+        try:
+            yield
+        finally:
+            self.record(name, start)
+
+    def first_decision(self, camera: str = "default"):
+        """Note the first analysed frame of a camera, the first one overall prints the report"""
+        if camera in self.first_decisions:
+            return
+        elapsed = self.elapsed()
+        with self.lock:
+            if camera in self.first_decisions:
+                return
+            self.first_decisions[camera] = elapsed
+            first = len(self.first_decisions) == 1
+        self.phase_seconds.labels(phase="first_decision").observe(elapsed)
+        logging.info(f"[{camera}] First decision {elapsed:.2f}s after start")
+        if first:
+            if self.target and elapsed > self.target:
+                logging.warning(f"Time to first decision {elapsed:.2f}s is over the {self.target}s target")
+            if self.report_enabled:
+                console.print(self.create_report_table(elapsed))
+
+    def create_report_table(self, time_to_decision: float):
+        target = f" (target {self.target}s)" if self.target else ""
+        table = Table(title=f"Startup - first decision after {time_to_decision:.2f}s{target}")
+        table.add_column("Phase", style="cyan")
+        table.add_column("Start", justify="right")
+        table.add_column("End", justify="right")
+        table.add_column("Duration", justify="right", style="green")
+
+        with self.lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1])
+        for name, start, end in phases:
+            table.add_row(name, f"{start:.2f}s", f"{end:.2f}s", f"{end - start:.2f}s")
+        return table
+
+
+STARTUP = StartupProfiler()
+
+
+def load_in_background(name: str, loader) -> Future:
+    """Run a slow loader on its own thread as a startup phase, the future holds its result"""
+    future = Future()
+
+    def run():
+        try:
+            with STARTUP.phase(name):
+                result = loader()
+        except BaseException as e:
+            logging.error(f"Loading {name} failed: {str(e)}")
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    threading.Thread(target=run, name=f"load-{name}", daemon=True).start()
+    return future
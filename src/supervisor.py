@@ -0,0 +1,122 @@
+# src/supervisor.py
+import threading
+import time
+
+from rich.table import Table
+
+from config import Config
+from controller import MonitoringController
+from logger import logging, console
+from preview import PreviewServer
+from service import TelegramService, PoseService, load_models
+from utils import get_video_sources
+
+
+class CameraSupervisor:
+    """Run one capture/analysis pipeline per configured camera in a single process"""
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.cameras = config.config["monitoring"].get("cameras", [])
+        if not self.cameras:
+            raise ValueError("No cameras configured under monitoring.cameras")
+
+        supervisor_config = config.config["monitoring"].get("supervisor", {})
+        self.report_interval = supervisor_config.get("report_interval", 10)
+
+        # Models and the Telegram bot are shared, pose and alert state are per camera
+        self.models = load_models(config, streams=len(self.cameras))
+        self.telegram_service = TelegramService(config)
+        self.preview_server = PreviewServer.from_config(config)
+        self.controllers = {}
+        self.threads = {}
+        for camera in self.cameras:
+            name = camera["name"]
+            self.controllers[name] = MonitoringController(
+                config,
+                camera_name=name,
+                telegram_service=self.telegram_service,
+                pose_service=PoseService(config, models=self.models),
+                headless=True,
+                preview_server=self.preview_server
+            )
+
+    def _run_camera(self, camera):
+        name = camera["name"]
+        try:
+            self.controllers[name].run(*get_video_sources(self.config, camera))
+        except Exception as e:
+            logging.error(f"[{name}] Pipeline stopped: {str(e)}")
+
+    def start(self):
+        if self.preview_server:
+            self.preview_server.start()
+        for camera in self.cameras:
+            thread = threading.Thread(
+                target=self._run_camera,
+                args=(camera,),
+                name=f"camera-{camera['name']}",
+                daemon=True
+            )
+            self.threads[camera["name"]] = thread
+            thread.start()
+            logging.info(f"Started pipeline for camera {camera['name']}")
+
+    def stop(self):
+        for controller in self.controllers.values():
+            controller.stop()
+        for thread in self.threads.values():
+            thread.join(timeout=5)
+        for engine in self.models.values():
+            engine.stop()
+        if self.preview_server:
+            self.preview_server.stop()
+        self.telegram_service.stop()
+
+    def create_throughput_table(self, rates):
+        table = Table(title="Camera Throughput", show_header=True)
+
+        table.add_column("Camera", style="blue")
+        table.add_column("Status", style="green")
+        table.add_column("FPS", style="yellow")
+        table.add_column("Skipped", style="red")
+        table.add_column("Decision p99", style="yellow")
+
+        for name, fps in rates.items():
+            alive = self.threads[name].is_alive()
+            controller = self.controllers[name]
+            skip_rate = controller.motion_gate.get_stats()["skip_rate"]
+            p99 = controller.metrics.glass_to_decision.quantile(0.99) * 1000
+            table.add_row(name, "✓" if alive else "✗", f"{fps:.1f}", f"{skip_rate:.0%}", f"{p99:.0f}ms")
+        table.add_row("Total", "", f"{sum(rates.values()):.1f}", "", "")
+
+        return table
+
+    def run(self):
+        self.start()
+        last_counts = {name: 0 for name in self.controllers}
+        last_report = time.time()
+
+        try:
+            while any(thread.is_alive() for thread in self.threads.values()):
+                time.sleep(self.report_interval)
+
+                now = time.time()
+                elapsed = now - last_report
+                rates = {}
+                for name, controller in self.controllers.items():
+                    count = controller.frames_processed
+                    rates[name] = (count - last_counts[name]) / elapsed
+                    last_counts[name] = count
+                last_report = now
+
+                console.print(self.create_throughput_table(rates))
+                logging.info(f"Aggregate throughput: {sum(rates.values()):.1f} FPS {rates}")
+                for name, engine in self.models.items():
+                    logging.info(f"{name} batching: {engine.get_stats()}")
+                for name, controller in self.controllers.items():
+                    logging.info(f"[{name}] Pose backend: {controller.pose_service.backend.get_stats()}")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
@@ -0,0 +1,197 @@
+# src/temporal.py
+from collections import deque
+
+import numpy as np
+
+from landmarks import (
+    NUM_LANDMARKS, NOSE, LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP
+)
+from logger import logging
+
+
+class SlidingStats:
+    """Mean and variance over the last N values, updated in O(1)"""
+
+    def __init__(self, window: int):
+        self.values = np.zeros(window, dtype=np.float64)
+        self.window = window
+        self.count = 0
+        self.index = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.updates = 0
+
+    def push(self, value: float):
+        if self.count == self.window:
+            old = self.values[self.index]
+            self.total -= old
+            self.total_sq -= old * old
+        else:
+            self.count += 1
+        self.values[self.index] = value
+        self.total += value
+        self.total_sq += value * value
+        self.index = (self.index + 1) % self.window
+
+        # Re-sum now and then so float error can't accumulate forever
+        self.updates += 1
+        if self.updates % (self.window * 64) == 0:
+            current = self.values[:self.count]
+            self.total = float(current.sum())
+            self.total_sq = float(np.dot(current, current))
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        if not self.count:
+            return 0.0
+        variance = self.total_sq / self.count - self.mean ** 2
+        return max(variance, 0.0) ** 0.5
+
+
+class SlidingMax:
+    """Maximum over the last N values with a monotonic deque, amortized O(1)"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.index = 0
+        self.candidates = deque()
+
+    def push(self, value: float):
+        while self.candidates and self.candidates[-1][1] <= value:
+            self.candidates.pop()
+        self.candidates.append((self.index, value))
+        if self.candidates[0][0] <= self.index - self.window:
+            self.candidates.popleft()
+        self.index += 1
+
+    @property
+    def value(self) -> float:
+        return self.candidates[0][1] if self.candidates else 0.0
+
+
+class TrackState:
+    """Ring buffer of landmark arrays and streaming motion features for one track"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.landmarks = np.zeros((window, NUM_LANDMARKS, 4), dtype=np.float32)
+        self.timestamps = np.zeros(window, dtype=np.float64)
+        self.index = 0
+        self.count = 0
+        self.last_seen = 0.0
+
+        self.previous = None  # (timestamp, hip_y, head_y, hip_velocity, head_velocity)
+        self.hip_velocity = SlidingStats(window)
+        self.head_velocity = SlidingStats(window)
+        self.hip_acceleration = SlidingStats(window)
+        self.head_acceleration = SlidingStats(window)
+        self.torso_angle = SlidingStats(window)
+        self.aspect_ratio = SlidingStats(window)
+        self.peak_descent = SlidingMax(window)
+
+    def history(self):
+        """Landmark arrays of the window in chronological order"""
+        order = (np.arange(self.count) + self.index - self.count) % self.window
+        return self.landmarks[order], self.timestamps[order]
+
+    def push(self, landmarks, bbox, timestamp: float, frame_height: int):
+        self.landmarks[self.index] = landmarks
+        self.timestamps[self.index] = timestamp
+        self.index = (self.index + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+        self.last_seen = timestamp
+
+        x1, y1, x2, y2 = bbox
+        width = max(x2 - x1, 1)
+        height = max(y2 - y1, 1)
+
+        # Positions in frame heights so speeds don't depend on the crop size
+        hip_y = (y1 + (landmarks[LEFT_HIP, 1] + landmarks[RIGHT_HIP, 1]) / 2 * height) / frame_height
+        head_y = (y1 + landmarks[NOSE, 1] * height) / frame_height
+
+        shoulder_mid = (landmarks[LEFT_SHOULDER, :2] + landmarks[RIGHT_SHOULDER, :2]) / 2 * (width, height)
+        hip_mid = (landmarks[LEFT_HIP, :2] + landmarks[RIGHT_HIP, :2]) / 2 * (width, height)
+        torso = shoulder_mid - hip_mid
+        self.torso_angle.push(float(np.degrees(np.arctan2(abs(torso[0]), abs(torso[1])))))
+        self.aspect_ratio.push(width / height)
+
+        if self.previous is not None:
+            previous_time, previous_hip, previous_head, previous_hip_velocity, previous_head_velocity = self.previous
+            dt = timestamp - previous_time
+            if dt > 0:
+                # Image y grows downwards, positive velocity means moving down
+                hip_velocity = (hip_y - previous_hip) / dt
+                head_velocity = (head_y - previous_head) / dt
+                self.hip_velocity.push(hip_velocity)
+                self.head_velocity.push(head_velocity)
+                self.hip_acceleration.push((hip_velocity - previous_hip_velocity) / dt)
+                self.head_acceleration.push((head_velocity - previous_head_velocity) / dt)
+                self.peak_descent.push(max(hip_velocity, head_velocity))
+                self.previous = (timestamp, hip_y, head_y, hip_velocity, head_velocity)
+                return
+
+        self.previous = (timestamp, hip_y, head_y, 0.0, 0.0)
+
+
+class TemporalEngine:
+    """Streaming fall and lying detection over per-track sliding windows"""
+
+    def __init__(self, config):
+        temporal_config = config.config["monitoring"].get("temporal", {})
+        self.window = temporal_config.get("window", 15)
+        self.fall_velocity = temporal_config.get("fall_velocity", 0.8)
+        self.lying_torso_angle = temporal_config.get("lying_torso_angle", 60)
+        self.lying_aspect_ratio = temporal_config.get("lying_aspect_ratio", 1.0)
+        self.track_timeout = temporal_config.get("track_timeout", 10)
+        self.max_tracks = temporal_config.get("max_tracks", 8)
+        self.tracks = {}
+
+    def update(self, track_id, landmarks, bbox, timestamp: float, frame_height: int):
+        """
+        Add one frame to a track and evaluate it
+        Returns:
+            dict: lying/fall flags and the current streaming features
+        """
+        track = self.tracks.get(track_id)
+        if track is None:
+            self.prune(timestamp)
+            track = self.tracks[track_id] = TrackState(self.window)
+        track.push(landmarks, bbox, timestamp, frame_height)
+
+        lying = (
+            track.torso_angle.mean > self.lying_torso_angle
+            and track.aspect_ratio.mean > self.lying_aspect_ratio
+        )
+        # A fast descent inside the window that ends with the torso horizontal
+        fall = (
+            track.peak_descent.value > self.fall_velocity
+            and track.torso_angle.values[(track.torso_angle.index - 1) % self.window] > self.lying_torso_angle
+        )
+        if fall:
+            logging.info(f"Fall suspected on track {track_id}: descent {track.peak_descent.value:.2f}/s")
+
+        return {
+            "lying": lying,
+            "fall": fall,
+            "hip_velocity": track.hip_velocity.mean,
+            "hip_acceleration": track.hip_acceleration.mean,
+            "head_acceleration": track.head_acceleration.mean,
+            "peak_descent": track.peak_descent.value,
+            "torso_angle": track.torso_angle.mean,
+            "aspect_ratio": track.aspect_ratio.mean,
+        }
+
+    def reset(self):
+        self.tracks = {}
+
+    def prune(self, now: float):
+        """Drop idle tracks and keep memory bounded"""
+        for track_id in [tid for tid, track in self.tracks.items() if now - track.last_seen > self.track_timeout]:
+            del self.tracks[track_id]
+        while len(self.tracks) >= self.max_tracks:
+            oldest = min(self.tracks, key=lambda tid: self.tracks[tid].last_seen)
+            del self.tracks[oldest]
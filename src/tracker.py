@@ -0,0 +1,363 @@
+# src/tracker.py
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from buffers import FramePool
+from logger import logging
+
+
+class RoiTracker:
+    """Move the person ROI between YOLO detections using sparse optical flow"""
+
+    def __init__(self, redetect_interval: int = 30, min_confidence: float = 0.5,
+                 max_points: int = 50, min_points: int = 6):
+        self.redetect_interval = redetect_interval
+        self.min_confidence = min_confidence
+        self.max_points = max_points
+        self.min_points = min_points
+        # Detection and pose may run on different pipeline threads
+        self.lock = threading.RLock()
+        self.lk_params = dict(
+            winSize=(15, 15),
+            maxLevel=2,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
+        )
+        # Previous and current grayscale frames alternate between two buffers
+        self.gray_pool = FramePool(2)
+        self.mask_pool = FramePool(1)
+        self.reset()
+
+    def reset(self):
+        self.active = False
+        self.bbox = None
+        self.points = None
+        self.previous_gray = None
+        self.confidence = 0.0
+        self.frames_since_detection = 0
+
+    def needs_detection(self) -> bool:
+        """Run the detector on cadence, when lost or when tracking confidence drops"""
+        return (
+            not self.active
+            or self.frames_since_detection >= self.redetect_interval
+            or self.confidence < self.min_confidence
+        )
+
+    def init(self, frame, bbox):
+        """Start tracking from a fresh detector box"""
+        self.previous_gray = self.gray_pool.cvt_color(frame, cv2.COLOR_BGR2GRAY)
+        self.bbox = self._clip(bbox, frame.shape)
+        self.points = self._seed_features(self.previous_gray, self.bbox)
+        self.active = self.bbox is not None
+        self.confidence = 1.0 if self.active else 0.0
+        self.frames_since_detection = 0
+
+    def lost(self):
+        """Force a re-detection on the next frame"""
+        self.confidence = 0.0
+
+    def seed_from_landmarks(self, landmarks, bbox):
+        """Track pose landmarks instead of generic corners when they are available"""
+        with self.lock:
+            self._seed_from_landmarks(landmarks, bbox)
+
+    def _seed_from_landmarks(self, landmarks, bbox):
+        x1, y1, x2, y2 = bbox
+        inside = np.all((landmarks[:, :2] >= 0) & (landmarks[:, :2] <= 1), axis=1)
+        usable = landmarks[(landmarks[:, 3] > 0.5) & inside]
+        if len(usable) >= self.min_points:
+            points = usable[:, :2] * (x2 - x1, y2 - y1) + (x1, y1)
+            self.points = points.astype(np.float32).reshape(-1, 1, 2)
+
+    def update(self, frame):
+        """
+        Move the ROI to the current frame
+        Returns:
+            tuple: Updated bbox, or None when tracking was lost
+        """
+        with self.lock:
+            return self._update(frame)
+
+    def _update(self, frame):
+        if not self.active:
+            return None
+
+        gray = self.gray_pool.cvt_color(frame, cv2.COLOR_BGR2GRAY)
+        self.frames_since_detection += 1
+
+        if self.points is None or len(self.points) < self.min_points:
+            self.points = self._seed_features(self.previous_gray, self.bbox)
+            if self.points is None:
+                self.previous_gray = gray
+                self.lost()
+                return None
+
+        # Forward-backward flow, points that don't come back are unreliable
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(self.previous_gray, gray, self.points, None, **self.lk_params)
+        back_points, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.previous_gray, next_points, None, **self.lk_params)
+        fb_error = np.linalg.norm((self.points - back_points).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < 1.0)
+
+        self.confidence = float(np.count_nonzero(good)) / len(self.points)
+        self.previous_gray = gray
+
+        if np.count_nonzero(good) < self.min_points:
+            logging.debug(f"ROI tracking lost, confidence {self.confidence:.2f}")
+            self.lost()
+            return None
+
+        old = self.points.reshape(-1, 2)[good]
+        new = next_points.reshape(-1, 2)[good]
+
+        # Median displacement and spread ratio give translation and scale
+        dx, dy = np.median(new - old, axis=0)
+        old_spread = np.linalg.norm(old - old.mean(axis=0), axis=1)
+        new_spread = np.linalg.norm(new - new.mean(axis=0), axis=1)
+        valid = old_spread > 1e-3
+        scale = float(np.median(new_spread[valid] / old_spread[valid])) if np.any(valid) else 1.0
+        scale = min(max(scale, 0.9), 1.1)
+
+        x1, y1, x2, y2 = self.bbox
+        cx = (x1 + x2) / 2 + dx
+        cy = (y1 + y2) / 2 + dy
+        half_w = (x2 - x1) * scale / 2
+        half_h = (y2 - y1) * scale / 2
+        bbox = self._clip((cx - half_w, cy - half_h, cx + half_w, cy + half_h), frame.shape)
+        if bbox is None:
+            self.lost()
+            return None
+
+        self.bbox = bbox
+        self.points = new.reshape(-1, 1, 2)
+        return self.bbox
+
+    def _seed_features(self, gray, bbox):
+        if bbox is None:
+            return None
+        x1, y1, x2, y2 = bbox
+        mask = self.mask_pool.next(gray.shape)
+        mask.fill(0)
+        mask[y1:y2, x1:x2] = 255
+        points = cv2.goodFeaturesToTrack(gray, self.max_points, 0.01, 5, mask=mask)
+        if points is None or len(points) < self.min_points:
+            return None
+        return points.astype(np.float32)
+
+    @staticmethod
+    def _clip(bbox, shape):
+        height, width = shape[:2]
+        x1, y1, x2, y2 = bbox
+        x1, x2 = int(max(0, min(x1, width))), int(max(0, min(x2, width)))
+        y1, y2 = int(max(0, min(y1, height))), int(max(0, min(y2, height)))
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            return None
+        return x1, y1, x2, y2
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU of two (N, 4) and (M, 4) arrays of x1, y1, x2, y2 boxes"""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(1, -1, 4)
+    width = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    height = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersection = width * height
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return intersection / np.maximum(area_a + area_b - intersection, 1e-6)
+
+
+def greedy_match(iou, min_iou: float):
+    """
+    Pair rows and columns by decreasing IoU
+    Returns:
+        Tuple(list, list, list): Matched (row, col) pairs, unmatched rows, unmatched columns
+    """
+    rows, cols = iou.shape
+    matches = []
+    if rows and cols:
+        used_rows, used_cols = set(), set()
+        for flat in np.argsort(-iou, axis=None):
+            row, col = divmod(int(flat), cols)
+            if iou[row, col] < min_iou:
+                break
+            if row in used_rows or col in used_cols:
+                continue
+            used_rows.add(row)
+            used_cols.add(col)
+            matches.append((row, col))
+    matched_rows = {row for row, _ in matches}
+    matched_cols = {col for _, col in matches}
+    return (
+        matches,
+        [row for row in range(rows) if row not in matched_rows],
+        [col for col in range(cols) if col not in matched_cols],
+    )
+
+
+class Track:
+    """One person followed across frames"""
+
+    def __init__(self, track_id: int, bbox, score: float, timestamp: float):
+        self.track_id = track_id
+        self.bbox = np.asarray(bbox, dtype=np.float32)
+        self.velocity = np.zeros(4, dtype=np.float32)
+        self.score = score
+        self.hits = 1
+        self.confirmed = False
+        self.last_seen = timestamp
+        self.lost = False
+        # Running share of frames in which this person was classified as elderly
+        self.elderly_score = None
+
+    def predict(self):
+        """Box expected in the next frame under constant velocity"""
+        return self.bbox + self.velocity
+
+    def update(self, bbox, score: float, timestamp: float):
+        bbox = np.asarray(bbox, dtype=np.float32)
+        if not self.lost:
+            self.velocity = 0.5 * self.velocity + 0.5 * (bbox - self.bbox)
+        else:
+            self.velocity[:] = 0
+        self.bbox = bbox
+        self.score = score
+        self.hits += 1
+        self.last_seen = timestamp
+        self.lost = False
+
+
+class PersonTracker:
+    """
+    ByteTrack-style multi-person tracker
+    Confident detections are matched to tracks first, then low-score boxes (occluded or
+    blurred people) keep the remaining tracks alive instead of starting new ones.
+    """
+
+    def __init__(self, high_threshold: float = 0.5, low_threshold: float = 0.1, match_iou: float = 0.3,
+                 min_hits: int = 2, max_lost_seconds: float = 2.0, max_people: int = 4,
+                 elderly_smoothing: float = 0.2):
+        self.high_threshold = high_threshold
+        self.low_threshold = low_threshold
+        self.match_iou = match_iou
+        self.min_hits = min_hits
+        self.max_lost_seconds = max_lost_seconds
+        self.max_people = max_people
+        self.elderly_smoothing = elderly_smoothing
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.tracks = []
+
+    @classmethod
+    def from_config(cls, config):
+        """Build from monitoring.tracking, None when multi-person tracking is disabled"""
+        tracking_config = config.config["monitoring"].get("tracking", {})
+        if not tracking_config.get("multi_person", False):
+            return None
+        return cls(
+            high_threshold=tracking_config.get("high_threshold", 0.5),
+            low_threshold=tracking_config.get("low_threshold", 0.1),
+            match_iou=tracking_config.get("match_iou", 0.3),
+            min_hits=tracking_config.get("min_hits", 2),
+            max_lost_seconds=tracking_config.get("max_lost_seconds", 2.0),
+            max_people=tracking_config.get("max_people", 4),
+            elderly_smoothing=tracking_config.get("elderly_smoothing", 0.2)
+        )
+
+    def reset(self):
+        with self.lock:
+            self.tracks = []
+
+    def track_ids(self):
+        """IDs of every live track, including ones currently lost"""
+        with self.lock:
+            return {track.track_id for track in self.tracks}
+
+    def update(self, boxes, scores, detections=None, timestamp: float = None):
+        """
+        Associate one frame of person detections with the tracks
+        Args:
+            boxes: (N, 4) x1, y1, x2, y2 boxes
+            scores: (N,) detector confidences
+            detections: Per-box backend data handed back with the person (keypoints etc.)
+        Returns:
+            list: One dict per confirmed person seen in this frame with track_id, bbox and detection
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        detections = list(detections) if detections is not None else [None] * len(boxes)
+
+        high = np.flatnonzero(scores >= self.high_threshold)
+        low = np.flatnonzero((scores >= self.low_threshold) & (scores < self.high_threshold))
+
+        with self.lock:
+            matched = {}  # detection index -> track
+            predicted = np.array([track.predict() for track in self.tracks], dtype=np.float32).reshape(-1, 4)
+
+            # First association: confident boxes against every track, lost ones included
+            matches, unmatched_tracks, unmatched_high = greedy_match(
+                iou_matrix(predicted, boxes[high]), self.match_iou
+            )
+            for row, col in matches:
+                matched[int(high[col])] = self.tracks[row]
+
+            # Second association: low-score boxes only continue tracks seen last frame
+            remaining = [row for row in unmatched_tracks if not self.tracks[row].lost]
+            matches, _, _ = greedy_match(iou_matrix(predicted[remaining], boxes[low]), self.match_iou)
+            for row, col in matches:
+                matched[int(low[col])] = self.tracks[remaining[row]]
+
+            for index, track in matched.items():
+                track.update(boxes[index], float(scores[index]), timestamp)
+                if track.hits >= self.min_hits:
+                    track.confirmed = True
+
+            seen = set(map(id, matched.values()))
+            for track in self.tracks:
+                if id(track) not in seen:
+                    track.lost = True
+
+            # Drop tentative tracks that missed a frame and lost ones past the buffer
+            self.tracks = [
+                track for track in self.tracks
+                if id(track) in seen
+                or (track.confirmed and timestamp - track.last_seen <= self.max_lost_seconds)
+            ]
+
+            # Unmatched confident boxes start tentative tracks, strongest first
+            for col in sorted(unmatched_high, key=lambda col: -scores[high[col]]):
+                if len(self.tracks) >= self.max_people:
+                    break
+                index = int(high[col])
+                track = Track(self.next_id, boxes[index], float(scores[index]), timestamp)
+                track.confirmed = self.min_hits <= 1
+                self.next_id += 1
+                self.tracks.append(track)
+                matched[index] = track
+
+            return [
+                {
+                    "track_id": track.track_id,
+                    "bbox": tuple(int(v) for v in track.bbox),
+                    "score": track.score,
+                    "detection": detections[index],
+                }
+                for index, track in sorted(matched.items(), key=lambda item: item[1].track_id)
+                if track.confirmed and track in self.tracks
+            ]
+
+    def vote_elderly(self, track_id: int, is_elderly: bool) -> bool:
+        """Fold one frame's elderly estimate into the track and return its smoothed decision"""
+        with self.lock:
+            track = next((track for track in self.tracks if track.track_id == track_id), None)
+            if track is None:
+                return is_elderly
+            vote = 1.0 if is_elderly else 0.0
+            if track.elderly_score is None:
+                track.elderly_score = vote
+            else:
+                track.elderly_score += self.elderly_smoothing * (vote - track.elderly_score)
+            return track.elderly_score >= 0.5
@@ -5,32 +5,61 @@ from dotenv import load_dotenv
 
 import numpy as np
 
+from landmarks import calculate_angles
+from exceptions import CameraException
+
+def _as_point(point):
+    if hasattr(point, "x"):
+        return np.array([point.x, point.y], dtype=np.float32)
+    return np.asarray(point, dtype=np.float32)
+
 def calculate_angle(point1, point2, point3):
-    """Calculate angle between three points"""
-    vector1 = np.array([point1.x - point2.x, point1.y - point2.y])
-    vector2 = np.array([point3.x - point2.x, point3.y - point2.y])
-    
-    cosine_angle = np.dot(vector1, vector2) / (np.linalg.norm(vector1) * np.linalg.norm(vector2))
-    angle = np.arccos(cosine_angle)
-    
-    return np.degrees(angle)
-
-def get_video_source():
+    """Calculate angle between three points (landmark objects or arrays)"""
+    return calculate_angles(_as_point(point1), _as_point(point2), _as_point(point3))
+
+# RTSP subtype of each camera stream
+STREAM_SUBTYPES = {"main": 0, "sub": 1}
+
+def get_video_source(camera: dict = None, stream: str = "main"):
         """Get video source from configuration"""
+        # Cameras from config.yaml may point straight at a stream or file
+        if camera and camera.get("source"):
+            if stream == "sub" and camera.get("sub_source"):
+                return camera["sub_source"]
+            return camera["source"]
+        
         # Get RTSP URL from environment variables
         
         load_dotenv()
         
+        # VIDEO_SOURCE replaces the camera with a file or any other OpenCV source
+        if not camera and os.getenv("VIDEO_SOURCE"):
+            return os.getenv("VIDEO_SOURCE")
+        
+        camera = camera or {}
+        
         RTSP_USERNAME = os.getenv("RTSP_USERNAME")
         RTSP_ACCESS_KEY = os.getenv("RTSP_ACCESS_KEY")
-        RTSP_CAMERA_IP = os.getenv("RTSP_CAMERA_IP")
-        RTSP_CAMERA_PORT = os.getenv("RTSP_CAMERA_PORT")
+        RTSP_CAMERA_IP = camera.get("ip") or os.getenv("RTSP_CAMERA_IP")
+        RTSP_CAMERA_PORT = camera.get("port") or os.getenv("RTSP_CAMERA_PORT")
+        channel = camera.get("channel", 1)
+        subtype = STREAM_SUBTYPES[stream]
 
         if not RTSP_USERNAME or not RTSP_ACCESS_KEY or not RTSP_CAMERA_IP:
-            print("Error: Missing environment variables.")
-            exit(1)
+            raise CameraException(
+                "Missing environment variables, set RTSP_USERNAME, RTSP_ACCESS_KEY and RTSP_CAMERA_IP or VIDEO_SOURCE",
+                device_id=camera.get("name")
+            )
 
-        rtsp_url = f'rtsp://{RTSP_USERNAME}:{RTSP_ACCESS_KEY}@{RTSP_CAMERA_IP}:{RTSP_CAMERA_PORT}/cam/realmonitor?channel=1&subtype=0'
+        rtsp_url = f'rtsp://{RTSP_USERNAME}:{RTSP_ACCESS_KEY}@{RTSP_CAMERA_IP}:{RTSP_CAMERA_PORT}/cam/realmonitor?channel={channel}&subtype={subtype}'
             
-        # rtsp_url = '3.mp4'
-        return rtsp_url
\ No newline at end of file
+        return rtsp_url
+
+def get_video_sources(config, camera: dict = None):
+    """
+    Sources for analysis and for alert evidence
+    Returns:
+        Tuple(str, str): Analysis source (substream by default) and full-resolution evidence source
+    """
+    analysis_stream = config.config["monitoring"].get("capture", {}).get("analysis_stream", "sub")
+    return get_video_source(camera, analysis_stream), get_video_source(camera, "main")
@@ -0,0 +1,470 @@
+# src/workers.py
+import atexit
+import copy
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from exceptions import DetectionException
+from logger import logging
+from metrics import NULL_METRICS, REGISTRY
+from pose_backends import POSE_BACKENDS, PoseBackend
+
+# Analysis frames are resized to the PoseService display size before inference
+DEFAULT_FRAME_BYTES = 640 * 480 * 3
+
+
+class StageTimer:
+    """Stage durations of one worker request, sent back along with its result"""
+
+    def __init__(self):
+        self.timings = {}
+
+    def observe(self, stage: str, seconds: float):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def time(self, stage: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start_time)
+
+
+def run_request(service, kind, frame, timestamp, timer):
+    """Serve one request against a stream's PoseService inside the worker"""
+    if kind == "estimate":
+        return service.backend.estimate(frame, timer)
+    if kind == "people":
+        with timer.time("detect"):
+            people = service.detect_people(frame, timestamp)
+        if people:
+            with timer.time("pose"):
+                service.estimate_people(frame, people)
+        with timer.time("classify"):
+            service.classify_people(people)
+        # Backend detection data stays here, only boxes, landmarks and labels go back
+        for person in people:
+            person.pop("detection", None)
+        return people
+    if kind == "reset":
+        service.reset_tracking()
+        return None
+    raise ValueError(f"Unknown worker request: {kind}")
+
+
+def worker_main(worker_id, conn, raw_config, config_path, lang, slot_names, threads):
+    """Worker process: load the models once, then serve requests until told to stop"""
+    # Native thread pools get this worker's share of the cores
+    for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[variable] = str(threads)
+
+    import cv2
+    from config import Config
+    from logger import setup_logging
+    from service import PoseService, load_models, wait_for_models
+
+    setup_logging()
+    cv2.setNumThreads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    config = Config(config_path=config_path, lang=lang).derive(raw_config)
+    models = load_models(config)
+    wait_for_models(models)
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    services = {}  # stream id -> PoseService, tracking state stays with its stream
+    logging.info(f"Pose worker {worker_id} ready in process {os.getpid()} with {threads} threads")
+    conn.send(("ready", os.getpid(), None, None))
+
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            kind, task_id, stream_id, slot, shape, timestamp = message
+            if kind == "ping":
+                conn.send(("pong", task_id, None, None))
+                continue
+
+            frame = None
+            try:
+                service = services.get(stream_id)
+                if service is None:
+                    service = services[stream_id] = PoseService(config, models=models)
+                if slot is not None:
+                    frame = np.ndarray(shape, dtype=np.uint8, buffer=slots[slot].buf)
+                timer = StageTimer()
+                result = run_request(service, kind, frame, timestamp, timer)
+                conn.send(("result", task_id, result, timer.timings))
+            except Exception as e:
+                logging.error(f"Pose worker {worker_id} request failed: {str(e)}")
+                conn.send(("error", task_id, f"{type(e).__name__}: {str(e)}", None))
+            finally:
+                # The slot is reused by the main process as soon as the result is in
+                frame = None
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        for engine in models.values():
+            engine.stop()
+        for slot in slots:
+            try:
+                slot.close()
+            except BufferError:
+                pass
+
+
+class WorkerHandle:
+    """One worker process as seen from the main process: its frame slots, channel and pending requests"""
+
+    def __init__(self, worker_id: int, slot_count: int, slot_bytes: int):
+        self.worker_id = worker_id
+        # Created and unlinked by the main process, they outlive worker restarts
+        self.slots = [shared_memory.SharedMemory(create=True, size=slot_bytes) for _ in range(slot_count)]
+        self.free_slots = queue.Queue()
+        for index in range(slot_count):
+            self.free_slots.put(index)
+        self.streams = set()
+        self.process = None
+        self.conn = None
+        self.pid = None
+        self.generation = 0
+        self.started_at = 0.0
+        self.last_seen = 0.0
+        self.restarts = 0
+        self.ready = threading.Event()
+        self.send_lock = threading.Lock()
+        self.pending_lock = threading.Lock()
+        self.pending = {}  # task id -> Future
+
+    def fail_pending(self, reason: str):
+        with self.pending_lock:
+            pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(DetectionException(reason, model_name=f"worker-{self.worker_id}"))
+
+    def close_slots(self):
+        for slot in self.slots:
+            slot.close()
+            slot.unlink()
+        self.slots = []
+
+
+class InferencePool:
+    """
+    Pose inference in a pool of worker processes
+    Each worker loads the models once and keeps the tracking state of the camera streams
+    pinned to it. Frames are copied into shared-memory slots, only the small result arrays
+    are pickled back. Workers that exit or stop answering are restarted.
+    """
+
+    def __init__(self, config, processes: int = 1, threads: int = 1, slots_per_worker: int = 4,
+                 frame_bytes: int = DEFAULT_FRAME_BYTES, task_timeout: float = 10.0,
+                 health_interval: float = 5.0, start_timeout: float = 120.0):
+        self.processes = max(1, processes)
+        self.threads = max(1, threads)
+        self.frame_bytes = frame_bytes
+        self.task_timeout = task_timeout
+        self.health_interval = health_interval
+        self.start_timeout = start_timeout
+
+        # Workers run the local backends with the same settings, never another pool
+        self.raw_config = copy.deepcopy(config.config)
+        self.raw_config["monitoring"].setdefault("workers", {})["enabled"] = False
+        self.config_path = str(config.config_path)
+        self.lang = config.lang
+
+        self.context = mp.get_context("spawn")
+        self.handles = [WorkerHandle(worker_id, slots_per_worker, frame_bytes) for worker_id in range(self.processes)]
+        self.lock = threading.Lock()
+        self.task_ids = itertools.count()
+        self.stream_ids = itertools.count()
+        self.stop_event = threading.Event()
+        self.monitor = None
+        self.restarts = REGISTRY.counter(
+            "monitoring_worker_restarts_total", "Pose worker process restarts", ("worker",)
+        )
+
+    @classmethod
+    def from_config(cls, config, streams: int = 1):
+        """Build from monitoring.workers, None when inference runs in-process"""
+        workers_config = config.config["monitoring"].get("workers", {})
+        if not workers_config.get("enabled", False):
+            return None
+        cores = os.cpu_count() or 2
+        # One worker per camera up to half the logical cores, the rest is left to capture and glue
+        processes = workers_config.get("processes", 0) or max(1, min(streams, cores // 2))
+        return cls(
+            config,
+            processes=processes,
+            threads=workers_config.get("threads", 0) or max(1, cores // (processes + 1)),
+            slots_per_worker=workers_config.get("slots_per_worker", 4),
+            frame_bytes=workers_config.get("frame_bytes", DEFAULT_FRAME_BYTES),
+            task_timeout=workers_config.get("task_timeout", 10.0),
+            health_interval=workers_config.get("health_interval", 5.0),
+            start_timeout=workers_config.get("start_timeout", 120.0)
+        )
+
+    def start(self):
+        for handle in self.handles:
+            self._spawn(handle)
+        self.monitor = threading.Thread(target=self._monitor_loop, name="pose-worker-monitor", daemon=True)
+        self.monitor.start()
+        # Shared memory outlives the process unless unlinked
+        atexit.register(self.stop)
+        logging.info(f"Started {self.processes} pose workers with {self.threads} threads each")
+        return self
+
+    def _spawn(self, handle: WorkerHandle):
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(
+            target=worker_main,
+            args=(handle.worker_id, child_conn, self.raw_config, self.config_path, self.lang,
+                  [slot.name for slot in handle.slots], self.threads),
+            name=f"pose-worker-{handle.worker_id}",
+            daemon=True
+        )
+        handle.ready.clear()
+        handle.started_at = time.time()
+        handle.last_seen = handle.started_at
+        process.start()
+        child_conn.close()
+        handle.process = process
+        handle.conn = parent_conn
+        threading.Thread(
+            target=self._read_results, args=(handle, parent_conn, handle.generation),
+            name=f"pose-worker-{handle.worker_id}-results", daemon=True
+        ).start()
+
+    def _read_results(self, handle: WorkerHandle, conn, generation: int):
+        while True:
+            try:
+                kind, task_id, result, timings = conn.recv()
+            except (EOFError, OSError):
+                break
+            handle.last_seen = time.time()
+            if kind == "ready":
+                handle.pid = task_id
+                handle.ready.set()
+                continue
+            if kind == "pong":
+                continue
+            with handle.pending_lock:
+                future = handle.pending.pop(task_id, None)
+            if future is None:
+                continue
+            if kind == "error":
+                future.set_exception(DetectionException(result, model_name=f"worker-{handle.worker_id}"))
+            else:
+                future.set_result((result, timings))
+
+        if not self.stop_event.is_set():
+            self._restart(handle, "channel closed", generation)
+
+    def _restart(self, handle: WorkerHandle, reason: str, generation: int):
+        with self.lock:
+            # Several threads can notice the same failure, only the first restarts
+            if self.stop_event.is_set() or handle.generation != generation:
+                return
+            logging.error(f"Pose worker {handle.worker_id} (pid {handle.pid}) {reason}, restarting")
+            self._terminate(handle)
+            handle.fail_pending(f"Pose worker {handle.worker_id} {reason}")
+            # Checks that started before this point see a stale generation and back off
+            handle.generation += 1
+            handle.restarts += 1
+            self.restarts.labels(worker=str(handle.worker_id)).inc()
+            self._spawn(handle)
+
+    @staticmethod
+    def _terminate(handle: WorkerHandle):
+        process = handle.process
+        if process is not None and process.is_alive():
+            process.terminate()
+            process.join(timeout=2)
+            if process.is_alive():
+                process.kill()
+                process.join(timeout=2)
+        if handle.conn is not None:
+            handle.conn.close()
+
+    def _monitor_loop(self):
+        while not self.stop_event.wait(self.health_interval):
+            now = time.time()
+            for handle in self.handles:
+                generation = handle.generation
+                if not handle.process.is_alive():
+                    self._restart(handle, f"exited with code {handle.process.exitcode}", generation)
+                elif not handle.ready.is_set():
+                    if now - handle.started_at > self.start_timeout:
+                        self._restart(handle, f"not ready after {self.start_timeout}s", generation)
+                elif now - handle.last_seen > self.health_interval + self.task_timeout:
+                    self._restart(handle, "stopped responding", generation)
+                else:
+                    self._send(handle, ("ping", next(self.task_ids), None, None, None, None))
+
+    @staticmethod
+    def _send(handle: WorkerHandle, message) -> bool:
+        try:
+            with handle.send_lock:
+                handle.conn.send(message)
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def wait_ready(self, timeout: float = None):
+        """Block until every worker has loaded its models"""
+        for handle in self.handles:
+            if not handle.ready.wait(timeout):
+                raise DetectionException(f"Pose worker {handle.worker_id} did not start in time",
+                                         model_name=f"worker-{handle.worker_id}")
+
+    def open_stream(self):
+        """Pin a new camera stream to the least loaded worker"""
+        with self.lock:
+            handle = min(self.handles, key=lambda handle: len(handle.streams))
+            stream_id = next(self.stream_ids)
+            handle.streams.add(stream_id)
+        return InferenceStream(self, handle, stream_id)
+
+    def request(self, handle: WorkerHandle, stream_id: int, kind: str, frame=None, timestamp: float = None):
+        """
+        Run one request on a worker and wait for it
+        Returns:
+            Tuple(result, dict): Request result and the worker's stage timings in seconds
+        """
+        if not handle.ready.wait(self.start_timeout):
+            raise DetectionException(f"Pose worker {handle.worker_id} is not ready", model_name=f"worker-{handle.worker_id}")
+        generation = handle.generation
+
+        slot, shape = None, None
+        if frame is not None:
+            if frame.dtype != np.uint8 or frame.nbytes > self.frame_bytes:
+                raise DetectionException(f"Frame {frame.shape} does not fit a {self.frame_bytes} byte worker slot")
+            try:
+                slot = handle.free_slots.get(timeout=self.task_timeout)
+            except queue.Empty:
+                raise DetectionException(f"No free frame slot on pose worker {handle.worker_id}")
+            shape = frame.shape
+            np.copyto(np.ndarray(shape, dtype=np.uint8, buffer=handle.slots[slot].buf), frame)
+
+        task_id = next(self.task_ids)
+        future = Future()
+        with handle.pending_lock:
+            handle.pending[task_id] = future
+        try:
+            if not self._send(handle, (kind, task_id, stream_id, slot, shape, timestamp)):
+                raise DetectionException(f"Pose worker {handle.worker_id} channel is closed")
+            return future.result(timeout=self.task_timeout)
+        except FutureTimeout:
+            self._restart(handle, f"did not answer within {self.task_timeout}s", generation)
+            raise DetectionException(f"Pose worker {handle.worker_id} timed out")
+        finally:
+            with handle.pending_lock:
+                handle.pending.pop(task_id, None)
+            if slot is not None:
+                # After a timeout the worker has been replaced, nothing reads the slot anymore
+                handle.free_slots.put(slot)
+
+    def stop(self):
+        if self.stop_event.is_set():
+            return
+        self.stop_event.set()
+        logging.info(f"Pose worker stats: {self.get_stats()}")
+        for handle in self.handles:
+            self._send(handle, None)
+        for handle in self.handles:
+            if handle.process is not None:
+                handle.process.join(timeout=5)
+            self._terminate(handle)
+            handle.fail_pending(f"Pose worker {handle.worker_id} stopped")
+            handle.close_slots()
+        atexit.unregister(self.stop)
+
+    def get_stats(self):
+        return [
+            {
+                "worker": handle.worker_id,
+                "pid": handle.pid,
+                "alive": handle.process is not None and handle.process.is_alive(),
+                "streams": len(handle.streams),
+                "pending": len(handle.pending),
+                "restarts": handle.restarts,
+            }
+            for handle in self.handles
+        ]
+
+
+class InferenceStream:
+    """Requests of one camera, always served by the same worker so its tracking state stays there"""
+
+    def __init__(self, pool: InferencePool, handle: WorkerHandle, stream_id: int):
+        self.pool = pool
+        self.handle = handle
+        self.stream_id = stream_id
+
+    def request(self, kind: str, frame=None, timestamp: float = None):
+        return self.pool.request(self.handle, self.stream_id, kind, frame, timestamp)
+
+
+class RemoteBackend(PoseBackend):
+    """The configured pose backend running in a worker process"""
+    remote = True
+
+    def __init__(self, service, stream: InferenceStream, backend_name: str, latency_window: int = 300):
+        super().__init__(service, latency_window)
+        self.stream = stream
+        backend_class = POSE_BACKENDS[backend_name]
+        self.name = f"{backend_name}@worker{stream.handle.worker_id}"
+        # Frames of a stream are served in order, but the state behind them is still per stream
+        self.stateful_detect = backend_class.stateful_detect
+        self.stateful_pose = backend_class.stateful_pose
+
+    def _request(self, kind, frame=None, timestamp=None, metrics=NULL_METRICS, default=None):
+        try:
+            result, timings = self.stream.request(kind, frame, timestamp)
+        except DetectionException as e:
+            # A frame lost to a worker restart is skipped, the camera keeps running
+            logging.warning(f"{self.name}: {e.message}")
+            return default
+        for stage, seconds in (timings or {}).items():
+            metrics.observe(stage, seconds)
+        return result
+
+    def estimate(self, frame, metrics=NULL_METRICS):
+        return self._request("estimate", frame, metrics=metrics, default=(None, None))
+
+    def detect(self, frame):
+        # Detection and pose run together in the worker, estimate_pose only unpacks
+        landmarks, bbox = self.estimate(frame)
+        return None if bbox is None else (landmarks, bbox)
+
+    def estimate_pose(self, frame, detection):
+        return detection
+
+    def detect_people(self, frame):
+        # Tracking needs the detections in the worker, PoseService asks for analyze_people instead
+        raise NotImplementedError("Remote backends track people in the worker, use analyze_people")
+
+    def estimate_poses(self, frame, people):
+        raise NotImplementedError("Remote backends track people in the worker, use analyze_people")
+
+    def analyze_people(self, frame, timestamp=None):
+        """Tracked, estimated and classified people from the worker"""
+        return self._request("people", frame, timestamp, default=[])
+
+    def reset(self):
+        self._request("reset")